@@ -0,0 +1,50 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Shared ALBA CLI constants module
+"""
+ALBA_BINARY = '/usr/bin/alba'
+
+# Config keys
+# The settings are stored as {'default': {<setting>: <value>}, <abm_cluster_name>: {<setting>: <value>}}
+CLI_SETTINGS_KEY = '/ovs/alba/backends/cli_settings'
+CLI_SETTINGS_CACHE_TIMEOUT = 60  # Seconds the settings are cached in process memory
+
+CLI_DEFAULT_SETTINGS = {'pool_size': 2,  # Amount of idle long-lived runner processes kept per ABM config. Busy runners grow up to 'max_concurrent_calls'. 0 disables the pool
+                        'pool_idle_timeout': 300,  # Seconds after which an idle runner process is stopped
+                        'cache_size': 512,  # Maximum amount of cached command outputs
+                        'max_concurrent_calls': 8,  # Maximum amount of ALBA processes a single process runs concurrently per ABM config. 0 disables the limit
+                        'call_timeout': 300,  # Seconds after which a (queued or running) ALBA call is aborted and its process group killed. 0 disables the timeout
+                        'record_location': None,  # Directory to record the executed commands and their (anonymised) responses to, for replaying them offline. None disables recording
+                        'osd_inventory_interval': 5,  # Seconds an OSD inventory snapshot of an ABM config is shared by all its consumers
+                        'cache_timeouts': {'list-osds': 5,  # Seconds the output of a read-only command is cached. Commands not listed are not cached
+                                           'list-all-osds': 5,
+                                           'list-available-osds': 5,
+                                           'list-presets': 10,
+                                           'list-nsm-hosts': 10,
+                                           'asd-multistatistics': 2}}
+
+# Commands which do not modify anything. Any other command invalidates the cached output of its configuration
+CLI_READ_ONLY_COMMANDS = ['asd-multistatistics', 'get-alba-id', 'get-disk-safety', 'get-maintenance-config', 'get-osd-claimed-by',
+                          'list-all-osds', 'list-available-osds', 'list-namespaces', 'list-nsm-hosts', 'list-osds', 'list-presets',
+                          'list-work', 'nsm-hosts-statistics', 'proxy-statistics', 'show-namespaces']
+
+# Upper bounds (in seconds) of the latency histogram buckets of the ALBA CLI metrics. Slower calls end up in an overflow bucket
+CLI_LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+CLI_METRICS_DUMP_LOCATION = '/tmp/alba_cli_metrics_{0}.json'  # Formatted with the process ID
+CLI_METRICS_FLUSH_INTERVAL = 30  # Seconds after which the metrics of a process are added to the metrics aggregated over all processes
+CLI_METRICS_KEY = 'ovs_alba_cli_metrics'  # Volatile key holding the metrics aggregated over all processes
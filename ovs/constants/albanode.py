@@ -31,3 +31,30 @@ ASD_NODE_CONFIG_PATH = os.path.join(ASD_NODE_BASE_PATH, '{0}, config')      #/ov
 # S3 NODES
 S3_NODE_BASE_PATH = os.path.join(os.path.sep,'ovs', 'alba', 's3nodes')      #/ovs/alba/s3nodes
 S3_NODE_CONFIG_PATH = os.path.join(S3_NODE_BASE_PATH, '{0}, config')        #/ovs/alba/s3nodes/{0}/config
+
+# NODE FAN-OUT
+NODE_FANOUT_WORKERS = 16                                                    # Threads shared by all fan-outs over the ALBA Nodes of a process
+NODE_STACK_DEADLINE = 10                                                    # Seconds a node gets to report its stack before it is reported as stale/unknown
+NODE_STACK_RETENTION = 3600                                                 # Seconds the last reported stacks of an ALBA Backend are kept after its last refresh
+
+# NODE SESSIONS
+NODE_SESSION_MAX_NODES = 128                                                # Nodes for which a keep-alive session is kept within a process
+NODE_SESSION_CONNECTIONS = 4                                                # Keep-alive connections kept per node
+NODE_SESSION_IDLE_TIMEOUT = 300                                             # Seconds after which an unused session is closed
+
+# NODE METADATA
+NODE_METADATA_TTL = 300                                                     # Seconds the API version of a node is cached. Updates of the node drop the cached version
+
+# NODE REQUESTS
+NODE_REQUEST_WORKERS = 8                                                    # Threads executing the concurrent requests towards a single node (eg: the ASDs per disk of legacy ASD managers)
+NODE_REQUEST_DEADLINE = 8                                                   # Seconds to execute all concurrent requests towards a node (below NODE_STACK_DEADLINE)
+
+# OSD CLAIMS
+OSD_CLAIM_TTL = 30                                                          # Seconds the owner of an OSD which is not in the model is cached (including not being claimed)
+
+# OSD STATUSES
+OSD_ERROR_INTERVAL_TTL = 60                                                 # Seconds the GUI error interval settings of the ALBA Backends are cached
+
+# NODE CIRCUIT BREAKER
+NODE_BREAKER_FAILURES = 3                                                   # Consecutive connection failures after which calls to a node are short-circuited
+NODE_BREAKER_COOLDOWN = 30                                                  # Seconds calls are short-circuited before a single call probes the node again
@@ -29,3 +29,5 @@ NSM_PLUGIN = 'nsm_host_plugin'
 ARAKOON_PLUGIN_DIR = '/usr/lib/alba'
 
 MAX_NSM_AMOUNT = 50  # Maximum amount of NSMs for a backend
+
+CONFIG_PATH_CACHE_TIMEOUT = 600  # Seconds a resolved configuration path of an Arakoon cluster is cached in process memory
@@ -20,6 +20,7 @@ ABMCluster module
 from ovs.dal.dataobject import DataObject
 from ovs.dal.structures import Property, Relation
 from ovs.dal.hybrids.albabackend import AlbaBackend
+from ovs.extensions.plugins.configpathresolver import ConfigPathResolver
 
 
 class ABMCluster(DataObject):
@@ -35,3 +36,12 @@ class ABMCluster(DataObject):
                     Property('config_location', str, unique=True, doc='Location of the ALBA Manager Arakoon configuration')]
     __relations = [Relation('alba_backend', AlbaBackend, 'abm_cluster', onetoone=True)]
     __dynamics = []
+
+    @property
+    def config_path(self):
+        """
+        The configuration path of this cluster as passed to ALBA, eg: 'arakoon://config/ovs/arakoon/mybackend-abm/config?ini=...'
+        The resolved path is memoized process-wide
+        :rtype: str
+        """
+        return ConfigPathResolver.resolve(self.config_location)
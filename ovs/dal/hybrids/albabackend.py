@@ -18,8 +18,11 @@
 AlbaBackend module
 """
 
+import copy
 import time
+from contextlib import closing
 from threading import Lock, Thread
+from ovs.constants.albanode import NODE_STACK_DEADLINE, NODE_STACK_RETENTION
 from ovs.dal.dataobject import DataObject
 from ovs.dal.hybrids.albanode import AlbaNode
 from ovs.dal.hybrids.backend import Backend
@@ -30,6 +33,11 @@ from ovs_extensions.api.client import OVSClient
 from ovs_extensions.api.exceptions import HttpForbiddenException, HttpNotFoundException
 from ovs.extensions.generic.configuration import Configuration
 from ovs.extensions.plugins.albacli import AlbaCLI, AlbaError
+from ovs.extensions.plugins.albamaterializer import AlbaBackendMaterializer
+from ovs.extensions.plugins.albaosdinventory import AlbaOSDInventory
+from ovs.extensions.plugins.albastatistics import AlbaStatistics
+from ovs.extensions.plugins.boundedexecutor import BoundedExecutor
+from ovs.extensions.plugins.staledynamic import StaleDynamic
 from ovs.extensions.storage.volatilefactory import VolatileFactory
 
 
@@ -43,6 +51,9 @@ class AlbaBackend(DataObject):
                                                 'WARNING': 'warning',
                                                 'RUNNING': 'running'})  # lower-case values for backwards compatibility
 
+    _node_stacks = {}  # {alba_backend_guid: {'timestamp': float, 'stacks': {node_id: stack}}}. Last stack reported by every node, served when a node does not respond in time
+    _node_stacks_lock = Lock()
+
     __properties = [Property('alba_id', str, mandatory=False, indexed=True, doc='ALBA internal identifier'),
                     Property('scaling', SCALINGS.keys(), doc='Scaling for an ALBA Backend can be {0}'.format(' or '.join(SCALINGS.keys())))]
     __relations = [Relation('backend', Backend, 'alba_backend', onetoone=True, doc='Linked generic Backend')]
@@ -59,9 +70,19 @@ class AlbaBackend(DataObject):
                   Dynamic('local_summary', dict, 15, locked=True),
                   Dynamic('live_status', str, 30, locked=True)]
 
+    def invalidate_dynamics(self, properties=None):
+        """
+        Invalidates the dynamics, including the values served while they are being recalculated and the materialized values
+        """
+        StaleDynamic.invalidate(self, properties)
+        AlbaBackendMaterializer.invalidate(self.guid, properties)
+        super(AlbaBackend, self).invalidate_dynamics(properties)
+
     def _local_stack(self):
         """
         Returns a live list of all disks known to this AlbaBackend
+        Built out of the stacks of the ALBA Nodes, which are served stale while being refreshed (see AlbaNode._stack), so this dynamic is not served stale itself
+        Nodes which did not report their stack within NODE_STACK_DEADLINE seconds are reported with their last known stack (marked 'stale'), or as unknown
         """
         if self.abm_cluster is None:
             return {}  # No ABM cluster yet, so backend not fully installed yet
@@ -69,15 +90,14 @@ class AlbaBackend(DataObject):
         # Load information from node
         osd_statistics = self.osd_statistics
 
-        def _load_live_info(_node, _storage_map):
-            node_id = _node.node_id
-            _storage_map[node_id] = {}
-            for slot_id, _slot_data in _node.stack.iteritems():
+        def _load_live_info(_slots):
+            node_storage = {}
+            for slot_id, _slot_data in _slots.iteritems():
                 # Pre-fill some info
-                _storage_map[node_id][slot_id] = {'osds': {},
-                                                  'name': slot_id,
-                                                  'status': 'error',
-                                                  'status_detail': 'unknown'}
+                node_storage[slot_id] = {'osds': {},
+                                         'name': slot_id,
+                                         'status': 'error',
+                                         'status_detail': 'unknown'}
                 # Extend the OSD info with the usage information
                 for osd_id, osd_data in _slot_data.get('osds', {}).iteritems():
                     if osd_id in osd_statistics:
@@ -85,48 +105,78 @@ class AlbaBackend(DataObject):
                         osd_data['usage'] = {'size': int(stats['capacity']),
                                              'used': int(stats['disk_usage']),
                                              'available': int(stats['capacity'] - stats['disk_usage'])}
-                _storage_map[node_id][slot_id].update(_slot_data)
+                node_storage[slot_id].update(_slot_data)
+            return node_storage
 
-        threads = []
         storage_map = {}
-        for node in AlbaNodeList.get_albanodes():
-            thread = Thread(target=_load_live_info, args=(node, storage_map))
-            thread.start()
-            threads.append(thread)
-        for thread in threads:
-            thread.join()
-
+        nodes = list(AlbaNodeList.get_albanodes())
+        # The stack of a node does not depend on the ALBA Backend, so concurrent refreshes of multiple ALBA Backends share the calls per node
+        tasks = BoundedExecutor.map(function=lambda _node: _node.stack, items=nodes, deadline=NODE_STACK_DEADLINE, key=lambda _node: _node.guid)
+        for node, task in zip(nodes, tasks):
+            if task.finished is False:
+                self._logger.warning('ALBA Node {0} did not report its stack within {1}s'.format(node.node_id, NODE_STACK_DEADLINE))
+                storage_map[node.node_id] = self._get_late_node_stack(node)
+            elif task.exception is not None:
+                self._logger.error('Unable to load the stack of ALBA Node {0}: {1}'.format(node.node_id, task.exception))
+                storage_map[node.node_id] = {}
+            else:
+                storage_map[node.node_id] = _load_live_info(copy.deepcopy(task.result))  # The stack is shared with the other ALBA Backends
+
+        now = time.time()
+        with AlbaBackend._node_stacks_lock:
+            # Nodes which are no longer modelled are forgotten, as are ALBA Backends which have not been refreshed for a while (eg: removed ones)
+            for alba_backend_guid, entry in AlbaBackend._node_stacks.items():
+                if now - entry['timestamp'] > NODE_STACK_RETENTION:
+                    del AlbaBackend._node_stacks[alba_backend_guid]
+            previous = AlbaBackend._node_stacks.get(self.guid, {}).get('stacks', {})
+            stacks = {}
+            for node, task in zip(nodes, tasks):
+                if task.finished is True and task.exception is None:
+                    stacks[node.node_id] = storage_map[node.node_id]
+                elif node.node_id in previous:
+                    stacks[node.node_id] = previous[node.node_id]
+            AlbaBackend._node_stacks[self.guid] = {'timestamp': now, 'stacks': stacks}
         return storage_map
 
-    def _statistics(self):
+    def _get_late_node_stack(self, node):
+        """
+        Builds the stack of a node which did not report in time
+        * The last stack the node reported in this process, with every slot marked as 'stale'
+        * Otherwise the slots of the modelled OSDs, with every OSD in unknown state
+        :param node: The late ALBA Node
+        :type node: ovs.dal.hybrids.albanode.AlbaNode
+        :return: The stack of the node
+        :rtype: dict
+        """
+        with AlbaBackend._node_stacks_lock:
+            last_known = AlbaBackend._node_stacks.get(self.guid, {}).get('stacks', {}).get(node.node_id)
+        if last_known is not None:
+            node_storage = copy.deepcopy(last_known)
+            for slot_data in node_storage.itervalues():
+                slot_data['stale'] = True
+            return node_storage
+
+        node_storage = {}
+        for osd in node.osds:
+            if osd.slot_id not in node_storage:
+                node_storage[osd.slot_id] = {'osds': {},
+                                             'name': osd.slot_id,
+                                             'status': AlbaNode.SLOT_STATUSES.UNKNOWN,
+                                             'status_detail': AlbaNode.OSD_STATUS_DETAILS.NODEDOWN}
+            osd_data = {'status': AlbaNode.OSD_STATUSES.UNKNOWN,
+                        'status_detail': AlbaNode.OSD_STATUS_DETAILS.NODEDOWN}
+            osd_data.update(osd.stack_info)
+            node_storage[osd.slot_id]['osds'][osd.osd_id] = osd_data
+        return node_storage
+
+    def _statistics(self, dynamic):
         """
         Returns statistics for all its asds
+        The statistics of all OSDs are computed out of a single 'asd-multistatistics' call, see AlbaStatistics
         """
-        data_keys = ['apply', 'multi_get', 'range', 'range_entries', 'statistics']
-        statistics = {}
-        for key in data_keys:
-            statistics[key] = {'n': 0,
-                               'n_ps': 0,
-                               'avg': [],
-                               'max': [],
-                               'min': []}
-        for asd in self.osds:
-            asd_stats = asd.statistics
-            if not asd_stats:
-                continue
-            for key in data_keys:
-                statistics[key]['n'] += asd_stats[key]['n']
-                statistics[key]['n_ps'] += asd_stats[key]['n_ps']
-                statistics[key]['avg'].append(asd_stats[key]['avg'])
-                statistics[key]['max'].append(asd_stats[key]['max'])
-                statistics[key]['min'].append(asd_stats[key]['min'])
-        for key in data_keys:
-            statistics[key]['max'] = max(statistics[key]['max']) if len(statistics[key]['max']) > 0 else 0
-            statistics[key]['min'] = min(statistics[key]['min']) if len(statistics[key]['min']) > 0 else 0
-            if len(statistics[key]['avg']) > 0:
-                statistics[key]['avg'] = sum(statistics[key]['avg']) / len(statistics[key]['avg'])
-            else:
-                statistics[key]['avg'] = 0
+        statistics = AlbaStatistics.get_backend_statistics(alba_backend=self,
+                                                           osd_ids=[osd.osd_id for osd in self.osds],
+                                                           max_age=dynamic.timeout)
         statistics['creation'] = time.time()
         return statistics
 
@@ -134,12 +184,21 @@ class AlbaBackend(DataObject):
         """
         Loads namespace data
         """
+        return list(self._iterate_namespaces())
+
+    def _iterate_namespaces(self):
+        """
+        Yields the namespaces while 'show-namespaces' is still running, so they never have to be kept in memory all at once
+        """
         if self.abm_cluster is None:
-            return []  # No ABM cluster yet, so backend not fully installed yet
+            return  # No ABM cluster yet, so backend not fully installed yet
 
-        config = Configuration.get_configuration_path(self.abm_cluster.config_location)
-        return AlbaCLI.run(command='show-namespaces', config=config, named_params={'max': -1})[1]
+        config = self.abm_cluster.config_path
+        with closing(AlbaCLI.stream(command='show-namespaces', config=config, named_params={'max': -1}, path=['result', 1])) as namespaces:
+            for namespace in namespaces:
+                yield namespace
 
+    @AlbaBackendMaterializer.serve
     def _usages(self):
         """
         Returns an overview of free space, total space and used space
@@ -152,9 +211,9 @@ class AlbaBackend(DataObject):
         if self.abm_cluster is None:
             return usages
 
-        config = Configuration.get_configuration_path(self.abm_cluster.config_location)
+        config = self.abm_cluster.config_path
         try:
-            osds_stats = AlbaCLI.run(command='list-osds', config=config)
+            osds_stats = AlbaOSDInventory.get(config).claimed
         except AlbaError:
             self._logger.exception('Unable to fetch OSD information')
             return usages
@@ -166,6 +225,7 @@ class AlbaBackend(DataObject):
 
         return usages
 
+    @AlbaBackendMaterializer.serve
     def _presets(self):
         """
         Returns the policies active on the node
@@ -181,8 +241,9 @@ class AlbaBackend(DataObject):
                     for osd_id, osd_data in slot_data['osds'].iteritems():
                         if osd_data['status'] in [AlbaNode.OSD_STATUSES.OK, AlbaNode.OSD_STATUSES.WARNING] and osd_data.get('claimed_by') == self.guid:
                             osds[node_id] += 1
-        config = Configuration.get_configuration_path(self.abm_cluster.config_location)
+        config = self.abm_cluster.config_path
         presets = AlbaCLI.run(command='list-presets', config=config)
+        global_disks = sum(self.local_summary['devices'].values()) if self.scaling == AlbaBackend.SCALINGS.GLOBAL else 0
         preset_dict = {}
         for preset in presets:
             preset_dict[preset['name']] = preset
@@ -198,7 +259,7 @@ class AlbaBackend(DataObject):
                 is_available = False
                 available_disks = 0
                 if self.scaling == AlbaBackend.SCALINGS.GLOBAL:
-                    available_disks += sum(self.local_summary['devices'].values())
+                    available_disks += global_disks
                 if self.scaling == AlbaBackend.SCALINGS.LOCAL:
                     available_disks += sum(min(osds[node], policy[3]) for node in osds)
                 if available_disks >= policy[2]:
@@ -209,24 +270,70 @@ class AlbaBackend(DataObject):
                 preset['is_available'] |= is_available
             if active_policy is not None:
                 preset['policy_metadata'][active_policy]['is_active'] = True
-        for namespace in self.ns_data:
-            if namespace['namespace']['state'] != 'active':
-                continue
-            policy_usage = namespace['statistics']['bucket_count']
-            preset = preset_dict[namespace['namespace']['preset_name']]
-            for usage in policy_usage:
-                used_policy = tuple(usage[0])  # Policy as reported to be "in use"
-                for configured_policy in preset['policies']:  # All configured policies
-                    if used_policy[0] == configured_policy[0] and used_policy[1] == configured_policy[1] and used_policy[3] <= configured_policy[3]:
-                        preset['policy_metadata'][configured_policy]['in_use'] = True
-                        break
+            preset['policy_index'] = self._build_policy_index(preset['policies'])
+        with closing(self._iterate_namespaces()) as namespaces:
+            used_policies = self._get_used_policies(namespaces)
+        for preset_name, used_policy in used_policies:
+            configured_policy = self._match_policy(preset_dict[preset_name]['policy_index'], used_policy)
+            if configured_policy is not None:
+                preset_dict[preset_name]['policy_metadata'][configured_policy]['in_use'] = True
         for preset in presets:
+            del preset['policy_index']
             preset['policies'] = [str(policy) for policy in preset['policies']]
             for key in preset['policy_metadata'].keys():
                 preset['policy_metadata'][str(key)] = preset['policy_metadata'][key]
                 del preset['policy_metadata'][key]
         return presets
 
+    @staticmethod
+    def _build_policy_index(policies):
+        """
+        Index the configured policies of a preset on their k and m values
+        :param policies: The configured policies (k, m, c, x), in order of preference
+        :type policies: list[tuple]
+        :return: The configured policies per (k, m), in order of preference, as (x, policy) tuples
+        :rtype: dict
+        """
+        index = {}
+        for policy in policies:
+            index.setdefault((policy[0], policy[1]), []).append((policy[3], policy))
+        return index
+
+    @staticmethod
+    def _match_policy(policy_index, used_policy):
+        """
+        Retrieve the first configured policy a policy in use belongs to: same k and m and at least the used max disks per node
+        :param policy_index: Index of the configured policies, see _build_policy_index
+        :type policy_index: dict
+        :param used_policy: Policy as reported to be in use (k, m, c, x)
+        :type used_policy: tuple
+        :return: The configured policy or None if no configured policy matches
+        :rtype: tuple
+        """
+        for max_disks_per_node, configured_policy in policy_index.get((used_policy[0], used_policy[1]), []):
+            if used_policy[3] <= max_disks_per_node:
+                return configured_policy
+        return None
+
+    @staticmethod
+    def _get_used_policies(namespaces):
+        """
+        Aggregate the policies in use by the active namespaces in a single pass
+        Many namespaces share the same preset and policies, so matching is only required once per distinct combination
+        :param namespaces: The namespaces, as returned by 'show-namespaces'
+        :type namespaces: list
+        :return: The distinct (preset name, used policy) combinations
+        :rtype: set
+        """
+        used_policies = set()
+        for namespace in namespaces:
+            if namespace['namespace']['state'] != 'active':
+                continue
+            preset_name = namespace['namespace']['preset_name']
+            for usage in namespace['statistics']['bucket_count']:
+                used_policies.add((preset_name, tuple(usage[0])))  # Policy as reported to be "in use"
+        return used_policies
+
     def _available(self):
         """
         Returns True if the Backend can be used
@@ -247,7 +354,7 @@ class AlbaBackend(DataObject):
         if self.abm_cluster is None:
             return statistics  # No ABM cluster yet, so backend not fully installed yet
         try:
-            config = Configuration.get_configuration_path(self.abm_cluster.config_location)
+            config = self.abm_cluster.config_path
             # TODO: This will need to be changed to osd-multistatistics, see openvstorage/alba#749
             raw_statistics = AlbaCLI.run(command='asd-multistatistics', config=config, extra_params=['--all'])
         except RuntimeError:
@@ -357,6 +464,7 @@ class AlbaBackend(DataObject):
             thread.join()
         return return_value
 
+    @AlbaBackendMaterializer.serve
     def _local_summary(self):
         """
         A local summary for an ALBA Backend containing information used to show in the GLOBAL ALBA Backend detail page
@@ -415,6 +523,7 @@ class AlbaBackend(DataObject):
 
         return return_value
 
+    @AlbaBackendMaterializer.serve
     def _live_status(self):
         """
         Retrieve the live status of the ALBA Backend to be displayed in the 'Backends' page in the GUI based on:
@@ -29,10 +29,14 @@ from ovs.dal.hybrids.storagerouter import StorageRouter
 from ovs.dal.structures import Dynamic, Property, Relation
 from ovs.extensions.generic.configuration import Configuration, NotFoundException
 from ovs_extensions.generic.exceptions import InvalidCredentialsError
-from ovs.extensions.plugins.albacli import AlbaCLI, AlbaError
+from ovs.extensions.plugins.albacli import AlbaError
+from ovs.extensions.plugins.albaclaimcache import AlbaOSDClaimCache
+from ovs.extensions.plugins.albaosdinventory import AlbaOSDInventory
+from ovs.extensions.plugins.albaosdstatus import AlbaOSDStatusEvaluator
 from ovs.extensions.plugins.asdmanager import ASDManagerClient
 from ovs.extensions.plugins.genericmanager import GenericManagerClient
 from ovs.extensions.plugins.s3manager import S3ManagerClient
+from ovs.extensions.plugins.staledynamic import StaleDynamic
 from ovs.extensions.plugins.tests.alba_mockups import ManagerClientMockup
 
 
@@ -100,6 +104,13 @@ class AlbaNode(DataObject):
             self.client = self.CLIENTS[self.type](self)
         self._frozen = True
 
+    def invalidate_dynamics(self, properties=None):
+        """
+        Invalidates the dynamics, including the values served while they are being recalculated
+        """
+        StaleDynamic.invalidate(self, properties)
+        super(AlbaNode, self).invalidate_dynamics(properties)
+
     def _ips(self):
         """
         Returns the IPs of the node
@@ -112,10 +123,9 @@ class AlbaNode(DataObject):
         """
         services = {}
         try:
-            for service_name in self.client.list_maintenance_services():
+            for service_name, service_status in self.client.get_maintenance_service_statuses():
                 match = re.match('^alba-maintenance_(.*)-[a-zA-Z0-9]{16}$', service_name)
                 if match is not None:
-                    service_status = self.client.get_service_status(name=service_name)
                     backend_name = match.groups()[0]
                     if backend_name not in services:
                         services[backend_name] = []
@@ -124,6 +134,7 @@ class AlbaNode(DataObject):
             self._logger.exception('Unable to list the maintenance services')
         return services
 
+    @StaleDynamic.serve(max_staleness=60)
     def _stack(self):
         """
         Returns an overview of this node's storage stack
@@ -156,6 +167,7 @@ class AlbaNode(DataObject):
 
         model_osds = {}
         found_osds = {}
+        status_evaluator = AlbaOSDStatusEvaluator()
         # Apply own model to fetched stack
         for osd in self.osds:
             model_osds[osd.osd_id] = osd  # Initially set the info
@@ -174,10 +186,9 @@ class AlbaNode(DataObject):
                 if osd.alba_backend_guid not in found_osds:
                     found_osds[osd.alba_backend_guid] = {}
                     if osd.alba_backend.abm_cluster is not None:
-                        config = Configuration.get_configuration_path(osd.alba_backend.abm_cluster.config_location)
+                        config = osd.alba_backend.abm_cluster.config_path
                         try:
-                            for found_osd in AlbaCLI.run(command='list-all-osds', config=config):
-                                found_osds[osd.alba_backend_guid][found_osd['long_id']] = found_osd
+                            found_osds[osd.alba_backend_guid] = AlbaOSDInventory.get(config).by_long_id
                         except (AlbaError, RuntimeError):
                             self._logger.exception('Listing all osds has failed')
                             osd_data['status'] = self.OSD_STATUSES.UNKNOWN
@@ -188,24 +199,7 @@ class AlbaNode(DataObject):
                     # Not claimed by any backend thus not in use
                     continue
                 found_osd = found_osds[osd.alba_backend_guid][osd.osd_id]
-                if found_osd['decommissioned'] is True:
-                    osd_data['status'] = self.OSD_STATUSES.UNAVAILABLE
-                    osd_data['status_detail'] = self.OSD_STATUS_DETAILS.DECOMMISSIONED
-                    continue
-
-                backend_interval_key = '/ovs/alba/backends/{0}/gui_error_interval'.format(osd.alba_backend_guid)
-                if Configuration.exists(backend_interval_key):
-                    interval = Configuration.get(backend_interval_key)
-                else:
-                    interval = Configuration.get('/ovs/alba/backends/global_gui_error_interval')
-                read = found_osd['read'] or [0]
-                write = found_osd['write'] or [0]
-                errors = found_osd['errors']
-                osd_data['status'] = self.OSD_STATUSES.WARNING
-                osd_data['status_detail'] = self.OSD_STATUS_DETAILS.ERROR
-                if len(errors) == 0 or (len(read + write) > 0 and max(min(read), min(write)) > max(error[0] for error in errors) + interval):
-                    osd_data['status'] = self.OSD_STATUSES.OK
-                    osd_data['status_detail'] = ''
+                osd_data['status'], osd_data['status_detail'] = status_evaluator.evaluate(osd.alba_backend_guid, found_osd)
 
         statistics = {}
         for slot_info in stack.itervalues():
@@ -218,16 +212,7 @@ class AlbaNode(DataObject):
                     # In that case, let's connect to the OSD to see whether we get some info from it
                     try:
                         ips = osd['hosts'] if 'hosts' in osd and len(osd['hosts']) > 0 else osd.get('ips', [])
-                        port = osd['port']
-                        claimed_by = 'unknown'
-                        for ip in ips:
-                            try:
-                                # Output will be None if it is not claimed
-                                claimed_by = AlbaCLI.run('get-osd-claimed-by',
-                                                         named_params={'host': ip, 'port': port})
-                                break
-                            except (AlbaError, RuntimeError):
-                                self._logger.warning('get-osd-claimed-by failed for IP:port {0}:{1}'.format(ip, port))
+                        claimed_by = AlbaOSDClaimCache.get_claimed_by(ips=ips, port=osd['port'])
                         alba_backend = AlbaBackendList.get_by_alba_id(claimed_by)
                         osd['claimed_by'] = alba_backend.guid if alba_backend is not None else claimed_by
                     except KeyError:
@@ -306,7 +291,7 @@ class AlbaNode(DataObject):
         read_only = False
         if self.type in [AlbaNode.NODE_TYPES.GENERIC, AlbaNode.NODE_TYPES.ASD]:
             try:
-                read_only = self.client.get_metadata()['_version'] < 3
+                read_only = self.client.get_api_version() < 3
             except (requests.ConnectionError, requests.Timeout, InvalidCredentialsError):
                 # When down, nothing can be edited.
                 self._logger.warning('Error during stack retrieval. Assuming that the node is down and disabling read_only because nothing can be done')
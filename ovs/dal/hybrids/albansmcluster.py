@@ -20,6 +20,7 @@ NSMCluster module
 from ovs.dal.dataobject import DataObject
 from ovs.dal.structures import Property, Relation
 from ovs.dal.hybrids.albabackend import AlbaBackend
+from ovs.extensions.plugins.configpathresolver import ConfigPathResolver
 
 
 class NSMCluster(DataObject):
@@ -37,3 +38,12 @@ class NSMCluster(DataObject):
                     Property('config_location', str, unique=True, doc='Location of the ALBA Namespace Manager Arakoon configuration')]
     __relations = [Relation('alba_backend', AlbaBackend, 'nsm_clusters')]
     __dynamics = []
+
+    @property
+    def config_path(self):
+        """
+        The configuration path of this cluster as passed to ALBA, eg: 'arakoon://config/ovs/arakoon/mybackend-nsm_0/config?ini=...'
+        The resolved path is memoized process-wide
+        :rtype: str
+        """
+        return ConfigPathResolver.resolve(self.config_location)
@@ -17,13 +17,12 @@
 """
 AlbaOSD module
 """
-import time
 from ovs.dal.dataobject import DataObject
 from ovs.dal.hybrids.albabackend import AlbaBackend
 from ovs.dal.hybrids.albanode import AlbaNode
 from ovs.dal.hybrids.domain import Domain
 from ovs.dal.structures import Property, Relation, Dynamic
-from ovs.extensions.storage.volatilefactory import VolatileFactory
+from ovs.extensions.plugins.albastatistics import AlbaStatistics
 
 
 class AlbaOSD(DataObject):
@@ -48,47 +47,8 @@ class AlbaOSD(DataObject):
         """
         Loads statistics from the ASD
         """
-        data_keys = {'apply': ['Apply', 'Apply2'],
-                     'multi_get': ['MultiGet', 'MultiGet2'],
-                     'range': ['Range'],
-                     'range_entries': ['RangeEntries'],
-                     'statistics': ['Statistics']}
-        volatile = VolatileFactory.get_client()
-        prev_key = '{0}_{1}'.format(self._key, 'statistics_previous')
-        previous_stats = volatile.get(prev_key, default={})
         try:
-            all_statistics = self.alba_backend.osd_statistics
-            if self.osd_id not in all_statistics:
-                return {}
-            data = all_statistics[self.osd_id]
-            statistics = {'timestamp': time.time()}
-            delta = statistics['timestamp'] - previous_stats.get('timestamp', statistics['timestamp'])
-            for key, sources in data_keys.iteritems():
-                if key not in statistics:
-                    statistics[key] = {'n': 0, 'max': [], 'min': [], 'avg': []}
-                for source in sources:
-                    if source in data:
-                        statistics[key]['n'] += data[source]['n']
-                        statistics[key]['max'].append(data[source]['max'])
-                        statistics[key]['min'].append(data[source]['min'])
-                        statistics[key]['avg'].append(data[source]['avg'] * data[source]['n'])
-                statistics[key]['max'] = max(statistics[key]['max']) if len(statistics[key]['max']) > 0 else 0
-                statistics[key]['min'] = min(statistics[key]['min']) if len(statistics[key]['min']) > 0 else 0
-                if statistics[key]['n'] > 0:
-                    statistics[key]['avg'] = sum(statistics[key]['avg']) / float(statistics[key]['n'])
-                else:
-                    statistics[key]['avg'] = 0
-                if key in previous_stats:
-                    if delta < 0:
-                        statistics[key]['n_ps'] = 0
-                    elif delta == 0:
-                        statistics[key]['n_ps'] = previous_stats[key].get('n_ps', 0)
-                    else:
-                        statistics[key]['n_ps'] = max(0, (statistics[key]['n'] - previous_stats[key]['n']) / delta)
-                else:
-                    statistics[key]['n_ps'] = 0
-            volatile.set(prev_key, statistics, dynamic.timeout * 10)
-            return statistics
+            return AlbaStatistics.get_osd_statistics(self.alba_backend, dynamic.timeout).get(self.osd_id, {})
         except Exception:
             # This might fail every now and then, e.g. on disk removal. Let's ignore for now.
             return {}
@@ -19,6 +19,7 @@ ABMCluster module
 """
 from ovs.dal.dataobject import DataObject
 from ovs.dal.structures import Property
+from ovs.extensions.plugins.configpathresolver import ConfigPathResolver
 
 
 class S3TransactionCluster(DataObject):
@@ -34,3 +35,12 @@ class S3TransactionCluster(DataObject):
                     Property('config_location', str, unique=True, doc='Location of the Arakoon configuration')]
     __relations = []
     __dynamics = []
+
+    @property
+    def config_path(self):
+        """
+        The configuration path of this cluster as passed to ALBA, eg: 'arakoon://config/ovs/arakoon/s3_transaction/config?ini=...'
+        The resolved path is memoized process-wide
+        :rtype: str
+        """
+        return ConfigPathResolver.resolve(self.config_location)
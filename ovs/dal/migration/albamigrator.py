@@ -92,6 +92,7 @@ class DALMigrator(object):
             from ovs.extensions.generic.configuration import Configuration, NotFoundException
             from ovs_extensions.generic.toolbox import ExtensionsToolbox
             from ovs.extensions.plugins.albacli import AlbaCLI
+            from ovs.extensions.plugins.configpathresolver import ConfigPathResolver
             from ovs.extensions.storage.persistentfactory import PersistentFactory
 
             # Migrate unique constraints & indexes
@@ -341,5 +342,7 @@ class DALMigrator(object):
                             nsm.save()
             except Exception as ex:
                 DALMigrator._logger.info('Unexpected error occurred in updating abm- and nsm clusters config location: {0}'.format(ex))
+            finally:
+                ConfigPathResolver.invalidate()
 
         return DALMigrator.THIS_VERSION
@@ -30,6 +30,8 @@ from ovs.dal.hybrids.service import Service
 from ovs.dal.hybrids.servicetype import ServiceType
 from ovs.dal.lists.servicetypelist import ServiceTypeList
 from ovs.dal.tests.helpers import DalHelper
+from ovs.extensions.plugins.albastatistics import AlbaStatistics
+from ovs.extensions.plugins.configpathresolver import ConfigPathResolver
 from ovs.extensions.plugins.tests.alba_mockups import ManagerClientMockup, VirtualAlbaBackend
 from ovs.lib.alba import AlbaController
 
@@ -66,6 +68,8 @@ class AlbaDalHelper(object):
         ManagerClientMockup.clean_data()
         # noinspection PyProtectedMember
         VirtualAlbaBackend.clean_data()
+        ConfigPathResolver.invalidate()
+        AlbaStatistics.reset()
 
     @staticmethod
     def build_dal_structure(structure, previous_structure=None):
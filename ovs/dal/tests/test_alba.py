@@ -18,12 +18,21 @@
 Basic test module
 """
 import copy
+import json
 import time
 import requests
 import unittest
+from ovs.dal.hybrids.albabackend import AlbaBackend
 from ovs.dal.hybrids.albaosd import AlbaOSD
+from ovs.constants.albanode import NODE_BREAKER_COOLDOWN, NODE_BREAKER_FAILURES
 from ovs.dal.tests.alba_helpers import AlbaDalHelper
+from ovs.extensions.plugins.albacircuitbreaker import AlbaNodeCircuitBreaker, NodeUnreachableError
+from ovs.extensions.plugins.albaclistream import IncompleteDataError, JSONArrayStream
+from ovs.extensions.plugins.albamaterializer import AlbaBackendMaterializer
+from ovs.extensions.plugins.albastatistics import AlbaStatistics, AlbaStatisticsBuffer
 from ovs.extensions.plugins.tests.alba_mockups import ManagerClientMockup, VirtualAlbaBackend
+from ovs.extensions.storage.volatilefactory import VolatileFactory
+from ovs.lib.alba import AlbaController
 
 
 class Alba(unittest.TestCase):
@@ -52,6 +61,7 @@ class Alba(unittest.TestCase):
         * Add keys that were not passed in
         * Collapse certain keys
         * Calculate correct per-second, average, total, min and max values
+        * Calculate the min and max per-second values over the window of samples
         """
         structure = AlbaDalHelper.build_dal_structure({
             'alba_backends': [[1, 'LOCAL']],
@@ -63,17 +73,17 @@ class Alba(unittest.TestCase):
         osd = structure['alba_osds'][1]
         base_time = time.time()
 
-        expected_0 = {'statistics': {'max': 0, 'n_ps': 0, 'min': 0, 'avg': 0, 'n': 0},
-                      'range': {'max': 0, 'n_ps': 0, 'min': 0, 'avg': 0, 'n': 0},
-                      'range_entries': {'max': 0, 'n_ps': 0, 'min': 0, 'avg': 0, 'n': 0},
-                      'multi_get': {'max': 10, 'n_ps': 0, 'min': 1, 'avg': 13, 'n': 5},
-                      'apply': {'max': 5, 'n_ps': 0, 'min': 5, 'avg': 5, 'n': 1},
+        expected_0 = {'statistics': {'max': 0, 'n_ps': 0, 'n_ps_min': 0, 'n_ps_max': 0, 'min': 0, 'avg': 0, 'n': 0},
+                      'range': {'max': 0, 'n_ps': 0, 'n_ps_min': 0, 'n_ps_max': 0, 'min': 0, 'avg': 0, 'n': 0},
+                      'range_entries': {'max': 0, 'n_ps': 0, 'n_ps_min': 0, 'n_ps_max': 0, 'min': 0, 'avg': 0, 'n': 0},
+                      'multi_get': {'max': 10, 'n_ps': 0, 'n_ps_min': 0, 'n_ps_max': 0, 'min': 1, 'avg': 13, 'n': 5},
+                      'apply': {'max': 5, 'n_ps': 0, 'n_ps_min': 0, 'n_ps_max': 0, 'min': 5, 'avg': 5, 'n': 1},
                       'timestamp': None}
-        expected_1 = {'statistics': {'max': 0, 'n_ps': 0, 'min': 0, 'avg': 0, 'n': 0},
-                      'range': {'max': 0, 'n_ps': 0, 'min': 0, 'avg': 0, 'n': 0},
-                      'range_entries': {'max': 0, 'n_ps': 0, 'min': 0, 'avg': 0, 'n': 0},
-                      'multi_get': {'max': 10, 'n_ps': 1, 'min': 1, 'avg': 12.5, 'n': 10},
-                      'apply': {'max': 5, 'n_ps': 0, 'min': 5, 'avg': 5, 'n': 1},
+        expected_1 = {'statistics': {'max': 0, 'n_ps': 0, 'n_ps_min': 0, 'n_ps_max': 0, 'min': 0, 'avg': 0, 'n': 0},
+                      'range': {'max': 0, 'n_ps': 0, 'n_ps_min': 0, 'n_ps_max': 0, 'min': 0, 'avg': 0, 'n': 0},
+                      'range_entries': {'max': 0, 'n_ps': 0, 'n_ps_min': 0, 'n_ps_max': 0, 'min': 0, 'avg': 0, 'n': 0},
+                      'multi_get': {'max': 10, 'n_ps': 1, 'n_ps_min': 1, 'n_ps_max': 1, 'min': 1, 'avg': 12.5, 'n': 10},
+                      'apply': {'max': 5, 'n_ps': 0, 'n_ps_min': 0, 'n_ps_max': 0, 'min': 5, 'avg': 5, 'n': 1},
                       'timestamp': None}
 
         VirtualAlbaBackend.statistics = {'alba_osd_1': {'success': True,
@@ -92,6 +102,124 @@ class Alba(unittest.TestCase):
         expected_1['timestamp'] = base_time + 5
         self.assertDictEqual(statistics, expected_1, 'The second statistics should be as expected: {0} vs {1}'.format(statistics, expected_1))
 
+    def test_statistics_cached_sample(self):
+        """
+        Validates whether samples taken out of the same cached 'asd-multistatistics' output are ignored
+        Otherwise they would result in a zero rate, followed by a rate over a too short interval
+        """
+        structure = AlbaDalHelper.build_dal_structure({
+            'alba_backends': [[1, 'LOCAL']],
+            'alba_abm_clusters': [1],
+            'alba_nsm_clusters': [(1, 1)],  # (<abackend_id>, <amount_of_nsm_clusters>)
+            'alba_nodes': [1],
+            'alba_osds': [(1, 1, 1, 1)]  # (<osd_id>, <abackend_id>, <anode_id> <slot_id>)
+        })
+        osd = structure['alba_osds'][1]
+        VirtualAlbaBackend.statistics = {'alba_osd_1': {'success': True,
+                                                        'result': {'MultiGet': {'n': 5, 'avg': 10, 'min': 5, 'max': 10}}}}
+        osd._statistics(AlbaOSD._dynamics[0])
+        time.sleep(2)
+        AlbaStatistics.reset()  # Another process samples the cached 'osd_statistics'
+        VirtualAlbaBackend.statistics = {'alba_osd_1': {'success': True,
+                                                        'result': {'MultiGet': {'n': 11, 'avg': 10, 'min': 5, 'max': 10}}}}
+        statistics = osd._statistics(AlbaOSD._dynamics[0])
+        self.assertEqual(statistics['multi_get']['n'], 5)
+        time.sleep(4)
+        AlbaStatistics.reset()
+        statistics = osd._statistics(AlbaOSD._dynamics[0])
+        self.assertEqual(statistics['multi_get']['n'], 11)
+        self.assertDictContainsSubset({'n_ps': 1, 'n_ps_min': 1, 'n_ps_max': 1}, statistics['multi_get'])
+
+    def test_statistics_window(self):
+        """
+        Validates whether the rates are computed correctly out of the ring buffer of samples
+        * Only the last samples are kept once the buffer wraps around
+        * Decreasing counters do not result in negative rates and missing samples do not produce a rate
+        * Slightly older samples are ignored, much older samples clear the buffer
+        * Rates of several buffers are combined on the time of their samples
+        """
+        def _rates(n_ps, n_ps_min, n_ps_max):
+            return {'n': {'n_ps': n_ps, 'n_ps_min': n_ps_min, 'n_ps_max': n_ps_max}}
+
+        buffer_ = AlbaStatisticsBuffer(osd_ids=['osd_1', 'osd_2'], keys=['n'], size=3)
+        self.assertDictEqual(buffer_.get_rates(['osd_1']), _rates(0, 0, 0))
+        for timestamp, value in [(100, 0), (105, 10), (110, 30), (115, 30), (120, 60)]:
+            buffer_.add(timestamp, {'osd_1': {'n': value}, 'osd_2': {'n': value * 2}})
+        self.assertListEqual([buffer_.timestamps[slot] for slot in buffer_._get_slots()], [110, 115, 120])
+        self.assertDictEqual(buffer_.get_rates(['osd_1']), _rates(3, 0, 6))
+        self.assertDictEqual(buffer_.get_rates(['osd_1', 'osd_2', 'osd_3']), _rates(9, 0, 18))
+        self.assertDictEqual(buffer_.get_rates_per_osd()['osd_2'], _rates(6, 0, 12))
+
+        buffer_.add(125, {'osd_1': {'n': 5}})  # OSD 1 restarted, OSD 2 did not report
+        self.assertDictEqual(buffer_.get_rates_per_osd(), {'osd_1': _rates(3, 0, 6), 'osd_2': _rates(12, 12, 12)})
+
+        buffer_.add(123, {'osd_1': {'n': 1000}})
+        self.assertEqual(buffer_.timestamps[buffer_.position], 125)
+        self.assertDictEqual(buffer_.get_rates(['osd_1']), _rates(3, 0, 6))
+        buffer_.add(110, {'osd_1': {'n': 1000}})
+        self.assertListEqual(buffer_._get_slots(), [buffer_.position])
+        self.assertDictEqual(buffer_.get_rates(['osd_1']), _rates(0, 0, 0))
+
+        restored = AlbaStatisticsBuffer.from_blob(blob=buffer_.to_blob(), osd_ids=['osd_1', 'osd_3'], keys=['n'], size=3)
+        restored.add(120 + AlbaStatisticsBuffer.CLOCK_SKEW_TOLERANCE * 2, {'osd_1': {'n': 1020}, 'osd_3': {'n': 1}})
+        self.assertDictEqual(restored.get_rates_per_osd(), {'osd_1': _rates(1, 1, 1), 'osd_3': _rates(0, 0, 0)})
+
+        other = AlbaStatisticsBuffer(osd_ids=['osd_4'], keys=['n'], size=3)
+        other.add(110, {'osd_4': {'n': 0}})
+        other.add(130, {'osd_4': {'n': 100}})
+        self.assertDictEqual(AlbaStatisticsBuffer.get_combined_rates([restored, other], ['osd_1', 'osd_4']), _rates(6, 6, 6))
+        self.assertDictEqual(AlbaStatisticsBuffer._summarize(3, {}), {'n_ps': 3, 'n_ps_min': 0, 'n_ps_max': 0})
+        self.assertDictEqual(AlbaStatisticsBuffer._summarize(3, {110: 1, 115: 5}), {'n_ps': 3, 'n_ps_min': 1, 'n_ps_max': 5})
+
+    def test_circuit_breaker(self):
+        """
+        Validates the transitions of the circuit breaker of a node
+        * Closed: calls are allowed until the consecutive failures reach the threshold
+        * Open: calls are short-circuited until the cooldown passed
+        * Half-open: a single call probes the node, its outcome closes or re-opens the breaker
+        """
+        def _age(seconds):
+            node = AlbaNodeCircuitBreaker._nodes[key]
+            node['opened'] -= seconds
+            if node['probing'] is not None:
+                node['probing'] -= seconds
+
+        ip, port = '10.100.1.1', 8500
+        key = (ip, port)
+        AlbaNodeCircuitBreaker.reset()
+        self.addCleanup(AlbaNodeCircuitBreaker.reset)
+        for _ in xrange(NODE_BREAKER_FAILURES - 1):
+            AlbaNodeCircuitBreaker.before_call(ip, port)
+            AlbaNodeCircuitBreaker.record_failure(ip, port)
+        self.assertEqual(AlbaNodeCircuitBreaker.get_state(ip, port), AlbaNodeCircuitBreaker.CLOSED)
+        AlbaNodeCircuitBreaker.record_success(ip, port)  # Failures have to be consecutive
+        for _ in xrange(NODE_BREAKER_FAILURES):
+            AlbaNodeCircuitBreaker.before_call(ip, port)
+            AlbaNodeCircuitBreaker.record_failure(ip, port)
+        self.assertEqual(AlbaNodeCircuitBreaker.get_state(ip, port), AlbaNodeCircuitBreaker.OPEN)
+        with self.assertRaises(NodeUnreachableError):
+            AlbaNodeCircuitBreaker.before_call(ip, port)
+        self.assertIsInstance(NodeUnreachableError(), requests.ConnectionError)
+        AlbaNodeCircuitBreaker.before_call('10.100.1.2', port)  # Other nodes are not affected
+
+        _age(NODE_BREAKER_COOLDOWN)
+        self.assertEqual(AlbaNodeCircuitBreaker.get_state(ip, port), AlbaNodeCircuitBreaker.HALF_OPEN)
+        AlbaNodeCircuitBreaker.before_call(ip, port)  # The probe
+        with self.assertRaises(NodeUnreachableError):
+            AlbaNodeCircuitBreaker.before_call(ip, port)  # Only a single probe at a time
+        AlbaNodeCircuitBreaker.record_failure(ip, port)
+        self.assertEqual(AlbaNodeCircuitBreaker.get_state(ip, port), AlbaNodeCircuitBreaker.OPEN)
+        with self.assertRaises(NodeUnreachableError):
+            AlbaNodeCircuitBreaker.before_call(ip, port)
+
+        _age(NODE_BREAKER_COOLDOWN)
+        AlbaNodeCircuitBreaker.before_call(ip, port)
+        _age(NODE_BREAKER_COOLDOWN)
+        AlbaNodeCircuitBreaker.before_call(ip, port)  # A probe which never reported back is replaced
+        AlbaNodeCircuitBreaker.record_success(ip, port)
+        self.assertEqual(AlbaNodeCircuitBreaker.get_state(ip, port), AlbaNodeCircuitBreaker.CLOSED)
+        AlbaNodeCircuitBreaker.before_call(ip, port)
+
     def test_node_stack(self):
         # alba backend local stack is derived from the node stack. Testing this one instead
         self.maxDiff = None
@@ -240,3 +368,120 @@ class Alba(unittest.TestCase):
             expected['alba_slot_1'].pop(key)
         node.invalidate_dynamics()
         self.assertDictEqual(node._stack(), expected)
+
+    def test_preset_policy_matching(self):
+        """
+        Validates whether the policies in use by the namespaces are matched onto the configured policies of their preset
+        * Only active namespaces are taken into account
+        * A used policy belongs to the first configured policy with the same k and m and at least the same max disks per node
+        """
+        policies = [(5, 4, 8, 3), (2, 2, 3, 4), (2, 2, 3, 2), (1, 2, 3, 4)]
+        policy_index = AlbaBackend._build_policy_index(policies)
+        self.assertEqual(AlbaBackend._match_policy(policy_index, (2, 2, 3, 3)), (2, 2, 3, 4))
+        self.assertEqual(AlbaBackend._match_policy(policy_index, (5, 4, 8, 3)), (5, 4, 8, 3))
+        self.assertIsNone(AlbaBackend._match_policy(policy_index, (5, 4, 8, 4)))
+        self.assertIsNone(AlbaBackend._match_policy(policy_index, (3, 2, 3, 1)))
+
+        namespaces = [{'namespace': {'state': 'active', 'preset_name': 'preset_1'},
+                       'statistics': {'bucket_count': [[[2, 2, 3, 3], 10], [[5, 4, 8, 3], 1]]}},
+                      {'namespace': {'state': 'active', 'preset_name': 'preset_1'},
+                       'statistics': {'bucket_count': [[[2, 2, 3, 3], 5]]}},
+                      {'namespace': {'state': 'deleting', 'preset_name': 'preset_2'},
+                       'statistics': {'bucket_count': [[[1, 2, 3, 4], 5]]}}]
+        self.assertSetEqual(AlbaBackend._get_used_policies(namespaces), {('preset_1', (2, 2, 3, 3)), ('preset_1', (5, 4, 8, 3))})
+
+    def test_namespace_stream(self):
+        """
+        Validates whether the items of the 'show-namespaces' output are parsed correctly, regardless of how the output is chunked
+        * Items split over chunk boundaries (down to a single byte per chunk)
+        * Strings containing escaped quotes, brackets and commas
+        * Nested arrays and objects
+        * Top-level keys passed before the path are kept, an empty or missing array yields nothing
+        * Truncated output raises
+        """
+        def _chunk(data, size):
+            return (data[index:index + size] for index in xrange(0, len(data), size))
+
+        items = [{'name': 'ns_"1"]', 'statistics': {'bucket_count': [[[2, 2, 3, 3], 10], [[5, 4, 8, 3], 1]]}},
+                 {'name': 'ns,\\2\u00e9', 'values': [[], [[]], {}, None, True, -1.5e3]},
+                 12345,
+                 'plain']
+        document = json.dumps({'success': True, 'result': [len(items), items]}, sort_keys=True)
+        for size in [1, 2, 3, 7, 64, len(document)]:
+            stream = JSONArrayStream(chunks=_chunk(document, size), path=['result', 1])
+            self.assertListEqual(list(stream), items)
+            self.assertDictEqual(stream.skipped, {})  # 'result' is sorted before 'success'
+
+        document = '  {"error": {"message": "Unknown, \\"]"}, "result": [0, [ ] ] }'
+        stream = JSONArrayStream(chunks=_chunk(document, 5), path=['result', 1])
+        self.assertListEqual(list(stream), [])
+        self.assertDictEqual(stream.skipped, {'error': {'message': 'Unknown, "]'}})
+
+        stream = JSONArrayStream(chunks=['{"success": false, "error": {"exception_code": 1}}'], path=['result', 1])
+        self.assertListEqual(list(stream), [])
+        self.assertDictEqual(stream.skipped, {'success': False, 'error': {'exception_code': 1}})
+
+        stream = JSONArrayStream(chunks=_chunk(document.replace('[ ]', '[1, 2, 3]')[:-6], 4), path=['result', 1])
+        with self.assertRaises(IncompleteDataError):
+            list(stream)
+
+    def test_materialized_dynamics(self):
+        """
+        Validates whether the materialized ALBA Backend dynamics are served as expected
+        * Dynamics are computed on the fly as long as nothing has been materialized
+        * Only the dynamics read within the read window are materialized
+        * Materialized values are served up to their maximum age
+        * Invalidating the dynamics drops the materialized values
+        """
+        structure = AlbaDalHelper.build_dal_structure({
+            'alba_backends': [[1, 'LOCAL']],
+            'alba_abm_clusters': [1]
+        })
+        alba_backend = structure['alba_backends'][1]
+        volatile = VolatileFactory.get_client()
+
+        def _set_size(size):
+            VirtualAlbaBackend.claimed_osds = [{'total': size, 'used': 10}]
+
+        def _get_materialized():
+            # noinspection PyProtectedMember
+            entry = volatile.get(AlbaBackendMaterializer._get_key(alba_backend.guid))
+            return None if entry is None else entry['values']
+
+        # Nothing materialized yet
+        _set_size(100)
+        self.assertIsNone(AlbaBackendMaterializer.get_version(alba_backend.guid))
+        self.assertEqual(alba_backend._usages()['size'], 100)
+
+        # Only the dynamics which have been read are materialized and served from then on
+        _set_size(200)
+        self.assertDictEqual(AlbaController.materialize_backends(), {alba_backend.guid: 1})
+        self.assertDictEqual(_get_materialized(), {'usages': {'free': 190.0, 'size': 200.0, 'used': 10.0}})
+        _set_size(300)
+        self.assertEqual(alba_backend._usages()['size'], 200)
+        self.assertDictEqual(AlbaController.materialize_backends(), {alba_backend.guid: 2})
+        self.assertEqual(alba_backend._usages()['size'], 300)
+
+        # Materialized values which exceed the maximum age are no longer served
+        time.sleep(AlbaBackendMaterializer.MAX_AGE)
+        _set_size(400)
+        self.assertEqual(alba_backend._usages()['size'], 400)
+
+        # Invalidating drops the materialized values
+        AlbaController.materialize_backends()
+        _set_size(500)
+        self.assertEqual(alba_backend._usages()['size'], 400)
+        alba_backend.invalidate_dynamics('usages')
+        self.assertDictEqual(_get_materialized(), {})
+        self.assertEqual(alba_backend._usages()['size'], 500)
+        AlbaController.materialize_backends()
+        self.assertIn('usages', _get_materialized())
+        alba_backend.invalidate_dynamics()
+        self.assertIsNone(_get_materialized())
+        self.assertEqual(alba_backend._usages()['size'], 500)
+
+        # Dynamics which have not been read within the read window are no longer materialized
+        time.sleep(AlbaBackendMaterializer.READ_WINDOW)
+        AlbaController.materialize_backends()
+        self.assertDictEqual(_get_materialized(), {})
+        self.assertEqual(alba_backend._usages()['size'], 500)
@@ -18,6 +18,14 @@
 Generic module for calling the ASD-Manager
 """
 
+import os
+import time
+import requests
+from threading import Lock
+from ovs_extensions.constants import is_unittest_mode
+from ovs.constants.albanode import NODE_METADATA_TTL
+from ovs.extensions.plugins.albacircuitbreaker import AlbaNodeCircuitBreaker
+from ovs.extensions.plugins.albasessionpool import AlbaSessionPool
 from ovs.extensions.plugins.apiclient import APIClient
 
 
@@ -25,6 +33,10 @@ class AlbaBaseClient(APIClient):
     """
     Base Alba Manager Client
     """
+    BREAKER_EXEMPT_PREFIX = 'update/'  # Updating restarts the manager, aborting these calls is expected and must not open the breaker
+    _metadata_lock = Lock()
+    _metadata = {}  # {(ip, port): (timestamp, metadata)}, shared by all clients of the process
+    _metadata_pid = os.getpid()
 
     def __init__(self, node, timeout=None):
         # type: (AlbaNode, int) -> None
@@ -39,6 +51,36 @@ class AlbaBaseClient(APIClient):
         credentials = (self.node.username, self.node.password)
         super(AlbaBaseClient, self).__init__(self.node.ip, self.node.port, credentials, timeout)
 
+    def _call(self, *args, **kwargs):
+        # type: (*any, **any) -> any
+        """
+        Execute the API call through the keep-alive session of the node, see AlbaSessionPool
+        Calls to a node which failed to connect too many times are short-circuited, see AlbaNodeCircuitBreaker
+        The update calls bypass the breaker: the update flow relies on their own errors and they have to reach the node regardless
+        :return: Result of the API call
+        :rtype: any
+        :raises NodeUnreachableError: When the node is known to be unreachable
+        """
+        ip, port = self.node.ip, self.node.port
+        if 'method' in kwargs:
+            kwargs['method'] = AlbaSessionPool.get_method(ip, port, kwargs['method'])
+        elif len(args) > 0:
+            args = (AlbaSessionPool.get_method(ip, port, args[0]),) + args[1:]
+        url = kwargs['url'] if 'url' in kwargs else (args[1] if len(args) > 1 else '')
+        if url.startswith(self.BREAKER_EXEMPT_PREFIX):
+            return super(AlbaBaseClient, self)._call(*args, **kwargs)
+        AlbaNodeCircuitBreaker.before_call(ip, port)
+        try:
+            result = super(AlbaBaseClient, self)._call(*args, **kwargs)
+        except requests.ConnectionError:
+            AlbaNodeCircuitBreaker.record_failure(ip, port)
+            raise
+        except Exception:
+            AlbaNodeCircuitBreaker.record_success(ip, port)  # The node answered
+            raise
+        AlbaNodeCircuitBreaker.record_success(ip, port)
+        return result
+
     # Metadata
     def get_metadata(self, *args, **kwargs):
         # type: (*any, **any) -> dict
@@ -49,6 +91,37 @@ class AlbaBaseClient(APIClient):
         """
         raise NotImplementedError()
 
+    def get_api_version(self):
+        # type: () -> int
+        """
+        Gets the API version of the node. The metadata of the node is cached for NODE_METADATA_TTL seconds
+        Use get_metadata to verify whether the node is reachable
+        :return: The API version
+        :rtype: int
+        """
+        key = (self.node.ip, self.node.port)
+        with AlbaBaseClient._metadata_lock:
+            if AlbaBaseClient._metadata_pid != os.getpid():
+                AlbaBaseClient._metadata = {}
+                AlbaBaseClient._metadata_pid = os.getpid()
+            entry = AlbaBaseClient._metadata.get(key)
+        if entry is None or time.time() - entry[0] > NODE_METADATA_TTL:
+            entry = (time.time(), self.get_metadata())
+            if is_unittest_mode() is False:  # The results of the unittest clients change all the time
+                with AlbaBaseClient._metadata_lock:
+                    AlbaBaseClient._metadata[key] = entry
+        return entry[1]['_version']
+
+    def invalidate_metadata(self):
+        # type: () -> None
+        """
+        Drop the cached metadata of the node, eg: after its software has been updated
+        :return: None
+        :rtype: NoneType
+        """
+        with AlbaBaseClient._metadata_lock:
+            AlbaBaseClient._metadata.pop((self.node.ip, self.node.port), None)
+
     # Osds
     def restart_osd(self, slot_id, osd_id, *args, **kwargs):
         # type: (str, str, *any, **any) -> None
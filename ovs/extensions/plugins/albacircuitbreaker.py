@@ -0,0 +1,155 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA Node circuit breaker module
+"""
+import os
+import time
+import logging
+import requests
+from threading import Lock
+from ovs.constants.albanode import NODE_BREAKER_COOLDOWN, NODE_BREAKER_FAILURES
+
+
+class NodeUnreachableError(requests.ConnectionError):
+    """
+    Raised instead of calling a node which is known to be unreachable
+    Subclass of the ConnectionError so callers handle it like any other unreachable node
+    """
+    pass
+
+
+class AlbaNodeCircuitBreaker(object):
+    """
+    Process-wide circuit breaker per node endpoint, so a node which is down does not cost every caller a connect timeout
+    * Closed: calls are executed. After NODE_BREAKER_FAILURES consecutive connection failures, the breaker opens
+    * Open: calls raise a NodeUnreachableError right away, for NODE_BREAKER_COOLDOWN seconds
+    * Half-open: a single call probes the node while the other calls are still short-circuited. Its outcome closes or re-opens the breaker
+    Only connection failures count: a node which answers (even with an error) is reachable
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    _logger = logging.getLogger(__name__)
+    _lock = Lock()
+    _nodes = {}  # {(ip, port): {'failures': int, 'opened': float, 'probing': float}}
+    _pid = os.getpid()
+
+    @classmethod
+    def before_call(cls, ip, port):
+        # type: (str, int) -> None
+        """
+        Verify whether a call to the node can be executed
+        :param ip: IP of the node
+        :type ip: str
+        :param port: Port of the node
+        :type port: int
+        :return: None
+        :rtype: NoneType
+        :raises NodeUnreachableError: When the call is short-circuited
+        """
+        now = time.time()
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._nodes = {}
+                cls._pid = os.getpid()
+            node = cls._nodes.get((ip, port))
+            if node is None or node['opened'] is None:
+                return
+            if now - node['opened'] >= NODE_BREAKER_COOLDOWN and (node['probing'] is None or now - node['probing'] >= NODE_BREAKER_COOLDOWN):
+                node['probing'] = now  # This call probes the node. A probe which never reports back is replaced after the cooldown
+                return
+        raise NodeUnreachableError('ALBA Node {0}:{1} is unreachable, it failed {2} consecutive times'.format(ip, port, node['failures']))
+
+    @classmethod
+    def record_success(cls, ip, port):
+        # type: (str, int) -> None
+        """
+        Register that the node could be reached, closing its breaker
+        :param ip: IP of the node
+        :type ip: str
+        :param port: Port of the node
+        :type port: int
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            node = cls._nodes.pop((ip, port), None)
+        if node is not None and node['opened'] is not None:
+            cls._logger.info('ALBA Node {0}:{1} is reachable again'.format(ip, port))
+
+    @classmethod
+    def record_failure(cls, ip, port):
+        # type: (str, int) -> None
+        """
+        Register that the node could not be reached, opening its breaker after too many consecutive failures
+        :param ip: IP of the node
+        :type ip: str
+        :param port: Port of the node
+        :type port: int
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            node = cls._nodes.setdefault((ip, port), {'failures': 0, 'opened': None, 'probing': None})
+            node['failures'] += 1
+            node['probing'] = None
+            if node['opened'] is None and node['failures'] < NODE_BREAKER_FAILURES:
+                return
+            tripped = node['opened'] is None
+            node['opened'] = time.time()
+        if tripped is True:
+            cls._logger.warning('ALBA Node {0}:{1} failed {2} consecutive times, short-circuiting calls for {3}s'.format(ip, port, NODE_BREAKER_FAILURES, NODE_BREAKER_COOLDOWN))
+
+    @classmethod
+    def get_state(cls, ip, port):
+        # type: (str, int) -> str
+        """
+        Retrieve the state of the breaker of a node
+        :param ip: IP of the node
+        :type ip: str
+        :param port: Port of the node
+        :type port: int
+        :return: closed, open or half_open
+        :rtype: str
+        """
+        with cls._lock:
+            node = cls._nodes.get((ip, port))
+            if node is None or node['opened'] is None:
+                return cls.CLOSED
+            if time.time() - node['opened'] >= NODE_BREAKER_COOLDOWN:
+                return cls.HALF_OPEN
+            return cls.OPEN
+
+    @classmethod
+    def reset(cls, ip=None, port=None):
+        # type: (Optional[str], Optional[int]) -> None
+        """
+        Close the breaker of a node, eg: when it is known to be back
+        :param ip: IP of the node. None to close all breakers
+        :type ip: str
+        :param port: Port of the node
+        :type port: int
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            if ip is None:
+                cls._nodes = {}
+            else:
+                cls._nodes.pop((ip, port), None)
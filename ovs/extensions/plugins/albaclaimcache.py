@@ -0,0 +1,95 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA OSD claim cache module
+"""
+import os
+import time
+import logging
+from threading import Lock
+from ovs_extensions.constants import is_unittest_mode
+from ovs.constants.albanode import NODE_REQUEST_DEADLINE, OSD_CLAIM_TTL
+from ovs.extensions.plugins.albacli import AlbaCLI, AlbaError
+from ovs.extensions.plugins.boundedexecutor import NodeRequestExecutor
+
+
+class AlbaOSDClaimCache(object):
+    """
+    Caches by which ALBA Backend an OSD which is not in the model has been claimed, keyed on the IP and port of the OSD
+    * Unclaimed OSDs and OSDs which could not be reached are cached as well, so an unknown OSD is probed once every OSD_CLAIM_TTL seconds
+    * The IPs of an OSD are probed concurrently
+    """
+    UNKNOWN = 'unknown'
+
+    _logger = logging.getLogger(__name__)
+    _lock = Lock()
+    _entries = {}  # {(ip, port): (timestamp, claimed_by)}
+    _pid = os.getpid()
+
+    @classmethod
+    def get_claimed_by(cls, ips, port):
+        # type: (List[str], int) -> Optional[str]
+        """
+        Retrieve the ALBA ID of the ALBA Backend which claimed the OSD
+        :param ips: The IPs of the OSD
+        :type ips: list[str]
+        :param port: The port of the OSD
+        :type port: int
+        :return: The ALBA ID, None when the OSD is not claimed or 'unknown' when none of the IPs could be probed
+        :rtype: str
+        """
+        now = time.time()
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._entries = {}
+                cls._pid = os.getpid()
+            for ip in ips:
+                entry = cls._entries.get((ip, port))
+                if entry is not None and now - entry[0] < OSD_CLAIM_TTL:
+                    return entry[1]
+
+        claimed_by = cls.UNKNOWN
+        tasks = NodeRequestExecutor.map(function=lambda _ip: AlbaCLI.run('get-osd-claimed-by', named_params={'host': _ip, 'port': port}),
+                                        items=ips,
+                                        deadline=NODE_REQUEST_DEADLINE)
+        for ip, task in zip(ips, tasks):
+            if task.finished is False:
+                cls._logger.warning('get-osd-claimed-by timed out for IP:port {0}:{1}'.format(ip, port))
+            elif isinstance(task.exception, (AlbaError, RuntimeError)):
+                cls._logger.warning('get-osd-claimed-by failed for IP:port {0}:{1}'.format(ip, port))
+            elif task.exception is not None:
+                raise task.exception
+            else:
+                claimed_by = task.result  # Output will be None if it is not claimed
+                break
+
+        if is_unittest_mode() is False:  # The virtual ALBA Backends of the unittests are modified directly
+            with cls._lock:
+                for ip in ips:
+                    cls._entries[(ip, port)] = (now, claimed_by)
+        return claimed_by
+
+    @classmethod
+    def invalidate(cls):
+        # type: () -> None
+        """
+        Drop all cached claims, eg: after OSDs have been claimed or removed
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            cls._entries = {}
@@ -23,9 +23,22 @@ import json
 import time
 import select
 import logging
+import tempfile
+from contextlib import closing
 from subprocess import Popen, PIPE, CalledProcessError
+from threading import Lock
+from ovs.constants.albacli import ALBA_BINARY, CLI_DEFAULT_SETTINGS, CLI_READ_ONLY_COMMANDS, CLI_SETTINGS_CACHE_TIMEOUT, CLI_SETTINGS_KEY
 from ovs_extensions.constants import is_unittest_mode
+from ovs.extensions.generic.configuration import Configuration
 from ovs.extensions.generic.logger import Logger
+from ovs.extensions.plugins.albaclicache import AlbaCLICache
+from ovs.extensions.plugins.albaclimetrics import AlbaCLIMetrics
+from ovs.extensions.plugins.albaclimultiplexer import ProcessMultiplexer, ProcessTimeoutError, wait_readable
+from ovs.extensions.plugins.albaclilimiter import AlbaCLILimiter
+from ovs.extensions.plugins.albaclipool import AlbaCLIPool, AlbaCLIPoolError, AlbaCLITimeoutError
+from ovs.extensions.plugins.albaclirecorder import AlbaCLIRecorder
+from ovs.extensions.plugins.albaclirunner import execute as execute_command
+from ovs.extensions.plugins.albaclistream import JSONArrayStream
 
 
 class AlbaError(RuntimeError):
@@ -49,10 +62,72 @@ class AlbaError(RuntimeError):
         return '{0} - code: {1} - type: {2}'.format(self.message, self.error_code, self.exception_type)
 
 
+class AlbaCLISettings(object):
+    """
+    Settings of the ALBA CLI wrapper. Settings can be specified globally ('default') or per ABM cluster name
+    The settings are cached in process memory as they are consulted for every ALBA call
+    """
+    _lock = Lock()
+    _settings = None
+    _settings_timestamp = 0
+
+    @classmethod
+    def get(cls, config=None):
+        # type: (Optional[str]) -> dict
+        """
+        Retrieve the settings applicable for the given ALBA configuration location
+        :param config: The configuration location to be used, eg: 'arakoon://config/ovs/arakoon/mybackend-abm/config?ini=...'
+        :type config: str
+        :return: The applicable settings
+        :rtype: dict
+        """
+        with cls._lock:
+            if cls._settings is None or time.time() - cls._settings_timestamp > CLI_SETTINGS_CACHE_TIMEOUT:
+                try:
+                    cls._settings = Configuration.get(CLI_SETTINGS_KEY, default={})
+                except Exception:
+                    logging.getLogger(__name__).exception('Unable to retrieve the ALBA CLI settings')
+                    cls._settings = {}
+                cls._settings_timestamp = time.time()
+            stored_settings = cls._settings
+        settings = CLI_DEFAULT_SETTINGS.copy()
+        settings.update(stored_settings.get('default', {}))
+        cluster_name = cls.get_cluster_name(config)
+        if cluster_name is not None:
+            settings.update(stored_settings.get(cluster_name, {}))
+        return settings
+
+    @classmethod
+    def invalidate(cls):
+        # type: () -> None
+        """
+        Force the settings to be reloaded upon next usage
+        """
+        with cls._lock:
+            cls._settings = None
+
+    @staticmethod
+    def get_cluster_name(config):
+        # type: (Optional[str]) -> Optional[str]
+        """
+        Extract the Arakoon cluster name out of a configuration location
+        :param config: The configuration location, eg: 'arakoon://config/ovs/arakoon/mybackend-abm/config?ini=...'
+        :type config: str
+        :return: The cluster name or None if it could not be determined
+        :rtype: str
+        """
+        if config is None:
+            return None
+        match = re.search('/ovs/arakoon/([^/]+)/config', config)
+        return match.groups()[0] if match is not None else None
+
+
 class AlbaCLI(object):
     """
     Wrapper for 'alba' command line interface
     """
+    _replay = None  # Serves recorded responses instead of executing commands, see ovs.extensions.plugins.tests.alba_replay
+
     @staticmethod
     def run(command, config=None, named_params=None, extra_params=None, client=None, debug=False, to_json=True):
         """
@@ -89,80 +164,505 @@ class AlbaCLI(object):
             extra_params = []
 
         logger = logging.getLogger(__name__)
-        if is_unittest_mode():
-            # For the unittest, all commands are passed to a mocked Alba
+        if is_unittest_mode() and AlbaCLI._replay is None:
+            # For the unittest, all commands are passed to a mocked Alba (unless recorded responses are being replayed)
             from ovs.extensions.plugins.tests.alba_mockups import VirtualAlbaBackend
             named_params.update({'config': config})
             named_params.update({'extra_params': extra_params})
             return getattr(VirtualAlbaBackend, command.replace('-', '_'))(**named_params)
 
         debug_log = []
+        output = None
+        start = time.time()
+        cluster_name = AlbaCLISettings.get_cluster_name(config)
         try:
-            if to_json is True:
-                extra_options = ["--to-json"]
-            else:
-                extra_options = []
-            cmd_list = ['/usr/bin/alba', command] + extra_options
-            if config is not None:
-                cmd_list.append('--config={0}'.format(config))
-            for key, value in named_params.iteritems():
-                cmd_list.append('--{0}={1}'.format(key, value))
-            cmd_list.extend(extra_params)
+            cmd_list = AlbaCLI._build_command(command=command, config=config, named_params=named_params, extra_params=extra_params, to_json=to_json)
             cmd_string = ' '.join(cmd_list)
             debug_log.append('Command: {0}'.format(cmd_string))
 
-            start = time.time()
-            try:
+            if debug is True:
+                logger.debug('Command: {0}'.format(cmd_string))
+            if client is None:
+                exit_code, output, stderr = AlbaCLI._execute(command=command, cmd_list=cmd_list, cmd_string=cmd_string, config=config)
+                output = re.sub(r'[^\x00-\x7F]+', '', output)
+                stderr_debug = 'stderr: {0}'.format(stderr)
+                stdout_debug = 'stdout: {0}'.format(output)
                 if debug is True:
-                    logger.debug('Command: {0}'.format(cmd_string))
-                if client is None:
-                    try:
-                        if not hasattr(select, 'poll'):
-                            import subprocess
-                            subprocess._has_poll = False  # Damn 'monkey patching'
-                        channel = Popen(cmd_list, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-                    except OSError as ose:
-                        raise CalledProcessError(1, cmd_string, str(ose))
-                    output, stderr = channel.communicate()
-                    output = re.sub(r'[^\x00-\x7F]+', '', output)
-                    stderr_debug = 'stderr: {0}'.format(stderr)
-                    stdout_debug = 'stdout: {0}'.format(output)
-                    if debug is True:
-                        logger.debug(stderr_debug)
-                        logger.debug(stdout_debug)
-                    debug_log.append(stderr_debug)
-                    debug_log.append(stdout_debug)
-                    exit_code = channel.returncode
-                    if exit_code != 0:  # Raise same error as check_output
-                        raise CalledProcessError(exit_code, cmd_string, output)
-                else:
+                    logger.debug(stderr_debug)
+                    logger.debug(stdout_debug)
+                debug_log.append(stderr_debug)
+                debug_log.append(stdout_debug)
+            else:
+                exit_code = 0
+                AlbaCLIMetrics.record_subprocess(command=command, cluster_name=cluster_name)
+                try:
                     if debug is True:
                         output, stderr = client.run(cmd_list, debug=True, return_stderr=True)
                         debug_log.append('stderr: {0}'.format(stderr))
                     else:
                         output = client.run(cmd_list).strip()
-                    debug_log.append('stdout: {0}'.format(output))
-
-                if to_json is True:
-                    output = json.loads(output)
-                else:
-                    return output
-                duration = time.time() - start
-                if duration > 0.5:
-                    logger.warning('AlbaCLI call {0} took {1}s'.format(command, round(duration, 2)))
-            except CalledProcessError as cpe:
-                try:
-                    output = json.loads(cpe.output)
-                except Exception:
-                    raise RuntimeError('Executing command {0} failed with output {1}'.format(cmd_string, cpe.output))
+                except CalledProcessError as cpe:
+                    exit_code = cpe.returncode
+                    output = cpe.output
+                debug_log.append('stdout: {0}'.format(output))
+                if command not in CLI_READ_ONLY_COMMANDS:
+                    AlbaCLICache.invalidate(config)
 
-            if output['success'] is True:
-                return output['result']
-            raise AlbaError(output['error']['message'], output['error']['exception_code'], output['error']['exception_type'])
+            result = AlbaCLI._parse_output(cmd_string=cmd_string, exit_code=exit_code, output=output, to_json=to_json)
+            duration = time.time() - start
+            AlbaCLIMetrics.record(command=command, cluster_name=cluster_name, duration=duration, output_size=len(output))
+            if duration > 0.5:
+                logger.warning('AlbaCLI call {0} took {1}s'.format(command, round(duration, 2)))
+            return result
 
         except Exception as ex:
+            AlbaCLIMetrics.record(command=command, cluster_name=cluster_name, duration=time.time() - start, output_size=len(output or ''), failed=True)
             logger.exception('Error: {0}'.format(ex))
             # In case there's an exception, we always log
             for debug_line in debug_log:
                 logger.debug(debug_line)
             raise
+
+    @staticmethod
+    def stream(command, config=None, named_params=None, extra_params=None, path=None):
+        """
+        Executes a command on ALBA and yields the items of an array within the JSON output while the command is still running
+        The output is never fully buffered, which keeps memory usage flat for commands returning huge amounts of data (eg: show-namespaces)
+        The output is neither cached nor executed through the runner pool, but the call does count towards the concurrency limit and the call timeout
+        The generator holds a slot of the concurrency limiter and the ALBA process until it is exhausted or closed
+        Callers which might stop iterating early (a break or an exception) must close() it, eg: with contextlib.closing(AlbaCLI.stream(...)) as items
+        :param command: The command to execute, eg: 'show-namespaces'
+        :type command: str
+        :param config: The configuration location to be used
+        :type config: str
+        :param named_params: Additional parameters to be given to the command, eg: {'max': -1}
+        :type named_params: dict
+        :param extra_params: Additional parameters to be given to the command, eg: [name]
+        :type extra_params: list
+        :param path: Keys and indices leading to the array in the JSON output, eg: ['result', 1] for show-namespaces. Defaults to ['result']
+        :type path: list
+        :return: Generator yielding the items of the array
+        :rtype: generator
+        """
+        if named_params is None:
+            named_params = {}
+        if extra_params is None:
+            extra_params = []
+        if path is None:
+            path = ['result']
+
+        if is_unittest_mode() and AlbaCLI._replay is None:
+            data = {'success': True,
+                    'result': AlbaCLI.run(command=command, config=config, named_params=named_params, extra_params=extra_params)}
+            for step in path:
+                data = data[step]
+            for item in data:
+                yield item
+            return
+
+        logger = logging.getLogger(__name__)
+        cmd_list = AlbaCLI._build_command(command=command, config=config, named_params=named_params, extra_params=extra_params, to_json=True)
+        cmd_string = ' '.join(cmd_list)
+        cluster_name = AlbaCLISettings.get_cluster_name(config)
+        settings = AlbaCLISettings.get(config)
+        timeout = settings['call_timeout'] or None
+        start = time.time()
+        limiter = AlbaCLILimiter.get_limiter(config=config, limit=settings['max_concurrent_calls'])
+        try:
+            waited = limiter.acquire(timeout=timeout)
+        except AlbaCLITimeoutError:
+            AlbaCLIMetrics.record_queue_wait(command=command, cluster_name=cluster_name, duration=time.time() - start)
+            AlbaCLIMetrics.record(command=command, cluster_name=cluster_name, duration=time.time() - start, failed=True)
+            raise
+        AlbaCLIMetrics.record_queue_wait(command=command, cluster_name=cluster_name, duration=waited)
+        replay = AlbaCLI._replay
+        if replay is not None:
+            try:
+                exit_code, output, stderr = replay.execute(cmd_list)
+                if exit_code != 0:
+                    raise CalledProcessError(exit_code, cmd_string, stderr)
+                for item in AlbaCLI._iterate_stream(chunks=(output[i:i + 65536] for i in xrange(0, len(output), 65536)), path=path):
+                    yield item
+            finally:
+                limiter.release()
+            return
+        # The slot is released by the process stream as soon as its process has been reaped
+        with closing(AlbaCLI._stream_process(command=command, cmd_list=cmd_list, cmd_string=cmd_string, cluster_name=cluster_name, path=path,
+                                             record_location=settings['record_location'], start=start, timeout=timeout, limiter=limiter)) as items:
+            for item in items:
+                yield item
+        duration = time.time() - start
+        if duration > 0.5:
+            logger.warning('AlbaCLI streaming call {0} took {1}s'.format(command, round(duration, 2)))
+
+    @staticmethod
+    def _stream_process(command, cmd_list, cmd_string, cluster_name, path, record_location, start, timeout, limiter):
+        # type: (str, List[str], str, Optional[str], list, Optional[str], float, Optional[float], AlbaCLILimiter) -> Iterable[any]
+        """
+        Spawns the command and yields the items of the array at 'path' within its output while it is still running
+        The timeout covers the time spent waiting for the concurrency limiter, starting at 'start'
+        The acquired slot of the limiter is released once the process has been reaped
+        :raises AlbaCLITimeoutError: When the command did not finish in time. Its process gets killed
+        """
+        def _read_chunks():
+            fd = channel.stdout.fileno()
+            while True:
+                while deadline is not None and len(wait_readable([fd], max(0, deadline - time.time()))) == 0:
+                    if time.time() >= deadline:
+                        raise AlbaCLITimeoutError('Command {0} did not finish within {1}s'.format(cmd_string, timeout))
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    return
+                output_size[0] += len(chunk)
+                if record_location is not None:
+                    recorded_chunks.append(chunk)
+                yield re.sub(r'[^\x00-\x7F]+', '', chunk)
+
+        def _read_stderr():
+            stderr_file.seek(0)
+            return stderr_file.read()
+
+        logger = logging.getLogger(__name__)
+        failed = True
+        deadline = None if timeout is None else start + timeout
+        recorded_chunks = []
+        output_size = [0]  # Mutable, so the chunk reader can update it
+        stderr_file = tempfile.TemporaryFile()  # A file instead of a pipe, as a full stderr pipe would block the process while stdout is being read
+        try:
+            channel = Popen(cmd_list, stdout=PIPE, stderr=stderr_file, universal_newlines=True)
+        except OSError as ose:
+            stderr_file.close()
+            limiter.release()
+            AlbaCLIMetrics.record(command=command, cluster_name=cluster_name, duration=time.time() - start, failed=True)
+            raise CalledProcessError(1, cmd_string, str(ose))
+        try:
+            AlbaCLIMetrics.record_subprocess(command=command, cluster_name=cluster_name)
+            for item in AlbaCLI._iterate_stream(chunks=_read_chunks(), path=path):
+                yield item
+            if channel.wait() != 0:
+                raise CalledProcessError(channel.returncode, cmd_string, _read_stderr())
+            failed = False
+            if record_location is not None:
+                AlbaCLIRecorder.record(location=record_location, cmd_list=cmd_list, exit_code=0, output=''.join(recorded_chunks), stderr=_read_stderr(), duration=time.time() - start)
+        except ValueError as ve:
+            channel.kill()
+            channel.wait()
+            logger.exception('Error: {0}'.format(ve))
+            raise RuntimeError('Executing command {0} failed with error {1}. Stderr: {2}'.format(cmd_string, ve, _read_stderr()))
+        finally:
+            if channel.poll() is None:  # Consumer stopped iterating early, the command timed out or another error occurred
+                channel.kill()
+                channel.wait()
+            limiter.release()
+            channel.stdout.close()
+            stderr_file.close()
+            AlbaCLIMetrics.record(command=command, cluster_name=cluster_name, duration=time.time() - start, output_size=output_size[0], failed=failed)
+
+    @staticmethod
+    def _iterate_stream(chunks, path):
+        # type: (iter, list) -> Iterable[any]
+        """
+        Yields the items of the array at 'path' within the streamed JSON output of a command
+        :raises AlbaError: When the output reports that the command failed
+        """
+        array_stream = JSONArrayStream(chunks=chunks, path=path)
+        found = False
+        for item in array_stream:
+            found = True
+            yield item
+        if found is False:
+            error = array_stream.skipped.get('error')
+            if array_stream.skipped.get('success') is False and error is not None:
+                raise AlbaError(error['message'], error['exception_code'], error['exception_type'])
+
+    @staticmethod
+    def gather(calls, concurrency=10, timeout=None):
+        # type: (List[dict], int, Optional[float]) -> List[any]
+        """
+        Executes multiple commands on ALBA concurrently from within the calling thread
+        Failures do not interrupt the other calls: the exception is returned at the position of the failing call
+        The commands are neither cached nor executed through the runner pool, but every command counts towards the concurrency limit of its configuration
+        :param calls: The calls to execute, eg: [{'command': 'asd-multistatistics', 'config': config, 'named_params': {'long-id': ids}}]
+                      Supported keys are the 'command', 'config', 'named_params', 'extra_params' and 'to_json' arguments of 'run'
+        :type calls: list
+        :param concurrency: Maximum amount of commands running at the same time
+        :type concurrency: int
+        :param timeout: Seconds after which a single command is killed, covering the time it waited for the concurrency limiter
+                        The call timeout of the configuration applies as well. None to only apply the call timeout
+        :type timeout: float
+        :return: The outputs of the commands (or the exceptions raised) in the order of the calls. Commands which did not finish in time result in an AlbaCLITimeoutError
+        :rtype: list
+        """
+        if is_unittest_mode() and AlbaCLI._replay is None:
+            results = []
+            for call in calls:
+                try:
+                    results.append(AlbaCLI.run(**call))
+                except Exception as ex:
+                    results.append(ex)
+            return results
+
+        logger = logging.getLogger(__name__)
+        commands = []
+        for call in calls:
+            commands.append(AlbaCLI._build_command(command=call['command'],
+                                                   config=call.get('config'),
+                                                   named_params=call.get('named_params') or {},
+                                                   extra_params=call.get('extra_params') or [],
+                                                   to_json=call.get('to_json', True)))
+
+        timeouts = []
+        limiters = []
+        for call in calls:
+            settings = AlbaCLISettings.get(call.get('config'))
+            call_timeout = settings['call_timeout'] or None
+            timeouts.append(call_timeout if timeout is None else min(timeout, call_timeout or timeout))
+            limiters.append(AlbaCLILimiter.get_limiter(config=call.get('config'), limit=settings['max_concurrent_calls']))
+
+        start = time.time()
+        replay = AlbaCLI._replay
+        try:
+            if replay is not None:
+                executions = []
+                durations = []
+                waits = [0.0] * len(commands)
+                for cmd_list in commands:
+                    replay_start = time.time()
+                    executions.append(replay.execute(cmd_list))
+                    durations.append(time.time() - replay_start)
+            else:
+                multiplexer = ProcessMultiplexer(concurrency=concurrency)
+                executions = multiplexer.run(commands, limiters=limiters, timeouts=timeouts)
+                durations = multiplexer.durations
+                waits = multiplexer.waits
+        finally:
+            for config in set(call.get('config') for call in calls if call['command'] not in CLI_READ_ONLY_COMMANDS):
+                AlbaCLICache.invalidate(config)
+
+        results = []
+        for call, cmd_list, execution, duration, waited in zip(calls, commands, executions, durations, waits):
+            cmd_string = ' '.join(cmd_list)
+            cluster_name = AlbaCLISettings.get_cluster_name(call.get('config'))
+            output = ''
+            if replay is None:
+                AlbaCLIMetrics.record_queue_wait(command=call['command'], cluster_name=cluster_name, duration=waited)
+            try:
+                if isinstance(execution, ProcessTimeoutError):
+                    raise AlbaCLITimeoutError('Command {0} timed out: {1}'.format(cmd_string, execution))
+                if isinstance(execution, Exception):
+                    raise CalledProcessError(1, cmd_string, str(execution))
+                AlbaCLIMetrics.record_subprocess(command=call['command'], cluster_name=cluster_name)
+                exit_code, output, stderr = execution
+                record_location = AlbaCLISettings.get(call.get('config'))['record_location']
+                if replay is None and record_location is not None:
+                    AlbaCLIRecorder.record(location=record_location, cmd_list=cmd_list, exit_code=exit_code, output=output, stderr=stderr, duration=duration)
+                output = re.sub(r'[^\x00-\x7F]+', '', output)
+                results.append(AlbaCLI._parse_output(cmd_string=cmd_string, exit_code=exit_code, output=output, to_json=call.get('to_json', True)))
+                AlbaCLIMetrics.record(command=call['command'], cluster_name=cluster_name, duration=duration, output_size=len(output))
+            except Exception as ex:
+                AlbaCLIMetrics.record(command=call['command'], cluster_name=cluster_name, duration=duration, output_size=len(output), failed=True)
+                logger.error('Error executing command {0}: {1}'.format(cmd_string, ex))
+                results.append(ex)
+        duration = time.time() - start
+        if duration > 0.5:
+            logger.warning('AlbaCLI gathering {0} calls took {1}s'.format(len(calls), round(duration, 2)))
+        return results
+
+    @staticmethod
+    def _build_command(command, config, named_params, extra_params, to_json):
+        # type: (str, Optional[str], dict, list, bool) -> List[str]
+        """
+        Build the command line for an ALBA command
+        :return: The command line
+        :rtype: list
+        """
+        cmd_list = [ALBA_BINARY, command]
+        if to_json is True:
+            cmd_list.append('--to-json')
+        if config is not None:
+            cmd_list.append('--config={0}'.format(config))
+        for key, value in named_params.iteritems():
+            cmd_list.append('--{0}={1}'.format(key, value))
+        cmd_list.extend(extra_params)
+        return cmd_list
+
+    @staticmethod
+    def _parse_output(cmd_string, exit_code, output, to_json):
+        # type: (str, int, str, bool) -> any
+        """
+        Parse the output of an executed ALBA command
+        :param cmd_string: The executed command, used for error reporting
+        :type cmd_string: str
+        :param exit_code: Exit code of the command
+        :type exit_code: int
+        :param output: Stdout of the command
+        :type output: str
+        :param to_json: Whether a JSON response was requested
+        :type to_json: bool
+        :return: The result of the command
+        :rtype: any
+        """
+        try:
+            if exit_code != 0:  # Raise same error as check_output
+                raise CalledProcessError(exit_code, cmd_string, output)
+            if to_json is False:
+                return output
+            output = json.loads(output)
+        except CalledProcessError as cpe:
+            try:
+                output = json.loads(cpe.output)
+            except Exception:
+                raise RuntimeError('Executing command {0} failed with output {1}'.format(cmd_string, cpe.output))
+
+        if output['success'] is True:
+            return output['result']
+        raise AlbaError(output['error']['message'], output['error']['exception_code'], output['error']['exception_type'])
+
+    @staticmethod
+    def invalidate_cache(config=None):
+        # type: (Optional[str]) -> None
+        """
+        Invalidate the cached output of read-only commands
+        :param config: The configuration location for which to invalidate the output. None to invalidate everything
+        :type config: str
+        :return: None
+        :rtype: NoneType
+        """
+        AlbaCLICache.invalidate(config)
+
+    @staticmethod
+    def _execute(command, cmd_list, cmd_string, config):
+        # type: (str, List[str], str, Optional[str]) -> Tuple[int, str, str]
+        """
+        Executes the command locally
+        * The output of read-only commands is served from the cache when possible
+        * The command is handed to the runner pool of the configuration if pooling is enabled
+        :param command: The ALBA command, eg: 'list-osds'
+        :type command: str
+        :param cmd_list: The command to execute
+        :type cmd_list: list
+        :param cmd_string: The command as a string, used for error reporting
+        :type cmd_string: str
+        :param config: The configuration location used in the command
+        :type config: str
+        :return: Exit code, stdout and stderr
+        :rtype: tuple
+        """
+        settings = AlbaCLISettings.get(config)
+
+        def _executor():
+            return AlbaCLI._execute_uncached(cmd_list=cmd_list, cmd_string=cmd_string, config=config, settings=settings)
+
+        cache_timeout = settings['cache_timeouts'].get(command, 0)
+        if cache_timeout > 0:
+            return AlbaCLICache.execute(cmd_list=cmd_list, config=config, timeout=cache_timeout, max_entries=settings['cache_size'], executor=_executor)
+        try:
+            return _executor()
+        finally:
+            if command not in CLI_READ_ONLY_COMMANDS:
+                AlbaCLICache.invalidate(config)
+
+    @staticmethod
+    def _execute_uncached(cmd_list, cmd_string, config, settings):
+        # type: (List[str], str, Optional[str], dict) -> Tuple[int, str, str]
+        """
+        Executes the command locally, through the runner pool of the configuration if pooling is enabled
+        The amount of concurrent calls per configuration is limited and calls exceeding the configured timeout are killed
+        :param cmd_list: The command to execute
+        :type cmd_list: list
+        :param cmd_string: The command as a string, used for error reporting
+        :type cmd_string: str
+        :param config: The configuration location used in the command
+        :type config: str
+        :param settings: The ALBA CLI settings applicable for the configuration
+        :type settings: dict
+        :return: Exit code, stdout and stderr
+        :rtype: tuple
+        """
+        command = cmd_list[1]
+        cluster_name = AlbaCLISettings.get_cluster_name(config)
+        timeout = settings['call_timeout'] or None
+        limiter = AlbaCLILimiter.get_limiter(config=config, limit=settings['max_concurrent_calls'])
+        try:
+            waited = limiter.acquire(timeout=timeout)
+        except AlbaCLITimeoutError:
+            AlbaCLIMetrics.record_queue_wait(command=command, cluster_name=cluster_name, duration=timeout)
+            raise
+        try:
+            AlbaCLIMetrics.record_subprocess(command=command, cluster_name=cluster_name)
+            if timeout is not None:
+                timeout -= waited  # The timeout covers the time spent in the queue as well
+            if AlbaCLI._replay is not None:
+                AlbaCLIMetrics.record_queue_wait(command=command, cluster_name=cluster_name, duration=waited)
+                return AlbaCLI._replay.execute(cmd_list)
+            start = time.time()
+            exit_code, output, stderr = AlbaCLI._spawn(cmd_list=cmd_list, cmd_string=cmd_string, config=config, settings=settings, timeout=timeout, waited=waited)
+            if settings['record_location'] is not None:
+                AlbaCLIRecorder.record(location=settings['record_location'], cmd_list=cmd_list, exit_code=exit_code, output=output, stderr=stderr, duration=time.time() - start)
+            return exit_code, output, stderr
+        finally:
+            limiter.release()
+
+    @staticmethod
+    def _spawn(cmd_list, cmd_string, config, settings, timeout, waited=0.0):
+        # type: (List[str], str, Optional[str], dict, Optional[float], float) -> Tuple[int, str, str]
+        """
+        Executes the command through the runner pool of the configuration if pooling is enabled, directly otherwise
+        The time spent waiting for a runner process counts towards the timeout and is recorded as queue wait, together with the time spent in the limiter
+        :param cmd_list: The command to execute
+        :type cmd_list: list
+        :param cmd_string: The command as a string, used for error reporting
+        :type cmd_string: str
+        :param config: The configuration location used in the command
+        :type config: str
+        :param settings: The ALBA CLI settings applicable for the configuration
+        :type settings: dict
+        :param timeout: Seconds after which the command is killed. None to wait indefinitely
+        :type timeout: float
+        :param waited: Seconds the call already waited for the concurrency limiter
+        :type waited: float
+        :return: Exit code, stdout and stderr
+        :rtype: tuple
+        """
+        command = cmd_list[1]
+        cluster_name = AlbaCLISettings.get_cluster_name(config)
+        pool = None
+        worker = None
+        pool_waited = 0.0
+        if settings['pool_size'] > 0:
+            # The limiter already bounds the concurrent calls, so the pool may grow up to that limit instead of queueing calls a second time
+            pool = AlbaCLIPool.get_pool(config=config,
+                                        size=max(settings['pool_size'], settings['max_concurrent_calls']),
+                                        max_idle=settings['pool_size'],
+                                        idle_timeout=settings['pool_idle_timeout'])
+            try:
+                worker, pool_waited = pool.acquire(timeout=timeout)
+            except AlbaCLITimeoutError:
+                AlbaCLIMetrics.record_queue_wait(command=command, cluster_name=cluster_name, duration=waited + timeout)
+                raise
+            except AlbaCLIPoolError as pe:
+                logging.getLogger(__name__).warning('ALBA CLI pool failed to start a runner for command {0}, executing directly: {1}'.format(cmd_string, pe))
+        AlbaCLIMetrics.record_queue_wait(command=command, cluster_name=cluster_name, duration=waited + pool_waited)
+        if timeout is not None:
+            timeout -= pool_waited
+
+        if worker is not None:
+            try:
+                return worker.execute(cmd_list, timeout=timeout)
+            except AlbaCLIPoolError as pe:
+                if pe.dispatched is True:  # Never execute a command twice
+                    raise CalledProcessError(1, cmd_string, str(pe))
+                logging.getLogger(__name__).warning('ALBA CLI pool failed to execute command {0}, executing directly: {1}'.format(cmd_string, pe))
+            finally:
+                pool.release(worker)
+
+        try:
+            if not hasattr(select, 'poll'):
+                import subprocess
+                subprocess._has_poll = False  # Damn 'monkey patching'
+            exit_code, output, stderr, timed_out = execute_command(cmd_list, timeout=timeout)
+        except OSError as ose:
+            raise CalledProcessError(1, cmd_string, str(ose))
+        if timed_out is True:
+            raise AlbaCLITimeoutError('Command {0} did not finish within {1}s'.format(cmd_string, settings['call_timeout']))
+        return exit_code, output, stderr
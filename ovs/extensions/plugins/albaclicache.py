@@ -0,0 +1,139 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA CLI cache module
+Caches the raw output of read-only ALBA commands in process memory
+* Entries expire after a per-command timeout and the least recently used entries are evicted first
+* Concurrent identical requests are coalesced: only 1 process is spawned and all requesters share its output
+* Entries of a configuration can be invalidated, eg: when a command modifying the ALBA Backend has been executed
+"""
+import sys
+import time
+from collections import OrderedDict
+from threading import Event, Lock
+
+
+class _InFlight(object):
+    """
+    An execution which is currently in progress and can be waited upon
+    """
+    def __init__(self, generation):
+        self.generation = generation  # Generation of the configuration when the execution started
+        self.event = Event()
+        self.result = None
+        self.exc_info = None
+
+
+class AlbaCLICache(object):
+    """
+    Process-wide cache for ALBA CLI output
+    """
+    _lock = Lock()
+    _entries = OrderedDict()  # {key: (expiration, result)}
+    _in_flight = {}  # {key: _InFlight}
+    _generation = 0  # Bumped on invalidation of all configurations
+    _generations = {}  # {config: generation}. Bumped on invalidation so in-flight output of older generations is not stored
+
+    @classmethod
+    def execute(cls, cmd_list, config, timeout, max_entries, executor):
+        # type: (List[str], Optional[str], int, int, callable) -> Tuple[int, str, str]
+        """
+        Executes the command through the cache
+        :param cmd_list: The full command to execute
+        :type cmd_list: list
+        :param config: The configuration location used in the command
+        :type config: str
+        :param timeout: Seconds the output of the command can be cached
+        :type timeout: int
+        :param max_entries: Maximum amount of entries in the cache
+        :type max_entries: int
+        :param executor: Function executing the command when no cached output is available. Should return exit code, stdout and stderr
+        :type executor: callable
+        :return: Exit code, stdout and stderr
+        :rtype: tuple
+        """
+        key = tuple(cmd_list)
+        with cls._lock:
+            if key in cls._entries:
+                expiration, result = cls._entries.pop(key)
+                if expiration > time.time():
+                    cls._entries[key] = (expiration, result)  # Move to the end, marking it as most recently used
+                    return result
+            generation = (cls._generation, cls._generations.get(config, 0))
+            in_flight = cls._in_flight.get(key)
+            # Never join an execution which started before an invalidation, as its output might predate a modification
+            leader = in_flight is None or in_flight.generation != generation
+            if leader is True:
+                in_flight = _InFlight(generation)
+                cls._in_flight[key] = in_flight
+
+        if leader is False:
+            in_flight.event.wait()
+            if in_flight.exc_info is not None:
+                raise in_flight.exc_info[0], in_flight.exc_info[1], in_flight.exc_info[2]
+            return in_flight.result
+
+        try:
+            in_flight.result = executor()
+        except:
+            in_flight.exc_info = sys.exc_info()
+            raise
+        finally:
+            with cls._lock:
+                if cls._in_flight.get(key) is in_flight:  # A newer execution might have taken over after an invalidation
+                    del cls._in_flight[key]
+                if in_flight.exc_info is None and in_flight.result[0] == 0 and (cls._generation, cls._generations.get(config, 0)) == generation:
+                    cls._entries[key] = (time.time() + timeout, in_flight.result)
+                    while len(cls._entries) > max_entries:
+                        cls._entries.popitem(last=False)
+            in_flight.event.set()
+        return in_flight.result
+
+    @classmethod
+    def get_generation(cls, config=None):
+        # type: (Optional[str]) -> Tuple[int, int]
+        """
+        Retrieve the current generation of a configuration. The generation changes whenever the cached output of the configuration is invalidated
+        :param config: The configuration location
+        :type config: str
+        :return: The generation
+        :rtype: tuple
+        """
+        with cls._lock:
+            return cls._generation, cls._generations.get(config, 0)
+
+    @classmethod
+    def invalidate(cls, config=None):
+        # type: (Optional[str]) -> None
+        """
+        Invalidate all cached output for the given configuration. Executions which are still in progress are no longer joined by new readers
+        :param config: The configuration location. None to invalidate everything
+        :type config: str
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            if config is None:
+                cls._generation += 1
+                cls._entries.clear()
+                cls._in_flight.clear()
+                return
+            cls._generations[config] = cls._generations.get(config, 0) + 1
+            for key in [key for key in cls._entries if '--config={0}'.format(config) in key]:
+                del cls._entries[key]
+            for key in [key for key in cls._in_flight if '--config={0}'.format(config) in key]:
+                del cls._in_flight[key]  # Their leaders still inform the readers which already joined them
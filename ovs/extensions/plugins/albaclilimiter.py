@@ -0,0 +1,110 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA CLI limiter module
+Bounds the amount of ALBA processes running concurrently against the same configuration (ABM cluster)
+"""
+import os
+import time
+from threading import Condition, Lock
+from ovs.extensions.plugins.albaclipool import AlbaCLITimeoutError
+
+
+class AlbaCLILimiter(object):
+    """
+    Counting semaphore for a single ALBA configuration which supports a timeout while waiting
+    """
+    _limiters = {}
+    _limiters_lock = Lock()
+    _limiters_pid = None
+
+    def __init__(self, limit):
+        # type: (int) -> None
+        """
+        :param limit: Maximum amount of concurrent ALBA processes. 0 disables limiting
+        :type limit: int
+        """
+        self.limit = limit
+        self._active = 0
+        self._condition = Condition(Lock())
+
+    @classmethod
+    def get_limiter(cls, config, limit):
+        # type: (Optional[str], int) -> AlbaCLILimiter
+        """
+        Retrieve the limiter for the given ALBA configuration
+        :param config: The ALBA configuration location
+        :type config: str
+        :param limit: Maximum amount of concurrent ALBA processes. 0 disables limiting
+        :type limit: int
+        :return: The limiter
+        :rtype: AlbaCLILimiter
+        """
+        with cls._limiters_lock:
+            if cls._limiters_pid != os.getpid():
+                cls._limiters = {}
+                cls._limiters_pid = os.getpid()
+            if config not in cls._limiters:
+                cls._limiters[config] = AlbaCLILimiter(limit=limit)
+            limiter = cls._limiters[config]
+        with limiter._condition:
+            if limit != limiter.limit:
+                limiter.limit = limit
+                limiter._condition.notify_all()
+        return limiter
+
+    def acquire(self, timeout=None):
+        # type: (Optional[float]) -> float
+        """
+        Wait for a free slot
+        :param timeout: Seconds to wait at most. None to wait indefinitely
+        :type timeout: float
+        :return: Seconds spent waiting
+        :rtype: float
+        :raises AlbaCLITimeoutError: When no slot became available in time
+        """
+        start = time.time()
+        with self._condition:
+            while 0 < self.limit <= self._active:
+                remaining = None if timeout is None else start + timeout - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise AlbaCLITimeoutError('No ALBA CLI slot became available within {0}s ({1} calls active)'.format(timeout, self._active))
+                self._condition.wait(remaining)
+            self._active += 1
+        return time.time() - start
+
+    def try_acquire(self):
+        # type: () -> bool
+        """
+        Take a free slot without waiting
+        :return: Whether a slot was taken
+        :rtype: bool
+        """
+        with self._condition:
+            if 0 < self.limit <= self._active:
+                return False
+            self._active += 1
+        return True
+
+    def release(self):
+        # type: () -> None
+        """
+        Release a slot acquired earlier
+        """
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
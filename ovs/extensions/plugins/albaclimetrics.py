@@ -0,0 +1,292 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA CLI metrics module
+Keeps track of the ALBA calls executed by the current process and aggregates them over all processes
+"""
+import os
+import copy
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from ovs.constants.albacli import CLI_LATENCY_BUCKETS, CLI_METRICS_DUMP_LOCATION, CLI_METRICS_FLUSH_INTERVAL, CLI_METRICS_KEY
+from ovs.extensions.generic.volatilemutex import volatile_mutex
+from ovs.extensions.storage.volatilefactory import VolatileFactory
+
+
+class AlbaCLIMetrics(object):
+    """
+    In-memory metrics of the ALBA CLI calls, per command and per ABM cluster
+    Every process periodically adds the metrics gathered since its previous flush to the metrics aggregated in the volatile store,
+    so the calls of all processes (workers, API, ...) can be reported
+    """
+    _logger = logging.getLogger(__name__)
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _metrics = {}  # {(command, cluster_name): {<metric>: <value>}}
+    _flushed = {}  # Copy of the metrics at the time of the previous flush
+    _last_flush = time.time()
+    _since = time.time()
+    _pid = os.getpid()
+
+    @classmethod
+    def record(cls, command, cluster_name, duration, output_size=0, failed=False):
+        # type: (str, Optional[str], float, int, bool) -> None
+        """
+        Record an executed ALBA call
+        :param command: The ALBA command, eg: 'list-osds'
+        :type command: str
+        :param cluster_name: Name of the ABM cluster the call was executed for. None if the call did not use a configuration
+        :type cluster_name: str
+        :param duration: Seconds the call took
+        :type duration: float
+        :param output_size: Size of the output in bytes
+        :type output_size: int
+        :param failed: Whether the call failed
+        :type failed: bool
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            entry = cls._get_entry(command, cluster_name)
+            entry['calls'] += 1
+            entry['errors'] += 1 if failed is True else 0
+            entry['output_bytes'] += output_size
+            entry['duration_total'] += duration
+            entry['duration_max'] = max(entry['duration_max'], duration)
+            entry['histogram'][bisect_left(CLI_LATENCY_BUCKETS, duration)] += 1
+        if time.time() - cls._last_flush > CLI_METRICS_FLUSH_INTERVAL:
+            try:
+                cls.flush()
+            except Exception:
+                cls._logger.exception('Unable to flush the ALBA CLI metrics')
+
+    @classmethod
+    def record_subprocess(cls, command, cluster_name):
+        # type: (str, Optional[str]) -> None
+        """
+        Record that an 'alba' process was spawned (calls served from the cache do not spawn a process)
+        :param command: The ALBA command, eg: 'list-osds'
+        :type command: str
+        :param cluster_name: Name of the ABM cluster the process was spawned for
+        :type cluster_name: str
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            cls._get_entry(command, cluster_name)['subprocesses'] += 1
+
+    @classmethod
+    def record_queue_wait(cls, command, cluster_name, duration):
+        # type: (str, Optional[str], float) -> None
+        """
+        Record the time a call waited for a free slot of the concurrency limiter
+        :param command: The ALBA command, eg: 'list-osds'
+        :type command: str
+        :param cluster_name: Name of the ABM cluster the call was executed for
+        :type cluster_name: str
+        :param duration: Seconds spent waiting
+        :type duration: float
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            entry = cls._get_entry(command, cluster_name)
+            entry['queued'] += 1
+            entry['queue_wait_total'] += duration
+            entry['queue_wait_max'] = max(entry['queue_wait_max'], duration)
+
+    @classmethod
+    def get_metrics(cls, aggregated=False):
+        # type: (bool) -> List[dict]
+        """
+        Retrieve a snapshot of the metrics, including latency percentiles estimated from the histograms
+        :param aggregated: Retrieve the metrics of all processes instead of the metrics of the current process. Flushes the metrics of the current process first
+        :type aggregated: bool
+        :return: The metrics per command and cluster
+        :rtype: list
+        """
+        if aggregated is True:
+            cls.flush()
+            entries = {}
+            for entry in (VolatileFactory.get_client().get(CLI_METRICS_KEY) or {}).get('metrics', []):
+                entry = entry.copy()
+                entries[(entry.pop('command'), entry.pop('cluster_name'))] = entry
+        else:
+            with cls._lock:
+                entries = copy.deepcopy(cls._metrics)
+
+        metrics = []
+        for (command, cluster_name), entry in sorted(entries.iteritems()):
+            metric = entry.copy()
+            metric.update({'command': command,
+                           'cluster_name': cluster_name,
+                           'duration_mean': entry['duration_total'] / entry['calls'] if entry['calls'] > 0 else 0.0,
+                           'queue_wait_mean': entry['queue_wait_total'] / entry['queued'] if entry['queued'] > 0 else 0.0,
+                           'duration_p50': cls._percentile(entry, 0.5),
+                           'duration_p90': cls._percentile(entry, 0.9),
+                           'duration_p99': cls._percentile(entry, 0.99)})
+            metrics.append(metric)
+        return metrics
+
+    @classmethod
+    def flush(cls):
+        # type: () -> None
+        """
+        Add the metrics gathered by the current process since its previous flush to the metrics aggregated over all processes
+        Concurrent flushes within the same process are skipped, as the ongoing flush covers them
+        :return: None
+        :rtype: NoneType
+        """
+        if cls._flush_lock.acquire(False) is False:
+            return
+        try:
+            with cls._lock:
+                cls._last_flush = time.time()
+                snapshot = copy.deepcopy(cls._metrics)
+                flushed = cls._flushed
+            deltas = []
+            for key, entry in snapshot.iteritems():
+                previous = flushed.get(key)
+                if previous is not None and entry['calls'] == previous['calls'] and entry['subprocesses'] == previous['subprocesses'] and entry['queued'] == previous['queued']:
+                    continue
+                deltas.append((key, cls._subtract(entry, previous)))
+            if len(deltas) == 0:
+                return
+
+            volatile = VolatileFactory.get_client()
+            with volatile_mutex(CLI_METRICS_KEY, wait=5):
+                aggregate = volatile.get(CLI_METRICS_KEY) or {'since': time.time(), 'metrics': []}
+                entries = dict(((entry['command'], entry['cluster_name']), entry) for entry in aggregate['metrics'])
+                for (command, cluster_name), delta in deltas:
+                    entry = entries.setdefault((command, cluster_name), dict(cls._new_entry(), command=command, cluster_name=cluster_name))
+                    for metric, value in delta.iteritems():
+                        if metric == 'histogram':
+                            entry[metric] = [count + delta_count for count, delta_count in zip(entry[metric], value)]
+                        elif metric.endswith('_max'):
+                            entry[metric] = max(entry[metric], value)
+                        else:
+                            entry[metric] += value
+                aggregate['metrics'] = [entries[key] for key in sorted(entries)]
+                volatile.set(CLI_METRICS_KEY, aggregate)
+            with cls._lock:
+                if cls._flushed is flushed:  # Not reset (eg: by a fork) in the meantime
+                    cls._flushed = snapshot
+        finally:
+            cls._flush_lock.release()
+
+    @classmethod
+    def reset(cls):
+        # type: () -> None
+        """
+        Clear all metrics of the current process
+        """
+        with cls._lock:
+            cls._metrics = {}
+            cls._flushed = {}
+            cls._since = time.time()
+
+    @classmethod
+    def dump(cls, location=None):
+        # type: (Optional[str]) -> str
+        """
+        Write the metrics of the current process to disk in JSON format
+        :param location: The file to write to. Defaults to a file in /tmp specific to the current process
+        :type location: str
+        :return: The location the metrics were written to
+        :rtype: str
+        """
+        if location is None:
+            location = CLI_METRICS_DUMP_LOCATION.format(os.getpid())
+        with open(location, 'w') as dump_file:
+            json.dump({'pid': os.getpid(),
+                       'since': cls._since,
+                       'timestamp': time.time(),
+                       'buckets': CLI_LATENCY_BUCKETS,
+                       'metrics': cls.get_metrics()}, dump_file, indent=4, sort_keys=True)
+        return location
+
+    @classmethod
+    def _get_entry(cls, command, cluster_name):
+        # type: (str, Optional[str]) -> dict
+        """
+        Retrieve the metrics of a command and cluster. Must be called while holding the lock
+        """
+        if cls._pid != os.getpid():  # Forked, the metrics of the parent do not belong to this process
+            cls._pid = os.getpid()
+            cls._metrics = {}
+            cls._flushed = {}
+            cls._last_flush = time.time()
+            cls._since = time.time()
+        key = (command, cluster_name)
+        if key not in cls._metrics:
+            cls._metrics[key] = cls._new_entry()
+        return cls._metrics[key]
+
+    @staticmethod
+    def _new_entry():
+        # type: () -> dict
+        """
+        Metrics of a command and cluster for which nothing has been recorded yet
+        """
+        return {'calls': 0,
+                'errors': 0,
+                'subprocesses': 0,
+                'output_bytes': 0,
+                'duration_total': 0.0,
+                'duration_max': 0.0,
+                'queued': 0,
+                'queue_wait_total': 0.0,
+                'queue_wait_max': 0.0,
+                'histogram': [0] * (len(CLI_LATENCY_BUCKETS) + 1)}
+
+    @staticmethod
+    def _subtract(entry, previous):
+        # type: (dict, Optional[dict]) -> dict
+        """
+        Compute the metrics gathered since a previous copy of the entry. Maximums are kept as they are
+        """
+        if previous is None:
+            return entry
+        delta = {}
+        for metric, value in entry.iteritems():
+            if metric == 'histogram':
+                delta[metric] = [count - previous_count for count, previous_count in zip(value, previous[metric])]
+            elif metric.endswith('_max'):
+                delta[metric] = value
+            else:
+                delta[metric] = value - previous[metric]
+        return delta
+
+    @staticmethod
+    def _percentile(entry, fraction):
+        # type: (dict, float) -> float
+        """
+        Estimate a latency percentile as the upper bound of the bucket it falls in
+        The overflow bucket is estimated using the maximum duration
+        """
+        threshold = entry['calls'] * fraction
+        count = 0
+        for index, bucket_count in enumerate(entry['histogram']):
+            count += bucket_count
+            if count >= threshold and count > 0:
+                if index == len(CLI_LATENCY_BUCKETS):
+                    return entry['duration_max']
+                return min(CLI_LATENCY_BUCKETS[index], entry['duration_max'])
+        return 0.0
@@ -0,0 +1,216 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA CLI multiplexer module
+Executes many commands concurrently from a single thread by multiplexing the output pipes of the processes
+"""
+import os
+import time
+import errno
+import select
+import signal
+from collections import deque
+from subprocess import Popen, PIPE
+
+
+class ProcessTimeoutError(RuntimeError):
+    """
+    Thrown when a process did not finish within its timeout
+    """
+    pass
+
+
+class _RunningProcess(object):
+    """
+    A process which is being multiplexed
+    """
+    def __init__(self, index, command, deadline, limiter=None):
+        self.index = index
+        self.start = time.time()
+        self.deadline = deadline
+        self.limiter = limiter  # Its slot is released once the process has been reaped
+        self.channel = Popen(command, stdout=PIPE, stderr=PIPE, close_fds=True, preexec_fn=os.setsid)
+        self.output = {self.channel.stdout.fileno(): [],
+                       self.channel.stderr.fileno(): []}
+        self.open_fds = set(self.output.keys())
+        self.stdout_fd = self.channel.stdout.fileno()
+        self.stderr_fd = self.channel.stderr.fileno()
+
+    def kill(self):
+        # type: () -> None
+        """
+        Kill the process group and release the pipes
+        """
+        try:
+            os.killpg(self.channel.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self._reap()
+
+    def _reap(self):
+        # type: () -> None
+        """
+        Wait for the process to exit, release the pipes and the slot of the limiter
+        """
+        self.channel.wait()
+        self.channel.stdout.close()
+        self.channel.stderr.close()
+        if self.limiter is not None:
+            self.limiter.release()
+            self.limiter = None
+
+    def result(self):
+        # type: () -> Tuple[int, str, str]
+        """
+        Reap the process
+        :return: Exit code, stdout and stderr
+        :rtype: tuple
+        """
+        self._reap()
+        return self.channel.returncode, ''.join(self.output[self.stdout_fd]), ''.join(self.output[self.stderr_fd])
+
+
+class ProcessMultiplexer(object):
+    """
+    Runs commands concurrently within the calling thread
+    """
+    RETRY_INTERVAL = 0.05  # Seconds between attempts to take a slot of a limiter held by other threads
+
+    def __init__(self, concurrency, timeout=None):
+        # type: (int, Optional[float]) -> None
+        """
+        :param concurrency: Maximum amount of processes running at the same time
+        :type concurrency: int
+        :param timeout: Seconds after which a single process is killed. None to wait indefinitely
+        :type timeout: float
+        """
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.durations = []  # Seconds every command of the last run took
+        self.waits = []  # Seconds every command of the last run waited for a slot of its limiter
+
+    def run(self, commands, limiters=None, timeouts=None):
+        # type: (List[List[str]], Optional[list], Optional[List[Optional[float]]]) -> List[Union[Tuple[int, str, str], Exception]]
+        """
+        Executes all commands
+        :param commands: The commands to execute
+        :type commands: list
+        :param limiters: For every command the limiter (see AlbaCLILimiter) a slot has to be taken from before it can start, or None
+                         Commands waiting for a slot do not block the other commands
+        :type limiters: list
+        :param timeouts: For every command the seconds after which it is killed, covering the time spent waiting for a slot. Defaults to the timeout of the multiplexer
+        :type timeouts: list
+        :return: For every command (in the same order) its exit code, stdout and stderr or the exception which occurred
+        :rtype: list
+        """
+        if limiters is None:
+            limiters = [None] * len(commands)
+        if timeouts is None:
+            timeouts = [self.timeout] * len(commands)
+        results = [None] * len(commands)
+        self.durations = [0.0] * len(commands)
+        self.waits = [0.0] * len(commands)
+        pending = deque(enumerate(commands))
+        waiting_since = {}  # {index: timestamp} of the commands waiting for a slot
+        running = {}  # {fd: _RunningProcess}
+        try:
+            while len(pending) > 0 or len(running) > 0:
+                # Start new processes
+                blocked = deque()
+                while len(pending) > 0 and len(set(running.values())) < self.concurrency:
+                    index, command = pending.popleft()
+                    now = time.time()
+                    timeout = timeouts[index]
+                    limiter = limiters[index]
+                    if limiter is not None and limiter.try_acquire() is False:
+                        waited = now - waiting_since.setdefault(index, now)
+                        if timeout is not None and waited >= timeout:
+                            results[index] = ProcessTimeoutError('No slot became available within {0}s'.format(timeout))
+                            self.waits[index] = waited
+                        else:
+                            blocked.append((index, command))
+                        continue
+                    self.waits[index] = now - waiting_since.pop(index, now)
+                    deadline = None if timeout is None else now + timeout - self.waits[index]
+                    try:
+                        process = _RunningProcess(index=index, command=command, deadline=deadline, limiter=limiter)
+                    except OSError as ose:
+                        if limiter is not None:
+                            limiter.release()
+                        results[index] = ose
+                        continue
+                    for fd in process.open_fds:
+                        running[fd] = process
+                pending.extendleft(reversed(blocked))
+
+                # Kill processes which exceeded their deadline
+                now = time.time()
+                for process in set(running.values()):
+                    if process.deadline is not None and process.deadline <= now:
+                        process.kill()
+                        for fd in process.open_fds:
+                            running.pop(fd)
+                        results[process.index] = ProcessTimeoutError('Command did not finish within {0}s'.format(timeouts[process.index]))
+                        self.durations[process.index] = now - process.start
+
+                # Read whatever output is available. Commands waiting for a slot are retried regularly
+                deadlines = [process.deadline for process in running.itervalues() if process.deadline is not None]
+                if len(blocked) > 0:
+                    deadlines.append(now + self.RETRY_INTERVAL)
+                elif len(running) == 0:
+                    continue
+                wait = max(0, min(deadlines) - now) if len(deadlines) > 0 else None
+                for fd in wait_readable(running.keys(), wait):
+                    process = running[fd]
+                    data = os.read(fd, 65536)
+                    if data:
+                        process.output[fd].append(data)
+                        continue
+                    process.open_fds.discard(fd)
+                    running.pop(fd)
+                    if len(process.open_fds) == 0:
+                        results[process.index] = process.result()
+                        self.durations[process.index] = time.time() - process.start
+        finally:
+            for process in set(running.values()):
+                process.kill()
+        return results
+
+
+def wait_readable(fds, timeout):
+    # type: (List[int], Optional[float]) -> List[int]
+    """
+    Wait until some of the file descriptors become readable (or hit EOF)
+    Uses poll when available as select is limited to low file descriptor numbers
+    :param fds: The file descriptors to wait for
+    :type fds: list
+    :param timeout: Seconds to wait at most. None to wait indefinitely
+    :type timeout: float
+    :return: The readable file descriptors
+    :rtype: list
+    """
+    try:
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            for fd in fds:
+                poller.register(fd, select.POLLIN | select.POLLPRI | select.POLLHUP | select.POLLERR)
+            return [fd for fd, _ in poller.poll(None if timeout is None else timeout * 1000)]
+        return select.select(fds, [], [], timeout)[0]
+    except (select.error, OSError) as ex:
+        if ex.args[0] == errno.EINTR:
+            return []
+        raise
@@ -0,0 +1,338 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA CLI pool module
+Keeps long-lived runner processes around which execute the ALBA commands on behalf of the calling process.
+The calling process (eg: a celery worker) is big, so forking it for every ALBA call is expensive. The runners are tiny and fork/exec cheaply.
+"""
+import os
+import sys
+import json
+import time
+from subprocess import Popen, PIPE
+from threading import Condition, Lock, Thread
+
+
+class AlbaCLIPoolError(RuntimeError):
+    """
+    Thrown when the pool itself failed to process a command (eg: a runner process died)
+    """
+    def __init__(self, message, dispatched=False):
+        # type: (str, bool) -> None
+        """
+        :param message: The error message
+        :type message: str
+        :param dispatched: Indicates whether the command might have been executed already
+        :type dispatched: bool
+        """
+        super(AlbaCLIPoolError, self).__init__(message)
+        self.dispatched = dispatched
+
+
+class AlbaCLITimeoutError(RuntimeError):
+    """
+    Thrown when an ALBA command did not finish in time (its process group got killed) or could not be started in time
+    """
+    pass
+
+
+class AlbaCLIWorker(object):
+    """
+    A single long-lived runner process
+    """
+    RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'albaclirunner.py')
+
+    def __init__(self):
+        # type: () -> None
+        """
+        Starts the runner process
+        """
+        self.last_used = time.time()
+        self._process = Popen([sys.executable, '-u', self.RUNNER], stdin=PIPE, stdout=PIPE, stderr=open(os.devnull, 'w'), close_fds=True)
+
+    @property
+    def alive(self):
+        # type: () -> bool
+        """
+        Indicates whether the runner process is still running
+        :rtype: bool
+        """
+        return self._process.poll() is None
+
+    def execute(self, command, timeout=None):
+        # type: (List[str], Optional[float]) -> Tuple[int, str, str]
+        """
+        Executes a command through the runner process
+        :param command: The command to execute
+        :type command: list
+        :param timeout: Seconds after which the runner kills the command. None to wait indefinitely
+        :type timeout: float
+        :return: Exit code, stdout and stderr
+        :rtype: tuple
+        :raises AlbaCLITimeoutError: When the command timed out
+        """
+        try:
+            self._process.stdin.write('{0}\n'.format(json.dumps({'command': command, 'timeout': timeout})))
+            self._process.stdin.flush()
+        except (IOError, OSError) as ex:
+            self.stop()
+            raise AlbaCLIPoolError('Runner process failed: {0}'.format(ex))
+        try:
+            header = self._process.stdout.readline()
+            if not header:
+                raise AlbaCLIPoolError('Runner process exited unexpectedly', dispatched=True)
+            header = json.loads(header)
+            output = self._read(header['stdout'])
+            stderr = self._read(header['stderr'])
+        except (IOError, OSError, ValueError) as ex:
+            self.stop()
+            raise AlbaCLIPoolError('Runner process failed: {0}'.format(ex), dispatched=True)
+        self.last_used = time.time()
+        if header.get('timed_out') is True:
+            raise AlbaCLITimeoutError('Command {0} did not finish within {1}s'.format(' '.join(command), round(timeout, 2)))
+        return header['exit_code'], output, stderr
+
+    def _read(self, size):
+        # type: (int) -> str
+        """
+        Read exactly 'size' bytes from the runner process
+        """
+        chunks = []
+        while size > 0:
+            chunk = self._process.stdout.read(size)
+            if not chunk:
+                raise AlbaCLIPoolError('Runner process exited unexpectedly', dispatched=True)
+            chunks.append(chunk)
+            size -= len(chunk)
+        return ''.join(chunks)
+
+    def stop(self):
+        # type: () -> None
+        """
+        Stops the runner process
+        Closing stdin makes the runner exit gracefully
+        """
+        try:
+            self._process.stdin.close()
+        except (IOError, OSError):
+            pass
+        if self.alive is True:
+            try:
+                self._process.kill()
+            except OSError:
+                pass
+        self._process.wait()
+
+
+class AlbaCLIPool(object):
+    """
+    Pool of runner processes for a single ALBA configuration
+    Idle runner processes are stopped after the idle timeout by a background thread, which only runs while the pool has idle runner processes
+    """
+    _pools = {}
+    _pools_lock = Lock()
+    _pools_pid = None
+
+    def __init__(self, size, max_idle, idle_timeout):
+        # type: (int, int, int) -> None
+        """
+        Initializes a pool
+        :param size: Maximum amount of runner processes
+        :type size: int
+        :param max_idle: Maximum amount of runner processes kept when they are idle
+        :type max_idle: int
+        :param idle_timeout: Seconds after which an idle runner process is stopped
+        :type idle_timeout: int
+        """
+        self.size = size
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._busy = 0
+        self._reaper = None
+        self._condition = Condition(Lock())
+
+    @classmethod
+    def get_pool(cls, config, size, max_idle, idle_timeout):
+        # type: (str, int, int, int) -> AlbaCLIPool
+        """
+        Retrieve the pool for the given ALBA configuration
+        Pools are never shared with forked children (eg: celery prefork workers), as the pipes would get mixed up
+        :param config: The ALBA configuration location
+        :type config: str
+        :param size: Maximum amount of runner processes
+        :type size: int
+        :param max_idle: Maximum amount of runner processes kept when they are idle
+        :type max_idle: int
+        :param idle_timeout: Seconds after which an idle runner process is stopped
+        :type idle_timeout: int
+        :return: The pool
+        :rtype: AlbaCLIPool
+        """
+        with cls._pools_lock:
+            if cls._pools_pid != os.getpid():
+                cls._pools = {}
+                cls._pools_pid = os.getpid()
+            if config not in cls._pools:
+                cls._pools[config] = AlbaCLIPool(size=size, max_idle=max_idle, idle_timeout=idle_timeout)
+            pool = cls._pools[config]
+        with pool._condition:
+            if size > pool.size:
+                pool._condition.notify_all()
+            pool.size = size
+            pool.max_idle = max_idle
+            pool.idle_timeout = idle_timeout
+        return pool
+
+    @classmethod
+    def clear(cls):
+        # type: () -> None
+        """
+        Stops all runner processes of all pools
+        """
+        with cls._pools_lock:
+            pools = cls._pools.values() if cls._pools_pid == os.getpid() else []
+            cls._pools = {}
+        for pool in pools:
+            pool.shutdown()
+
+    def execute(self, command, timeout=None):
+        # type: (List[str], Optional[float]) -> Tuple[int, str, str]
+        """
+        Executes the command on a runner process of this pool. Blocks when all runner processes are busy
+        :param command: The command to execute
+        :type command: list
+        :param timeout: Seconds after which the command is killed, including the time spent waiting for a runner process. None to wait indefinitely
+        :type timeout: float
+        :return: Exit code, stdout and stderr
+        :rtype: tuple
+        :raises AlbaCLITimeoutError: When no runner process became available or the command did not finish in time
+        """
+        worker, waited = self.acquire(timeout=timeout)
+        try:
+            return worker.execute(command, timeout=None if timeout is None else timeout - waited)
+        finally:
+            self.release(worker)
+
+    def shutdown(self):
+        # type: () -> None
+        """
+        Stops all idle runner processes. Busy ones are stopped when released
+        """
+        with self._condition:
+            idle = self._idle
+            self._idle = []
+            self.size = 0
+            self.max_idle = 0
+        for worker in idle:
+            worker.stop()
+
+    def acquire(self, timeout=None):
+        # type: (Optional[float]) -> Tuple[AlbaCLIWorker, float]
+        """
+        Get an idle runner process or start a new one if the pool is not exhausted yet. The runner process must be released afterwards
+        :param timeout: Seconds to wait at most for a runner process. None to wait indefinitely
+        :type timeout: float
+        :return: The runner process and the seconds spent waiting for it
+        :rtype: tuple
+        :raises AlbaCLITimeoutError: When no runner process became available in time
+        """
+        start = time.time()
+        expired = []
+        try:
+            with self._condition:
+                while True:
+                    now = time.time()
+                    while len(self._idle) > 0:
+                        worker = self._idle.pop()
+                        if worker.alive is True and now - worker.last_used < self.idle_timeout:
+                            self._busy += 1
+                            return worker, now - start
+                        expired.append(worker)
+                    if self._busy < max(1, self.size):
+                        self._busy += 1
+                        break
+                    remaining = None if timeout is None else start + timeout - now
+                    if remaining is not None and remaining <= 0:
+                        raise AlbaCLITimeoutError('No ALBA CLI runner process became available within {0}s ({1} busy)'.format(round(timeout, 2), self._busy))
+                    self._condition.wait(remaining)
+        finally:
+            for worker in expired:
+                worker.stop()
+        try:
+            return AlbaCLIWorker(), time.time() - start
+        except OSError as ose:
+            with self._condition:
+                self._busy -= 1
+                self._condition.notify()
+            raise AlbaCLIPoolError('Unable to start a runner process: {0}'.format(ose))
+
+    def release(self, worker):
+        # type: (AlbaCLIWorker) -> None
+        """
+        Return a runner process acquired earlier to the pool
+        :param worker: The runner process
+        :type worker: AlbaCLIWorker
+        :return: None
+        :rtype: NoneType
+        """
+        with self._condition:
+            self._busy -= 1
+            expired = self._take_expired()
+            if worker.alive is True and len(self._idle) < self.max_idle and len(self._idle) + self._busy < self.size:
+                self._idle.append(worker)
+                if self._reaper is None:
+                    self._reaper = Thread(target=self._reap, name='alba-cli-pool-reaper')
+                    self._reaper.daemon = True
+                    self._reaper.start()
+            else:
+                expired.append(worker)
+            self._condition.notify()
+        for expired_worker in expired:
+            expired_worker.stop()
+
+    def _take_expired(self):
+        # type: () -> List[AlbaCLIWorker]
+        """
+        Remove the idle runner processes which died or exceeded the idle timeout. The lock must be held by the caller
+        :return: The removed runner processes, which should still be stopped
+        :rtype: list
+        """
+        now = time.time()
+        expired = [worker for worker in self._idle if worker.alive is False or now - worker.last_used >= self.idle_timeout]
+        self._idle = [worker for worker in self._idle if worker not in expired]
+        return expired
+
+    def _reap(self):
+        # type: () -> None
+        """
+        Stop the idle runner processes once they exceed the idle timeout, also when no more commands are executed
+        Runs as long as the pool has idle runner processes
+        """
+        while True:
+            with self._condition:
+                expired = self._take_expired()
+                if len(self._idle) == 0:
+                    self._reaper = None
+                    delay = None
+                else:
+                    delay = min(worker.last_used for worker in self._idle) + self.idle_timeout - time.time()
+            for worker in expired:
+                worker.stop()
+            if delay is None:
+                return
+            time.sleep(max(0.1, delay))
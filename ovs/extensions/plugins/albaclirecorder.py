@@ -0,0 +1,181 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA CLI recorder module
+Captures executed ALBA commands and their responses, so they can be replayed offline (see ovs.extensions.plugins.tests.alba_replay)
+"""
+import os
+import re
+import hmac
+import json
+import errno
+import hashlib
+import logging
+from threading import Lock
+
+
+class AlbaCLIRecorder(object):
+    """
+    Appends anonymised command/response pairs to a fixture file (1 JSON document per line)
+    Every process writes to its own file within the configured directory: alba_cli_<pid>.jsonl
+    Anonymisation replaces IP addresses, host names and Arakoon cluster names by stable placeholders, so relations within the data are preserved
+    The placeholders are keyed (HMAC) on a random salt per recording directory, stored in SALT_FILE. Without the salt, they cannot be reversed by hashing all candidate values
+    The salt file should not be shared together with the fixture files
+    """
+    IP_REGEX = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
+    CLUSTER_REGEX = re.compile(r'/ovs/arakoon/([^/]+)/')
+    HOST_KEYS = ['host', 'hostname', 'node_name']
+    SALT_FILE = 'alba_cli.salt'
+
+    _lock = Lock()
+    _salts = {}  # {location: salt}
+
+    @classmethod
+    def record(cls, location, cmd_list, exit_code, output, stderr, duration):
+        # type: (str, List[str], int, str, str, float) -> None
+        """
+        Record an executed command. Never raises, recording must not influence the actual call
+        :param location: Directory to write the fixture file to
+        :type location: str
+        :param cmd_list: The executed command
+        :type cmd_list: list
+        :param exit_code: Exit code of the command
+        :type exit_code: int
+        :param output: Stdout of the command
+        :type output: str
+        :param stderr: Stderr of the command
+        :type stderr: str
+        :param duration: Seconds the command took
+        :type duration: float
+        :return: None
+        :rtype: NoneType
+        """
+        try:
+            salt = cls.get_salt(location)
+            try:
+                output = json.dumps(cls.anonymise(json.loads(output), salt=salt))
+            except ValueError:
+                output = cls.anonymise(output, salt=salt)
+            line = json.dumps({'command': cmd_list[1],
+                               'arguments': [cls.anonymise(argument, salt=salt) for argument in cmd_list[2:]],
+                               'exit_code': exit_code,
+                               'output': output,
+                               'stderr': cls.anonymise(stderr, salt=salt),
+                               'duration': duration})
+            with cls._lock:
+                with open(os.path.join(location, 'alba_cli_{0}.jsonl'.format(os.getpid())), 'a') as fixture_file:
+                    fixture_file.write('{0}\n'.format(line))
+        except Exception:
+            logging.getLogger(__name__).exception('Unable to record ALBA command {0}'.format(' '.join(cmd_list)))
+
+    @classmethod
+    def get_salt(cls, location):
+        # type: (str) -> str
+        """
+        Retrieve the salt of the recordings within a directory, creating it when required
+        All processes recording to the same directory share the salt, so their placeholders match
+        :param location: Directory containing the fixture files
+        :type location: str
+        :return: The salt
+        :rtype: str
+        """
+        with cls._lock:
+            if location not in cls._salts and cls.load_salt(location) is None:
+                salt_path = os.path.join(location, cls.SALT_FILE)
+                temp_path = '{0}.{1}'.format(salt_path, os.getpid())
+                with open(temp_path, 'w') as salt_file:
+                    os.chmod(temp_path, 0600)
+                    salt_file.write(os.urandom(16).encode('hex'))
+                try:
+                    os.link(temp_path, salt_path)  # Atomic, another process might have created the salt already
+                except OSError as ex:
+                    if ex.errno != errno.EEXIST:
+                        raise
+                finally:
+                    os.remove(temp_path)
+            if location not in cls._salts:
+                cls._salts[location] = cls.load_salt(location)
+            return cls._salts[location]
+
+    @classmethod
+    def load_salt(cls, location):
+        # type: (str) -> Optional[str]
+        """
+        Load the salt of the recordings within a directory
+        :param location: Directory containing the fixture files
+        :type location: str
+        :return: The salt. None if the directory has no salt
+        :rtype: str
+        """
+        salt_path = os.path.join(location, cls.SALT_FILE)
+        if not os.path.exists(salt_path):
+            return None
+        with open(salt_path) as salt_file:
+            return salt_file.read().strip()
+
+    @classmethod
+    def anonymise(cls, value, salt, key=None):
+        # type: (any, str, Optional[str]) -> any
+        """
+        Anonymise a (parsed JSON) value
+        :param value: The value to anonymise
+        :type value: any
+        :param salt: Salt to key the placeholders on
+        :type salt: str
+        :param key: The dictionary key the value belongs to, if any
+        :type key: str
+        :return: The anonymised value
+        :rtype: any
+        """
+        if isinstance(value, dict):
+            return dict((k, cls.anonymise(v, salt=salt, key=k)) for k, v in value.iteritems())
+        if isinstance(value, list):
+            return [cls.anonymise(item, salt=salt, key=key) for item in value]
+        if not isinstance(value, basestring):
+            return value
+        if key in cls.HOST_KEYS and cls.IP_REGEX.match(value) is None:
+            return 'host-{0}'.format(cls._hash(value, salt=salt))
+        value = cls.IP_REGEX.sub(lambda match: cls._anonymise_ip(match.group(0), salt=salt), value)
+        return cls.CLUSTER_REGEX.sub(lambda match: '/ovs/arakoon/cluster-{0}/'.format(cls._hash(match.group(1), salt=salt)), value)
+
+    @classmethod
+    def _anonymise_ip(cls, ip, salt):
+        # type: (str, str) -> str
+        """
+        Map an IP address onto a stable address in the 10.0.0.0/8 range
+        Loopback and wildcard addresses are meaningful as is
+        """
+        if ip.startswith('127.') or ip == '0.0.0.0':
+            return ip
+        digest = cls._digest(ip, salt=salt)
+        return '10.{0}.{1}.{2}'.format(*[ord(character) for character in digest[:3]])
+
+    @classmethod
+    def _hash(cls, value, salt):
+        # type: (str, str) -> str
+        """
+        Stable short placeholder for a value
+        """
+        return cls._digest(value, salt=salt).encode('hex')[:8]
+
+    @staticmethod
+    def _digest(value, salt):
+        # type: (str, str) -> str
+        """
+        Keyed digest of a value
+        """
+        return hmac.new(str(salt), value.encode('utf-8') if isinstance(value, unicode) else value, hashlib.sha256).digest()
@@ -0,0 +1,91 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA CLI runner module
+This module is executed as a standalone script by the AlbaCLIPool (and imported by AlbaCLI for direct execution), so it should only depend on the standard library
+Protocol (1 request at a time):
+    * Request: a single JSON line {"command": [...], "timeout": <seconds or null>}
+    * Response: a single JSON line {"exit_code": <int>, "stdout": <length>, "stderr": <length>, "timed_out": <bool>} followed by the raw stdout and stderr data
+"""
+import os
+import sys
+import json
+import signal
+from subprocess import Popen, PIPE
+from threading import Timer
+
+
+def execute(command, timeout=None):
+    """
+    Executes the command and returns its exit code, stdout and stderr
+    The command runs in its own process group, so the whole group can be killed when the timeout expires
+    :param command: Command to execute
+    :type command: list
+    :param timeout: Seconds after which the process group is killed. None to wait indefinitely
+    :type timeout: float
+    :return: Exit code, stdout, stderr and whether the command timed out
+    :rtype: tuple
+    :raises OSError: When the command could not be started
+    """
+    channel = Popen(command, stdout=PIPE, stderr=PIPE, universal_newlines=True, preexec_fn=os.setsid)
+
+    timed_out = []  # Mutable, so the timer can update it
+
+    def _kill():
+        timed_out.append(True)
+        try:
+            os.killpg(channel.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    timer = None
+    if timeout is not None:
+        timer = Timer(max(0, timeout), _kill)
+        timer.daemon = True
+        timer.start()
+    try:
+        output, stderr = channel.communicate()
+    finally:
+        if timer is not None:
+            timer.cancel()
+    return channel.returncode, output, stderr, len(timed_out) > 0
+
+
+def main():
+    """
+    Serve requests until stdin is closed
+    """
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        request = json.loads(line)
+        try:
+            exit_code, output, stderr, timed_out = execute(request['command'], request.get('timeout'))
+        except OSError as ose:
+            exit_code, output, stderr, timed_out = 1, '', str(ose), False
+        sys.stdout.write('{0}\n'.format(json.dumps({'exit_code': exit_code,
+                                                    'stdout': len(output),
+                                                    'stderr': len(stderr),
+                                                    'timed_out': timed_out})))
+        sys.stdout.write(output)
+        sys.stdout.write(stderr)
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
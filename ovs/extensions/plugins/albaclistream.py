@@ -0,0 +1,163 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA CLI stream module
+Incrementally parses a JSON document and yields the items of a single (nested) array within it.
+Only the item currently being parsed is buffered, so memory usage stays flat regardless of the size of the array.
+"""
+import re
+import json
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class IncompleteDataError(ValueError):
+    """
+    Thrown when the JSON document ended before the requested array was fully parsed
+    """
+    pass
+
+
+class JSONArrayStream(object):
+    """
+    Parses the items of an array located at 'path' in a JSON document, which is read in chunks
+    Example: path ['result', 1] for document {"success": true, "result": [2, [{...}, {...}]]} yields both objects
+    """
+    TRIM_SIZE = 65536  # Parsed data is removed from the buffer once this many bytes have been consumed
+
+    def __init__(self, chunks, path):
+        # type: (iter, List[Union[str, int]]) -> None
+        """
+        :param chunks: Iterable producing the document in chunks of data
+        :type chunks: iter
+        :param path: Keys (for objects) and indices (for arrays) leading to the array to stream
+        :type path: list
+        """
+        self.path = path
+        self.skipped = {}  # Values of the top-level keys which were passed while looking for the path
+        self._chunks = iter(chunks)
+        self._buffer = ''
+        self._position = 0
+        self._decoder = json.JSONDecoder()
+        self._eof = False
+
+    def __iter__(self):
+        """
+        Yields the items of the array. Yields nothing if the path could not be found in the document
+        """
+        if self._navigate() is False:
+            return
+        self._expect('[')
+        if self._peek() == ']':
+            return
+        while True:
+            yield self._decode()
+            if self._expect(',]') == ']':
+                return
+
+    def _navigate(self):
+        # type: () -> bool
+        """
+        Move the position to the start of the array
+        :return: True if the path was found, False otherwise
+        :rtype: bool
+        """
+        for depth, step in enumerate(self.path):
+            if isinstance(step, int):
+                self._expect('[')
+                for _ in xrange(step):
+                    if self._peek() == ']':
+                        return False
+                    self._decode()
+                    if self._expect(',]') == ']':
+                        return False
+                continue
+
+            self._expect('{')
+            if self._peek() == '}':
+                return False
+            while True:
+                key = self._decode()
+                self._expect(':')
+                if key == step:
+                    break
+                value = self._decode()
+                if depth == 0:
+                    self.skipped[key] = value
+                if self._expect(',}') == '}':
+                    return False
+        return True
+
+    def _fill(self):
+        # type: () -> bool
+        """
+        Read the next chunk into the buffer
+        :return: False if no more data is available
+        :rtype: bool
+        """
+        if self._eof is True:
+            return False
+        if self._position > self.TRIM_SIZE:
+            self._buffer = self._buffer[self._position:]
+            self._position = 0
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer += chunk
+                return True
+        self._eof = True
+        return False
+
+    def _peek(self):
+        # type: () -> str
+        """
+        Skip whitespace and return the next character without consuming it
+        """
+        while True:
+            self._position = WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if self._fill() is False:
+                raise IncompleteDataError('Unexpected end of JSON data')
+
+    def _expect(self, characters):
+        # type: (str) -> str
+        """
+        Consume the next character, which must be one of the given characters
+        """
+        character = self._peek()
+        if character not in characters:
+            raise ValueError('Expected one of "{0}" but found "{1}" at position {2}'.format(characters, character, self._position))
+        self._position += 1
+        return character
+
+    def _decode(self):
+        # type: () -> any
+        """
+        Decode the next JSON value, reading more data until the value is complete
+        A value is only considered complete when it is followed by another character, as eg: numbers could still be extended by the next chunk
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                if WHITESPACE.match(self._buffer, end).end() < len(self._buffer) or self._eof is True:
+                    self._position = end
+                    return value
+            except ValueError:
+                if self._eof is True:
+                    raise
+            self._fill()
@@ -0,0 +1,145 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA Backend materializer module
+"""
+import time
+from functools import wraps
+from ovs.extensions.storage.volatilefactory import VolatileFactory
+
+
+class AlbaBackendMaterializer(object):
+    """
+    Stores precomputed values of ALBA Backend dynamics in the volatile store, so reading them does not require any (remote) calls
+    The values are computed on a fixed cadence by the 'alba.materialize_backends' task, but only for the dynamics which have been read recently
+    Usage:
+        @AlbaBackendMaterializer.serve
+        def _presets(self):
+            ...
+    """
+    DYNAMICS = ['usages', 'presets', 'local_summary', 'live_status']  # In order of computation: later dynamics depend on earlier ones
+    MAX_AGE = 180  # Seconds a materialized value is served. Protects against serving ancient values when the task is no longer scheduled
+    READ_WINDOW = 300  # Seconds a dynamic keeps being materialized after it was read
+
+    @classmethod
+    def serve(cls, function):
+        # type: (callable) -> callable
+        """
+        Decorator for the method of a Dynamic property, serving the materialized value when available
+        The original method remains available as the 'compute' attribute of the decorated method
+        :param function: Method of the Dynamic property
+        :type function: callable
+        :return: The decorated method
+        :rtype: callable
+        """
+        name = function.__name__[1:]  # Eg: '_presets' -> 'presets'
+
+        @wraps(function)
+        def new_function(self):
+            volatile = VolatileFactory.get_client()
+            volatile.add(cls._get_read_key(self.guid, name), time.time(), cls.READ_WINDOW)  # Only writes when the dynamic was not read within the window
+            entry = volatile.get(cls._get_key(self.guid))
+            if entry is not None and name in entry['values'] and time.time() - entry['timestamp'] < cls.MAX_AGE:
+                return entry['values'][name]
+            return function(self)
+
+        new_function.compute = function
+        return new_function
+
+    @classmethod
+    def materialize(cls, alba_backend):
+        # type: (AlbaBackend) -> int
+        """
+        Compute the materialized dynamics of an ALBA Backend which have been read recently and store them
+        Dynamics which fail to compute or have not been read are not stored, so readers compute them on the fly
+        :param alba_backend: The ALBA Backend to materialize
+        :type alba_backend: ovs.dal.hybrids.albabackend.AlbaBackend
+        :return: Version of the stored values
+        :rtype: int
+        """
+        volatile = VolatileFactory.get_client()
+        key = cls._get_key(alba_backend.guid)
+        previous = volatile.get(key)
+        entry = {'version': 1 if previous is None else previous['version'] + 1,
+                 'timestamp': time.time(),
+                 'values': {}}
+        errors = []
+        for name in cls.DYNAMICS:
+            if volatile.get(cls._get_read_key(alba_backend.guid, name)) is None:
+                continue
+            try:
+                entry['values'][name] = getattr(type(alba_backend), '_{0}'.format(name)).compute(alba_backend)
+            except Exception as ex:
+                errors.append((name, ex))
+        volatile.set(key, entry, cls.MAX_AGE)
+        if len(errors) > 0:
+            raise RuntimeError('Materializing {0} of ALBA Backend {1} failed: {2}'.format(', '.join(error[0] for error in errors), alba_backend.name, errors))
+        return entry['version']
+
+    @classmethod
+    def get_version(cls, alba_backend_guid):
+        # type: (str) -> Optional[int]
+        """
+        Retrieve the version of the materialized values of an ALBA Backend
+        :param alba_backend_guid: Guid of the ALBA Backend
+        :type alba_backend_guid: str
+        :return: The version or None when nothing has been materialized
+        :rtype: int
+        """
+        entry = VolatileFactory.get_client().get(cls._get_key(alba_backend_guid))
+        return None if entry is None else entry['version']
+
+    @classmethod
+    def invalidate(cls, alba_backend_guid, properties=None):
+        # type: (str, Optional[Union[str, List[str]]]) -> None
+        """
+        Drop materialized values of an ALBA Backend, so they are computed on the fly until the next materialization
+        :param alba_backend_guid: Guid of the ALBA Backend
+        :type alba_backend_guid: str
+        :param properties: Name(s) of the dynamics to drop. None to drop all of them
+        :type properties: str|list
+        :return: None
+        :rtype: NoneType
+        """
+        volatile = VolatileFactory.get_client()
+        key = cls._get_key(alba_backend_guid)
+        if properties is None:
+            volatile.delete(key)
+            return
+        if isinstance(properties, basestring):
+            properties = [properties]
+        entry = volatile.get(key)
+        if entry is not None and any(name in entry['values'] for name in properties):
+            for name in properties:
+                entry['values'].pop(name, None)
+            volatile.set(key, entry, max(1, int(cls.MAX_AGE - (time.time() - entry['timestamp']))))
+
+    @staticmethod
+    def _get_key(alba_backend_guid):
+        # type: (str) -> str
+        """
+        Volatile key holding the materialized values of an ALBA Backend
+        """
+        return 'ovs_alba_materialized_{0}'.format(alba_backend_guid)
+
+    @staticmethod
+    def _get_read_key(alba_backend_guid, name):
+        # type: (str, str) -> str
+        """
+        Volatile key which exists as long as a dynamic of an ALBA Backend has been read within the read window
+        """
+        return 'ovs_alba_materialized_{0}_read_{1}'.format(alba_backend_guid, name)
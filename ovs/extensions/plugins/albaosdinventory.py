@@ -0,0 +1,157 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA OSD inventory module
+"""
+import os
+import time
+from threading import Lock, RLock
+from ovs_extensions.constants import is_unittest_mode
+from ovs.extensions.plugins.albacli import AlbaCLI, AlbaCLISettings
+from ovs.extensions.plugins.albaclicache import AlbaCLICache
+
+
+class AlbaOSDInventorySnapshot(object):
+    """
+    The OSDs known by an ABM cluster at a given point in time
+    Every view is fetched from ALBA on first access only, so consumers which only need a single view do not pay for the others
+    The returned lists and dicts are shared by all consumers and should be treated as read-only
+    """
+    def __init__(self, config, version):
+        # type: (str, int) -> None
+        """
+        :param config: The configuration location of the ABM cluster
+        :type config: str
+        :param version: Version of the snapshot. Increases with every refresh of the inventory of the configuration
+        :type version: int
+        """
+        self.config = config
+        self.version = version
+        self.timestamp = time.time()
+        self._lock = RLock()  # The indexes are built out of the 'all' view
+        self._views = {}
+
+    @property
+    def all(self):
+        # type: () -> List[dict]
+        """
+        All OSDs registered in the ABM cluster ('list-all-osds')
+        """
+        return self._get_view('all', lambda: AlbaCLI.run(command='list-all-osds', config=self.config))
+
+    @property
+    def claimed(self):
+        # type: () -> List[dict]
+        """
+        The OSDs claimed by the ALBA Backend of the ABM cluster, including their usage ('list-osds')
+        """
+        return self._get_view('claimed', lambda: AlbaCLI.run(command='list-osds', config=self.config))
+
+    @property
+    def available(self):
+        # type: () -> List[dict]
+        """
+        The OSDs which have been discovered and can be claimed ('list-available-osds')
+        """
+        return self._get_view('available', lambda: AlbaCLI.run(command='list-available-osds', config=self.config))
+
+    @property
+    def by_long_id(self):
+        # type: () -> Dict[str, dict]
+        """
+        All OSDs registered in the ABM cluster, indexed by their long ID
+        """
+        return self._get_view('by_long_id', lambda: dict((osd['long_id'], osd) for osd in self.all if osd.get('long_id') is not None))
+
+    @property
+    def by_endpoint(self):
+        # type: () -> Dict[str, dict]
+        """
+        All OSDs registered in the ABM cluster, indexed by all of their 'ip:port' combinations
+        """
+        def _index():
+            index = {}
+            for osd in self.all:
+                for ip in osd.get('ips') or []:
+                    index['{0}:{1}'.format(ip, osd.get('port'))] = osd
+            return index
+        return self._get_view('by_endpoint', _index)
+
+    def _get_view(self, name, loader):
+        # type: (str, callable) -> any
+        """
+        Retrieve a view, loading it when it has not been accessed before
+        Failures are not remembered, the next access tries again
+        """
+        with self._lock:
+            if name not in self._views:
+                self._views[name] = loader()
+            return self._views[name]
+
+
+class AlbaOSDInventory(object):
+    """
+    Shares a single OSD inventory snapshot per ABM configuration between all consumers within a process (eg: the stack of every ALBA Node, the usages of an ALBA Backend)
+    * A snapshot is shared for 'osd_inventory_interval' seconds (see the ALBA CLI settings)
+    * A snapshot is dropped as soon as a command modifying the configuration has been executed through the AlbaCLI
+    """
+    _lock = Lock()
+    _snapshots = {}  # {config: (generation, snapshot)}
+    _versions = {}  # {config: version}
+    _pid = os.getpid()
+
+    @classmethod
+    def get(cls, config):
+        # type: (str) -> AlbaOSDInventorySnapshot
+        """
+        Retrieve the current OSD inventory snapshot of an ABM configuration
+        :param config: The configuration location of the ABM cluster, eg: 'arakoon://config/ovs/arakoon/mybackend-abm/config?ini=...'
+        :type config: str
+        :return: The snapshot
+        :rtype: AlbaOSDInventorySnapshot
+        """
+        # The virtual ALBA Backends of the unittests are modified directly, so their snapshots can never be shared
+        interval = 0 if is_unittest_mode() is True else AlbaCLISettings.get(config)['osd_inventory_interval']
+        generation = AlbaCLICache.get_generation(config)
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._snapshots = {}
+                cls._pid = os.getpid()
+            version = cls._versions.get(config, 0)
+            entry = cls._snapshots.get(config)
+            if entry is not None and entry[0] == generation and time.time() - entry[1].timestamp < interval:
+                return entry[1]
+            snapshot = AlbaOSDInventorySnapshot(config=config, version=version + 1)
+            cls._versions[config] = snapshot.version
+            cls._snapshots[config] = (generation, snapshot)
+            return snapshot
+
+    @classmethod
+    def invalidate(cls, config=None):
+        # type: (Optional[str]) -> None
+        """
+        Drop the snapshot of a configuration, forcing the next consumer to fetch the OSDs again
+        :param config: The configuration location. None to drop all snapshots
+        :type config: str
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            if config is None:
+                cls._snapshots = {}
+            else:
+                cls._snapshots.pop(config, None)
@@ -0,0 +1,119 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA OSD status module
+"""
+import os
+import time
+from threading import Lock
+from ovs_extensions.constants import is_unittest_mode
+from ovs.constants.albanode import OSD_ERROR_INTERVAL_TTL
+from ovs.extensions.generic.configuration import Configuration
+
+
+class AlbaOSDStatusEvaluator(object):
+    """
+    Classifies claimed OSDs based on the information ALBA keeps about them
+    An evaluator is meant to be used for a single refresh (eg: of the stack of an ALBA Node):
+    * The GUI error interval of an ALBA Backend is read once per evaluator
+    * Those intervals are cached within the process for OSD_ERROR_INTERVAL_TTL seconds, so consecutive refreshes do not read them at all
+    """
+    GLOBAL_INTERVAL_KEY = '/ovs/alba/backends/global_gui_error_interval'
+    BACKEND_INTERVAL_KEY = '/ovs/alba/backends/{0}/gui_error_interval'
+
+    _lock = Lock()
+    _intervals = {}  # {alba_backend_guid: (timestamp, interval)}
+    _pid = os.getpid()
+
+    def __init__(self):
+        # type: () -> None
+        """
+        Initializes an evaluator
+        """
+        self._evaluated_intervals = {}
+
+    def evaluate(self, alba_backend_guid, osd_info):
+        # type: (str, dict) -> Tuple[str, str]
+        """
+        Classify an OSD claimed by an ALBA Backend
+        :param alba_backend_guid: Guid of the ALBA Backend which claimed the OSD
+        :type alba_backend_guid: str
+        :param osd_info: Information about the OSD, as listed by ALBA ('list-all-osds')
+        :type osd_info: dict
+        :return: The status and status detail of the OSD
+        :rtype: tuple
+        """
+        from ovs.dal.hybrids.albanode import AlbaNode
+
+        if osd_info['decommissioned'] is True:
+            return AlbaNode.OSD_STATUSES.UNAVAILABLE, AlbaNode.OSD_STATUS_DETAILS.DECOMMISSIONED
+
+        interval = self.get_interval(alba_backend_guid)
+        read = osd_info['read'] or [0]
+        write = osd_info['write'] or [0]
+        errors = osd_info['errors']
+        if len(errors) == 0 or (len(read + write) > 0 and max(min(read), min(write)) > max(error[0] for error in errors) + interval):
+            return AlbaNode.OSD_STATUSES.OK, ''
+        return AlbaNode.OSD_STATUSES.WARNING, AlbaNode.OSD_STATUS_DETAILS.ERROR
+
+    def get_interval(self, alba_backend_guid):
+        # type: (str) -> int
+        """
+        Retrieve the amount of seconds after which errors of the OSDs of an ALBA Backend are no longer shown
+        :param alba_backend_guid: Guid of the ALBA Backend
+        :type alba_backend_guid: str
+        :return: The interval
+        :rtype: int
+        """
+        if alba_backend_guid not in self._evaluated_intervals:
+            self._evaluated_intervals[alba_backend_guid] = self._get_cached_interval(alba_backend_guid)
+        return self._evaluated_intervals[alba_backend_guid]
+
+    @classmethod
+    def invalidate(cls):
+        # type: () -> None
+        """
+        Drop the cached intervals, eg: after the settings have been changed
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            cls._intervals = {}
+
+    @classmethod
+    def _get_cached_interval(cls, alba_backend_guid):
+        # type: (str) -> int
+        """
+        Retrieve the interval of an ALBA Backend from the process-wide cache, reading the configuration when required
+        """
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._intervals = {}
+                cls._pid = os.getpid()
+            entry = cls._intervals.get(alba_backend_guid)
+        if entry is not None and time.time() - entry[0] < OSD_ERROR_INTERVAL_TTL:
+            return entry[1]
+
+        backend_interval_key = cls.BACKEND_INTERVAL_KEY.format(alba_backend_guid)
+        if Configuration.exists(backend_interval_key):
+            interval = Configuration.get(backend_interval_key)
+        else:
+            interval = Configuration.get(cls.GLOBAL_INTERVAL_KEY)
+        if is_unittest_mode() is False:  # The configuration of the unittests changes all the time
+            with cls._lock:
+                cls._intervals[alba_backend_guid] = (time.time(), interval)
+        return interval
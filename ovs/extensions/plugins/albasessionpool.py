@@ -0,0 +1,157 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA session pool module
+"""
+import os
+import time
+import requests
+from threading import Lock
+from requests.adapters import HTTPAdapter
+from ovs.constants.albanode import NODE_SESSION_CONNECTIONS, NODE_SESSION_IDLE_TIMEOUT, NODE_SESSION_MAX_NODES
+
+
+class AlbaSessionPool(object):
+    """
+    Process-wide keep-alive HTTP sessions towards the managers of the ALBA Nodes, keyed on the endpoint of the node
+    * All clients of a node (regardless of the AlbaNode instance they were created for) share the session, so its connections (and their TLS handshakes) are reused
+    * Every session keeps at most NODE_SESSION_CONNECTIONS connections alive and at most NODE_SESSION_MAX_NODES sessions are kept
+    * Sessions which have not been used for NODE_SESSION_IDLE_TIMEOUT seconds are closed
+    """
+    METHODS = {requests.get: 'get',
+               requests.put: 'put',
+               requests.post: 'post',
+               requests.patch: 'patch',
+               requests.delete: 'delete'}
+
+    _lock = Lock()
+    _sessions = {}  # {(ip, port): {'session': Session, 'last_used': float}}
+    _counters = {'requests': 0, 'connections': 0, 'sessions_created': 0, 'sessions_evicted': 0}  # Requests and connections of closed sessions only
+    _pid = os.getpid()
+
+    @classmethod
+    def get_method(cls, ip, port, method):
+        # type: (str, int, callable) -> callable
+        """
+        Retrieve the equivalent of a 'requests' method, executed through the session of the node
+        :param ip: IP of the node
+        :type ip: str
+        :param port: Port of the node
+        :type port: int
+        :param method: The 'requests' method (eg: requests.get)
+        :type method: callable
+        :return: The method of the session. The given method when it has no equivalent
+        :rtype: callable
+        """
+        name = cls.METHODS.get(method)
+        if name is None:
+            return method
+        return getattr(cls._get_session(ip, port), name)
+
+    @classmethod
+    def get_counters(cls):
+        # type: () -> Dict[str, int]
+        """
+        Retrieve the counters of this process
+        * requests: Requests executed through a session
+        * connections: Connections opened, each requiring a (TLS) handshake
+        * handshakes_avoided: Requests executed over a connection which was kept alive
+        * sessions / sessions_created / sessions_evicted: Sessions currently kept, created and closed
+        :return: The counters
+        :rtype: dict
+        """
+        with cls._lock:
+            counters = cls._counters.copy()
+            for entry in cls._sessions.itervalues():
+                amount_requests, amount_connections = cls._count(entry['session'])
+                counters['requests'] += amount_requests
+                counters['connections'] += amount_connections
+            counters['sessions'] = len(cls._sessions)
+        counters['handshakes_avoided'] = max(0, counters['requests'] - counters['connections'])
+        return counters
+
+    @classmethod
+    def clear(cls):
+        # type: () -> None
+        """
+        Close all sessions of this process
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            for key in cls._sessions.keys():
+                cls._evict(key)
+
+    @classmethod
+    def _get_session(cls, ip, port):
+        # type: (str, int) -> requests.Session
+        """
+        Retrieve the session of a node, creating it when required
+        """
+        now = time.time()
+        key = (ip, int(port))
+        with cls._lock:
+            if cls._pid != os.getpid():  # Sockets should not be shared with the parent process
+                cls._sessions = {}
+                cls._counters = dict((name, 0) for name in cls._counters)
+                cls._pid = os.getpid()
+            for other_key, entry in cls._sessions.items():
+                if other_key != key and now - entry['last_used'] > NODE_SESSION_IDLE_TIMEOUT:
+                    cls._evict(other_key)
+            entry = cls._sessions.get(key)
+            if entry is None:
+                if len(cls._sessions) >= NODE_SESSION_MAX_NODES:
+                    cls._evict(min(cls._sessions, key=lambda k: cls._sessions[k]['last_used']))
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=NODE_SESSION_CONNECTIONS)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                entry = {'session': session, 'last_used': now}
+                cls._sessions[key] = entry
+                cls._counters['sessions_created'] += 1
+            entry['last_used'] = now
+            return entry['session']
+
+    @classmethod
+    def _evict(cls, key):
+        # type: (tuple) -> None
+        """
+        Close the session of a node, keeping its counters. The lock must be held by the caller
+        """
+        session = cls._sessions.pop(key)['session']
+        amount_requests, amount_connections = cls._count(session)
+        cls._counters['requests'] += amount_requests
+        cls._counters['connections'] += amount_connections
+        cls._counters['sessions_evicted'] += 1
+        session.close()
+
+    @staticmethod
+    def _count(session):
+        # type: (requests.Session) -> Tuple[int, int]
+        """
+        Count the requests and opened connections of a session, based on its connection pools
+        """
+        amount_requests = 0
+        amount_connections = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    amount_requests += pool.num_requests
+                    amount_connections += pool.num_connections
+        return amount_requests, amount_connections
@@ -0,0 +1,436 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA statistics module
+"""
+import math
+import time
+import zlib
+import logging
+from array import array
+from threading import Lock
+from ovs.extensions.generic.volatilemutex import NoLockAvailableException, volatile_mutex
+from ovs.extensions.storage.volatilefactory import VolatileFactory
+
+
+class AlbaStatisticsBuffer(object):
+    """
+    Ring buffer holding the last samples of the operation counters of a set of OSDs
+    The samples are kept in flat arrays of doubles (1 slot per sample, OSD and key), so the buffer serializes into a compact blob
+    Missing values (eg: an OSD which did not report) are stored as NaN
+    """
+    CLOCK_SKEW_TOLERANCE = 5  # Seconds a sample can predate the latest one (eg: sampled on another node) before the clock is considered to have gone backwards
+
+    def __init__(self, osd_ids, keys, size):
+        # type: (List[str], List[str], int) -> None
+        """
+        :param osd_ids: IDs of the OSDs to keep samples for
+        :type osd_ids: list
+        :param keys: Counters to keep samples for
+        :type keys: list
+        :param size: Amount of samples to keep
+        :type size: int
+        """
+        self.osd_ids = list(osd_ids)
+        self.keys = list(keys)
+        self.size = size
+        self.position = size - 1  # Slot of the latest sample
+        self.timestamps = array('d', [float('nan')] * size)
+        self.counters = array('d', [float('nan')] * (size * len(self.osd_ids) * len(self.keys)))
+        self._osd_indexes = dict((osd_id, index) for index, osd_id in enumerate(self.osd_ids))
+
+    def to_blob(self):
+        # type: () -> dict
+        """
+        Serialize the buffer
+        :return: The serialized buffer
+        :rtype: dict
+        """
+        return {'osd_ids': self.osd_ids,
+                'keys': self.keys,
+                'position': self.position,
+                'timestamps': self.timestamps.tostring(),
+                'counters': self.counters.tostring()}
+
+    @classmethod
+    def from_blob(cls, blob, osd_ids, keys, size):
+        # type: (Optional[dict], List[str], List[str], int) -> AlbaStatisticsBuffer
+        """
+        Deserialize a buffer, adapting it to the requested OSDs, counters and size
+        Samples of OSDs which are no longer requested are dropped, newly requested OSDs start without samples
+        :param blob: The serialized buffer, see to_blob. None to start an empty buffer
+        :type blob: dict
+        :param osd_ids: IDs of the OSDs to keep samples for
+        :type osd_ids: list
+        :param keys: Counters to keep samples for
+        :type keys: list
+        :param size: Amount of samples to keep
+        :type size: int
+        :return: The buffer
+        :rtype: AlbaStatisticsBuffer
+        """
+        buffer_ = cls(osd_ids=osd_ids, keys=keys, size=size)
+        if blob is None:
+            return buffer_
+        stored = cls(osd_ids=blob['osd_ids'], keys=blob['keys'], size=0)
+        stored.timestamps = array('d')
+        stored.timestamps.fromstring(blob['timestamps'])
+        stored.counters = array('d')
+        stored.counters.fromstring(blob['counters'])
+        stored.size = len(stored.timestamps)
+        stored.position = blob['position']
+        if stored.size == size and stored.osd_ids == buffer_.osd_ids and stored.keys == buffer_.keys:
+            return stored
+        # Replay the stored samples (oldest first) into the adapted buffer
+        for slot in stored._get_slots()[-size:]:
+            buffer_.position = (buffer_.position + 1) % size
+            buffer_.timestamps[buffer_.position] = stored.timestamps[slot]
+            for osd_id in buffer_.osd_ids:
+                if osd_id not in stored._osd_indexes:
+                    continue
+                for key in buffer_.keys:
+                    if key in stored.keys:
+                        buffer_.counters[buffer_._get_index(buffer_.position, osd_id, key)] = stored.counters[stored._get_index(slot, osd_id, key)]
+        return buffer_
+
+    def add(self, timestamp, samples, repeat_window=0):
+        # type: (float, Dict[str, Dict[str, float]], float) -> None
+        """
+        Add a sample. A sample with the same timestamp as the latest one replaces it
+        A sample slightly older than the latest one (within CLOCK_SKEW_TOLERANCE) is ignored, a sample which is even older clears the buffer
+        :param timestamp: Time of the sample
+        :type timestamp: float
+        :param samples: The counters per OSD ID
+        :type samples: dict
+        :param repeat_window: Seconds during which the counters can be served out of a cache. A sample repeating the counters of the latest one within this window is ignored,
+                              as it would result in a zero rate followed by a rate over a too short interval
+        :type repeat_window: float
+        :return: None
+        :rtype: NoneType
+        """
+        latest = self.timestamps[self.position]
+        if not math.isnan(latest) and latest - self.CLOCK_SKEW_TOLERANCE <= timestamp < latest:  # Clocks of the samplers differ slightly
+            return
+        if not math.isnan(latest) and latest < timestamp < latest + repeat_window and self._repeats_latest(samples):
+            return
+        if not math.isnan(latest) and timestamp < latest:  # Clock went backwards, the samples can no longer be compared
+            self.timestamps = array('d', [float('nan')] * self.size)
+            self.counters = array('d', [float('nan')] * len(self.counters))
+        if math.isnan(latest) or timestamp != latest:
+            self.position = (self.position + 1) % self.size
+        self.timestamps[self.position] = timestamp
+        for osd_id in self.osd_ids:
+            osd_samples = samples.get(osd_id, {})
+            for key in self.keys:
+                self.counters[self._get_index(self.position, osd_id, key)] = osd_samples.get(key, float('nan'))
+
+    def get_rates(self, osd_ids):
+        # type: (List[str]) -> Dict[str, dict]
+        """
+        Compute the rates (per second) of the counters over the window, summed over the given OSDs
+        * n_ps: Average rate over the window
+        * n_ps_min, n_ps_max: Lowest and highest rate in between consecutive samples
+        Decreasing counters (eg: a restarted OSD) are considered to have not increased during that interval
+        :param osd_ids: IDs of the OSDs to sum the rates of
+        :type osd_ids: list
+        :return: The rates per counter
+        :rtype: dict
+        """
+        return self.get_combined_rates([self], osd_ids)
+
+    @classmethod
+    def get_combined_rates(cls, buffers, osd_ids):
+        # type: (List[AlbaStatisticsBuffer], List[str]) -> Dict[str, dict]
+        """
+        Compute the rates (per second) of the counters over the window, summed over the given OSDs of several buffers with the same counters, see get_rates
+        The rates in between consecutive samples are matched on the time of the samples
+        :param buffers: The buffers holding the samples of the OSDs
+        :type buffers: list
+        :param osd_ids: IDs of the OSDs to sum the rates of
+        :type osd_ids: list
+        :return: The rates per counter
+        :rtype: dict
+        """
+        rates = {}
+        for buffer_ in buffers:
+            for key in buffer_.keys:
+                rates.setdefault(key, {'n_ps': 0, 'interval_rates': {}})
+            for osd_id in osd_ids:
+                if osd_id not in buffer_._osd_indexes:
+                    continue
+                for key, (n_ps, interval_rates) in buffer_._get_osd_rates(osd_id).iteritems():
+                    rates[key]['n_ps'] += n_ps
+                    for timestamp, rate in interval_rates.iteritems():
+                        rates[key]['interval_rates'][timestamp] = rates[key]['interval_rates'].get(timestamp, 0) + rate
+        return dict((key, cls._summarize(key_rates['n_ps'], key_rates['interval_rates'])) for key, key_rates in rates.iteritems())
+
+    def get_rates_per_osd(self):
+        # type: () -> Dict[str, Dict[str, dict]]
+        """
+        Compute the rates (per second) of the counters over the window for every OSD, see get_rates
+        :return: The rates per counter per OSD ID
+        :rtype: dict
+        """
+        return dict((osd_id, dict((key, self._summarize(n_ps, interval_rates)) for key, (n_ps, interval_rates) in self._get_osd_rates(osd_id).iteritems()))
+                    for osd_id in self.osd_ids)
+
+    def _get_osd_rates(self, osd_id):
+        # type: (str) -> Dict[str, Tuple[float, Dict[int, float]]]
+        """
+        Compute the average rate over the window and the rate in between every pair of consecutive samples (keyed by the time of the latter) of every counter of an OSD
+        """
+        slots = self._get_slots()
+        rates = {}
+        for key in self.keys:
+            interval_rates = {}
+            previous_slot = None
+            increase = 0
+            duration = 0
+            for slot in slots:
+                value = self.counters[self._get_index(slot, osd_id, key)]
+                if math.isnan(value):
+                    previous_slot = None
+                    continue
+                if previous_slot is not None:
+                    interval = self.timestamps[slot] - self.timestamps[previous_slot]
+                    interval_increase = max(0, value - self.counters[self._get_index(previous_slot, osd_id, key)])
+                    increase += interval_increase
+                    duration += interval
+                    interval_rates[self.timestamps[slot]] = interval_increase / interval
+                previous_slot = slot
+            rates[key] = (increase / duration if duration > 0 else 0, interval_rates)
+        return rates
+
+    @staticmethod
+    def _summarize(n_ps, interval_rates):
+        # type: (float, Dict[float, float]) -> dict
+        """
+        Summarize the rates of a counter
+        """
+        return {'n_ps': n_ps,
+                'n_ps_min': min(interval_rates.values()) if len(interval_rates) > 0 else 0,
+                'n_ps_max': max(interval_rates.values()) if len(interval_rates) > 0 else 0}
+
+    def _repeats_latest(self, samples):
+        # type: (Dict[str, Dict[str, float]]) -> bool
+        """
+        Verify whether the counters of a sample equal those of the latest sample
+        """
+        for osd_id in self.osd_ids:
+            osd_samples = samples.get(osd_id, {})
+            for key in self.keys:
+                stored = self.counters[self._get_index(self.position, osd_id, key)]
+                value = osd_samples.get(key, float('nan'))
+                if stored != value and not (math.isnan(stored) and math.isnan(value)):
+                    return False
+        return True
+
+    def _get_slots(self):
+        # type: () -> List[int]
+        """
+        The slots holding a sample, oldest first
+        """
+        slots = [(self.position + offset) % self.size for offset in xrange(1, self.size + 1)]
+        return [slot for slot in slots if not math.isnan(self.timestamps[slot])]
+
+    def _get_index(self, slot, osd_id, key):
+        # type: (int, str, str) -> int
+        """
+        Index of a value within the counters
+        """
+        return (slot * len(self.osd_ids) + self._osd_indexes[osd_id]) * len(self.keys) + self.keys.index(key)
+
+
+class AlbaStatistics(object):
+    """
+    Turns the raw 'asd-multistatistics' output into the statistics reported by the OSDs and ALBA Backends
+    The statistics of all OSDs of an ALBA Backend are computed together: the last WINDOW_SIZE samples of the operation counters of all OSDs are kept
+    in the volatile store (see AlbaStatisticsBuffer), out of which the rates are derived
+    The samples are spread over a volatile entry per block of OSDs, keeping every entry well below the item size limit of memcache (1MiB)
+    The block of an OSD is derived from its ID over a fixed amount of blocks (BLOCK_COUNT), so adding or removing OSDs only affects the blocks of those OSDs
+    Entries of blocks which no longer hold any OSD are removed
+    Samplers (in any process) update the entries of an ALBA Backend one at a time, so no sample gets lost
+    """
+    # Reported key: keys in the 'asd-multistatistics' output which are collapsed into it
+    DATA_KEYS = {'apply': ['Apply', 'Apply2'],
+                 'multi_get': ['MultiGet', 'MultiGet2'],
+                 'range': ['Range'],
+                 'range_entries': ['RangeEntries'],
+                 'statistics': ['Statistics']}
+    WINDOW_SIZE = 6  # Amount of samples over which the rates are computed
+    LOCK_TIMEOUT = 2  # Seconds to wait for other samplers of the same ALBA Backend
+    BLOCK_COUNT = 16  # Amount of volatile entries an ALBA Backend can spread its samples over. 512 OSDs pickle into about 150kB (350kB with pickle protocol 0)
+
+    _logger = logging.getLogger(__name__)
+    _lock = Lock()
+    _samples = {}  # {alba_backend_guid: (timestamp, {osd_id: statistics}, [AlbaStatisticsBuffer])}
+
+    @classmethod
+    def get_osd_statistics(cls, alba_backend, max_age):
+        # type: (AlbaBackend, float) -> Dict[str, dict]
+        """
+        Retrieve the statistics of all OSDs of an ALBA Backend
+        The statistics are sampled at most once every 'max_age' seconds per process, so the OSDs of a Backend share a single computation
+        :param alba_backend: The ALBA Backend
+        :type alba_backend: ovs.dal.hybrids.albabackend.AlbaBackend
+        :param max_age: Seconds a sample can be reused
+        :type max_age: float
+        :return: The statistics per OSD ID, see compute_osd
+        :rtype: dict
+        """
+        return cls._sample(alba_backend, max_age)[1]
+
+    @classmethod
+    def get_backend_statistics(cls, alba_backend, osd_ids, max_age):
+        # type: (AlbaBackend, List[str], float) -> dict
+        """
+        Retrieve the totals of the statistics of a set of OSDs of an ALBA Backend
+        :param alba_backend: The ALBA Backend
+        :type alba_backend: ovs.dal.hybrids.albabackend.AlbaBackend
+        :param osd_ids: IDs of the OSDs to take into account
+        :type osd_ids: list
+        :param max_age: Seconds a sample can be reused
+        :type max_age: float
+        :return: Per reported key: the total amount of operations (n), the rates (n_ps, n_ps_min, n_ps_max), the overall max and min and the average of the avg latencies
+        :rtype: dict
+        """
+        _, osd_statistics, buffers = cls._sample(alba_backend, max_age)
+        totals = dict((key, {'n': 0, 'avg': [], 'max': [], 'min': []}) for key in cls.DATA_KEYS)
+        for osd_id in osd_ids:
+            statistics = osd_statistics.get(osd_id)
+            if not statistics:
+                continue
+            for key in cls.DATA_KEYS:
+                totals[key]['n'] += statistics[key]['n']
+                totals[key]['avg'].append(statistics[key]['avg'])
+                totals[key]['max'].append(statistics[key]['max'])
+                totals[key]['min'].append(statistics[key]['min'])
+        rates = AlbaStatisticsBuffer.get_combined_rates(buffers, [osd_id for osd_id in osd_ids if osd_statistics.get(osd_id)])
+        for key in cls.DATA_KEYS:
+            totals[key]['max'] = max(totals[key]['max']) if len(totals[key]['max']) > 0 else 0
+            totals[key]['min'] = min(totals[key]['min']) if len(totals[key]['min']) > 0 else 0
+            totals[key]['avg'] = sum(totals[key]['avg']) / len(totals[key]['avg']) if len(totals[key]['avg']) > 0 else 0
+            totals[key].update(rates[key])
+        return totals
+
+    @classmethod
+    def reset(cls):
+        # type: () -> None
+        """
+        Forget all samples of this process
+        """
+        with cls._lock:
+            cls._samples = {}
+
+    @classmethod
+    def compute_osd(cls, data, timestamp):
+        # type: (dict, float) -> dict
+        """
+        Collapse the 'asd-multistatistics' result of a single OSD into the reported keys
+        :param data: The 'asd-multistatistics' result of the OSD
+        :type data: dict
+        :param timestamp: Time of the sample
+        :type timestamp: float
+        :return: Per reported key: the amount of operations (n) and the max, min and avg latency
+        :rtype: dict
+        """
+        statistics = {'timestamp': timestamp}
+        for key, sources in cls.DATA_KEYS.iteritems():
+            n = 0
+            maxima = []
+            minima = []
+            total = 0
+            for source in sources:
+                if source in data:
+                    n += data[source]['n']
+                    maxima.append(data[source]['max'])
+                    minima.append(data[source]['min'])
+                    total += data[source]['avg'] * data[source]['n']
+            statistics[key] = {'n': n,
+                               'max': max(maxima) if len(maxima) > 0 else 0,
+                               'min': min(minima) if len(minima) > 0 else 0,
+                               'avg': total / float(n) if n > 0 else 0}
+        return statistics
+
+    @classmethod
+    def _sample(cls, alba_backend, max_age):
+        # type: (AlbaBackend, float) -> Tuple[float, Dict[str, dict], List[AlbaStatisticsBuffer]]
+        """
+        Retrieve the latest sample of an ALBA Backend, taking a new one when the latest one is older than 'max_age' seconds
+        """
+        now = time.time()
+        with cls._lock:
+            entry = cls._samples.get(alba_backend.guid)
+        if entry is not None and now - entry[0] < max_age:
+            return entry
+
+        keys = sorted(cls.DATA_KEYS)
+        # noinspection PyProtectedMember
+        source_timeout = [dynamic.timeout for dynamic in alba_backend._dynamics if dynamic.name == 'osd_statistics'][0]  # Samples are taken out of this cached property
+        osd_statistics = dict((osd_id, cls.compute_osd(data, now)) for osd_id, data in alba_backend.osd_statistics.iteritems())
+        volatile = VolatileFactory.get_client()
+        # noinspection PyProtectedMember
+        buffer_key = '{0}_osd_statistics_samples'.format(alba_backend._key)
+        mutex = volatile_mutex(buffer_key, wait=cls.LOCK_TIMEOUT)
+        try:
+            mutex.acquire()
+            locked = True
+        except NoLockAvailableException:
+            cls._logger.warning('Samples of ALBA Backend {0} are locked, the current sample will not be kept'.format(alba_backend.name))
+            locked = False
+        buffers = []
+        try:
+            blocks = cls._get_blocks(osd_statistics.keys())
+            if locked is True:  # Keep track of the blocks in use, to remove the entries of the blocks which are no longer used
+                for block in set(volatile.get(buffer_key) or []) - set(blocks):
+                    volatile.delete('{0}_{1}'.format(buffer_key, block))
+                volatile.set(buffer_key, sorted(blocks), int(max_age * (cls.WINDOW_SIZE + 1)))
+            for block, osd_ids in blocks.iteritems():
+                block_key = '{0}_{1}'.format(buffer_key, block)
+                buffer_ = AlbaStatisticsBuffer.from_blob(blob=volatile.get(block_key),
+                                                         osd_ids=osd_ids,
+                                                         keys=keys,
+                                                         size=cls.WINDOW_SIZE)
+                buffer_.add(timestamp=now,
+                            samples=dict((osd_id, dict((key, osd_statistics[osd_id][key]['n']) for key in keys)) for osd_id in osd_ids),
+                            repeat_window=source_timeout)
+                if locked is True:
+                    volatile.set(block_key, buffer_.to_blob(), int(max_age * (cls.WINDOW_SIZE + 1)))
+                buffers.append(buffer_)
+                for osd_id, osd_rates in buffer_.get_rates_per_osd().iteritems():
+                    for key, rates in osd_rates.iteritems():
+                        osd_statistics[osd_id][key].update(rates)
+        finally:
+            if locked is True:
+                mutex.release()
+        entry = (now, osd_statistics, buffers)
+        with cls._lock:
+            cls._samples[alba_backend.guid] = entry
+        return entry
+
+    @classmethod
+    def _get_blocks(cls, osd_ids):
+        # type: (List[str]) -> Dict[int, List[str]]
+        """
+        Divide the OSDs over BLOCK_COUNT blocks. The block of an OSD only depends on its ID
+        :return: The sorted OSD IDs per block, for the blocks holding any OSD
+        :rtype: dict
+        """
+        blocks = {}
+        for osd_id in sorted(osd_ids):
+            blocks.setdefault(zlib.crc32(osd_id) % cls.BLOCK_COUNT, []).append(osd_id)
+        return blocks
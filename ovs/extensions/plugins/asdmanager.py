@@ -20,7 +20,11 @@ Generic module for calling the ASD-Manager
 
 import time
 import base64
+import logging
+import requests
+from ovs.constants.albanode import NODE_REQUEST_DEADLINE
 from ovs.extensions.plugins.albabase import AlbaBaseClient
+from ovs.extensions.plugins.boundedexecutor import NodeRequestExecutor
 from ovs.extensions.generic.configuration import Configuration
 from ovs_extensions.generic.exceptions import NotFoundError
 
@@ -29,11 +33,13 @@ class ASDManagerClient(AlbaBaseClient):
     """
     ASD Manager Client
     """
+    _logger = logging.getLogger(__name__)
 
     def __init__(self, node, timeout=None):
         # type: (ovs.dal.hybrids.albanode.AlbaNode, int) -> None
         if timeout is None:
             timeout = Configuration.get('/ovs/alba/asdnodes/main|client_timeout', default=20)
+        self._refreshed = None  # Base URL and headers, together with the node data they were built from
         super(ASDManagerClient, self).__init__(node, timeout)
 
     def _refresh(self):
@@ -46,9 +52,12 @@ class ASDManagerClient(AlbaBaseClient):
         """
         # The node data might have changed
         # @todo revisit. THe node is never reloaded so this wont ever change?
-        base_url = 'https://{0}:{1}'.format(self.node.ip, self.node.port)
-        base_headers = {'Authorization': 'Basic {0}'.format(base64.b64encode('{0}:{1}'.format(self.node.username, self.node.password)).strip())}
-        return base_url, base_headers
+        identity = (self.node.ip, self.node.port, self.node.username, self.node.password)
+        if self._refreshed is None or self._refreshed[0] != identity:
+            base_url = 'https://{0}:{1}'.format(self.node.ip, self.node.port)
+            base_headers = {'Authorization': 'Basic {0}'.format(base64.b64encode('{0}:{1}'.format(self.node.username, self.node.password)).strip())}
+            self._refreshed = (identity, base_url, base_headers)
+        return self._refreshed[1], self._refreshed[2].copy()
 
     def get_metadata(self):
         # type: () -> dict
@@ -69,7 +78,7 @@ class ASDManagerClient(AlbaBaseClient):
         :rtype: dict
         """
         # Version 3 introduced 'slots'
-        if self.get_metadata()['_version'] >= 3:
+        if self.get_api_version() >= 3:
             data = self.extract_data(self.get('slots', timeout=5))
             for slot_info in data.itervalues():
                 for osd in slot_info.get('osds', {}).itervalues():
@@ -78,13 +87,33 @@ class ASDManagerClient(AlbaBaseClient):
 
         # Version 2 and older used AlbaDisk
         data = self.get(url='disks', timeout=5, clean=True)
+        disk_ids = []
         for disk_id, value in data.iteritems():
             if len(value.get('partition_aliases', [])) == 0:  # disks/<disk_id>/asds raises error if no partition_aliases could be found for current disk
                 value[ur'osds'] = {}
                 value[u'state'] = 'empty'
                 continue
+            disk_ids.append(disk_id)
 
-            value[u'osds'] = self.get(url='disks/{0}/asds'.format(disk_id), clean=True)
+        # The ASDs are fetched per disk, so these calls are executed concurrently
+        tasks = NodeRequestExecutor.map(function=lambda _disk_id: self.get(url='disks/{0}/asds'.format(_disk_id), clean=True),
+                                        items=disk_ids,
+                                        deadline=NODE_REQUEST_DEADLINE)
+        for disk_id, task in zip(disk_ids, tasks):
+            value = data[disk_id]
+            # A single slow or unreachable disk should not mark the whole node as down, only its own ASDs are unknown
+            if task.finished is False or isinstance(task.exception, (requests.ConnectionError, requests.Timeout)):
+                if task.finished is False:
+                    self._logger.warning('Retrieving the ASDs of disk {0} on ALBA Node {1} took longer than {2}s'.format(disk_id, self.node.ip, NODE_REQUEST_DEADLINE))
+                else:
+                    self._logger.warning('Retrieving the ASDs of disk {0} on ALBA Node {1} failed: {2}'.format(disk_id, self.node.ip, task.exception))
+                value[u'osds'] = {}
+                value[u'state'] = 'unknown'
+                value[u'state_detail'] = 'unreachable'
+                continue
+            if task.exception is not None:
+                raise task.exception
+            value[u'osds'] = task.result
             value[u'state'] = 'empty' if len(value['osds']) == 0 else 'ok'
             for osd_id, osd_info in value['osds'].iteritems():
                 osd_info[u'ips'] = osd_info.get('ips', [])
@@ -238,6 +267,8 @@ class ASDManagerClient(AlbaBaseClient):
                     counter += 1
                 if counter == max_counter:
                     raise Exception('Failed to update SDM')
+        finally:
+            self.invalidate_metadata()  # The API version can change with the update, even when the call failed because the manager restarted
 
     def update_execute_migration_code(self):
         # type: () -> None
@@ -257,6 +288,7 @@ class ASDManagerClient(AlbaBaseClient):
         :return: Version of the currently installed package
         :rtype: str
         """
+        self.invalidate_metadata()  # Called after an update, by then the API version might have changed
         return self.extract_data(self.get('update/installed_version_package/{0}'.format(package_name), timeout=60),
                                  old_key='version')
 
@@ -333,6 +365,27 @@ class ASDManagerClient(AlbaBaseClient):
         return self.extract_data(self.get('service_status/{0}'.format(name)),
                                  old_key='status')[1]
 
+    def get_maintenance_service_statuses(self):
+        # type: () -> List[Tuple[str, str]]
+        """
+        Retrieve all configured maintenance services from asd manager, together with their status
+        The ASD manager has no call to request the statuses in bulk, so a request per maintenance service is executed concurrently
+        :return: List of tuples containing the name and the status of the service
+        :rtype: list[tuple[str, str]]
+        """
+        service_names = [service_name for service_name in self.list_maintenance_services() if service_name.startswith('alba-maintenance_')]
+        tasks = NodeRequestExecutor.map(function=lambda _name: self.get_service_status(name=_name),
+                                        items=service_names,
+                                        deadline=NODE_REQUEST_DEADLINE)
+        statuses = []
+        for service_name, task in zip(service_names, tasks):
+            if task.finished is False:
+                raise requests.Timeout('Retrieving the status of service {0} on ALBA Node {1} took longer than {2}s'.format(service_name, self.node.ip, NODE_REQUEST_DEADLINE))
+            if task.exception is not None:
+                raise task.exception
+            statuses.append((service_name, task.result))
+        return statuses
+
     def sync_stack(self, stack, *args, **kwargs):
         # type: (dict, *any, **any) -> None
         """
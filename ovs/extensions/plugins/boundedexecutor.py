@@ -0,0 +1,214 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Bounded executor module
+"""
+import os
+import time
+import logging
+from Queue import Queue
+from threading import Event, Lock, Thread
+from ovs.constants.albanode import NODE_FANOUT_WORKERS, NODE_REQUEST_WORKERS
+
+
+class BoundedTask(object):
+    """
+    A function call handed to the BoundedExecutor
+    """
+    def __init__(self, function, args, deadline=None):
+        # type: (callable, tuple, Optional[float]) -> None
+        """
+        :param function: The function to call
+        :type function: callable
+        :param args: The arguments to call the function with
+        :type args: tuple
+        :param deadline: Timestamp after which the call is no longer started. None to start it regardless
+        :type deadline: float
+        """
+        self.function = function
+        self.args = args
+        self.deadline = deadline
+        self.result = None
+        self.exception = None
+        self.waiters = 1  # Callers interested in the outcome, the call is not started once all of them gave up
+        self._event = Event()
+
+    @property
+    def finished(self):
+        # type: () -> bool
+        """
+        Whether the call has returned or raised
+        """
+        return self._event.is_set()
+
+    @property
+    def abandoned(self):
+        # type: () -> bool
+        """
+        Whether nobody is interested in the outcome of the call anymore
+        """
+        return self.waiters <= 0 or (self.deadline is not None and self.deadline < time.time())
+
+    def wait(self, timeout):
+        # type: (float) -> bool
+        """
+        Wait for the call to finish
+        :param timeout: Maximum amount of seconds to wait
+        :type timeout: float
+        :return: Whether the call finished
+        :rtype: bool
+        """
+        self._event.wait(max(0, timeout))
+        return self._event.is_set()
+
+    def run(self):
+        # type: () -> None
+        """
+        Execute the call, storing its result or exception
+        """
+        try:
+            self.result = self.function(*self.args)
+        except Exception as ex:
+            self.exception = ex
+        finally:
+            self._event.set()
+
+
+class BoundedExecutor(object):
+    """
+    Process-wide pool of worker threads to fan out over (eg: the ALBA Nodes) without starting a thread per item
+    * The amount of threads is bounded, regardless of the amount of items or concurrent fan-outs
+    * Callers wait up to a deadline and receive the tasks which finished by then. Late tasks which already started keep on running in the background,
+      but their outcome is discarded. Late tasks which did not start yet are skipped
+    * Tasks with the same key are executed once while in progress: concurrent fan-outs over the same items share them
+    Subclasses get a pool of their own by redefining the queue, workers, lock, in-flight tasks and pid
+    """
+    MAX_WORKERS = NODE_FANOUT_WORKERS
+
+    _logger = logging.getLogger(__name__)
+    _lock = Lock()
+    _queue = Queue()
+    _workers = []
+    _in_flight = {}  # {key: BoundedTask}
+    _pid = os.getpid()
+
+    @classmethod
+    def map(cls, function, items, deadline, key=None):
+        # type: (callable, List[any], float, Optional[callable]) -> List[BoundedTask]
+        """
+        Call a function for every item and wait for the calls to finish
+        :param function: The function to call. Receives a single item as argument
+        :type function: callable
+        :param items: The items to call the function for
+        :type items: list
+        :param deadline: Seconds to wait for all calls to finish
+        :type deadline: float
+        :param key: Function returning a key for an item. Calls for items with the same key as a call in progress are not queued again, but share that call
+                    The function should then return the same outcome for all items with that key
+        :type key: callable
+        :return: The tasks, in order of the items. Late tasks are not 'finished'
+        :rtype: list[BoundedTask]
+        """
+        end = time.time() + deadline
+        tasks = []
+        queued = []
+        with cls._lock:
+            cls._reset_after_fork()
+            for item in items:
+                task_key = None if key is None else key(item)
+                task = cls._in_flight.get(task_key) if task_key is not None else None
+                if task is not None and task.finished is False:
+                    task.waiters += 1
+                    task.deadline = None if task.deadline is None else max(task.deadline, end)
+                else:
+                    task = BoundedTask(function, (item,), deadline=end)
+                    if task_key is not None:
+                        cls._in_flight[task_key] = task
+                    queued.append((task_key, task))
+                tasks.append(task)
+        cls._ensure_workers(len(queued))
+        for task_key, task in queued:
+            cls._queue.put((task_key, task))
+        for task in tasks:
+            if task.wait(end - time.time()) is False:
+                break
+        with cls._lock:
+            for task in tasks:
+                if task.finished is False:
+                    task.waiters -= 1
+        return tasks
+
+    @classmethod
+    def _reset_after_fork(cls):
+        # type: () -> None
+        """
+        Drop the state inherited from the parent process, as threads do not survive a fork. Must be called while holding the lock
+        """
+        if cls._pid != os.getpid():
+            cls._queue = Queue()
+            cls._workers = []
+            cls._in_flight = {}
+            cls._pid = os.getpid()
+
+    @classmethod
+    def _ensure_workers(cls, amount):
+        # type: (int) -> None
+        """
+        Start additional workers, up to the maximum amount
+        """
+        with cls._lock:
+            cls._reset_after_fork()
+            while len(cls._workers) < min(amount, cls.MAX_WORKERS):
+                worker = Thread(target=cls._work, args=(cls._queue,), name='{0}-{1}'.format(cls.__name__, len(cls._workers)))
+                worker.daemon = True
+                worker.start()
+                cls._workers.append(worker)
+
+    @classmethod
+    def _work(cls, queue):
+        # type: (Queue) -> None
+        """
+        Execute tasks from the queue, forever. Tasks nobody waits for anymore are skipped
+        """
+        while True:
+            task_key, task = queue.get()
+            try:
+                with cls._lock:
+                    abandoned = task.abandoned
+                if abandoned is False:  # Abandoned tasks are never started, so they remain unfinished
+                    task.run()
+            except Exception:
+                cls._logger.exception('Unexpected error while executing a task')
+            finally:
+                if task_key is not None:
+                    with cls._lock:
+                        if cls._in_flight.get(task_key) is task:
+                            del cls._in_flight[task_key]
+
+
+class NodeRequestExecutor(BoundedExecutor):
+    """
+    Pool of worker threads executing the concurrent requests towards a single node
+    Separate from the pool fanning out over the nodes, as those tasks wait for these
+    """
+    MAX_WORKERS = NODE_REQUEST_WORKERS
+
+    _lock = Lock()
+    _queue = Queue()
+    _workers = []
+    _in_flight = {}
+    _pid = os.getpid()
@@ -0,0 +1,68 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Configuration path resolver module
+"""
+import time
+from threading import Lock
+from ovs.constants.albarakoon import CONFIG_PATH_CACHE_TIMEOUT
+from ovs.extensions.generic.configuration import Configuration
+
+
+class ConfigPathResolver(object):
+    """
+    Memoizes the configuration paths (eg: 'arakoon://config/ovs/arakoon/mybackend-abm/config?ini=...') of Arakoon cluster configuration keys
+    Resolving a path consults the configuration management settings, which is wasteful to repeat for every ALBA call
+    """
+    _lock = Lock()
+    _paths = {}  # {config key: (expiration, path)}
+
+    @classmethod
+    def resolve(cls, key):
+        # type: (str) -> str
+        """
+        Retrieve the configuration path for a configuration key
+        :param key: The configuration key, eg: the 'config_location' of an ABMCluster
+        :type key: str
+        :return: The configuration path
+        :rtype: str
+        """
+        now = time.time()
+        with cls._lock:
+            entry = cls._paths.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        path = Configuration.get_configuration_path(key)
+        with cls._lock:
+            cls._paths[key] = (now + CONFIG_PATH_CACHE_TIMEOUT, path)
+        return path
+
+    @classmethod
+    def invalidate(cls, key=None):
+        # type: (Optional[str]) -> None
+        """
+        Forget the resolved path of a configuration key, eg: after (re)configuring the Arakoon cluster
+        :param key: The configuration key to forget. None to forget all keys
+        :type key: str
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            if key is None:
+                cls._paths = {}
+            else:
+                cls._paths.pop(key, None)
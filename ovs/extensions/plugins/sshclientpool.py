@@ -0,0 +1,115 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+SSH client pool module
+"""
+import os
+import time
+import logging
+from threading import Lock
+from ovs_extensions.constants import is_unittest_mode
+from ovs.extensions.generic.sshclient import SSHClient
+
+
+class SSHClientPool(object):
+    """
+    Keeps SSH clients around per endpoint and user, so recurring tasks (eg: the Arakoon checkups) do not pay the SSH handshake over and over
+    * Clients which have not been used for IDLE_TIMEOUT seconds are evicted
+    * Clients which have not been used for HEALTH_CHECK_INTERVAL seconds are verified before being handed out again
+    """
+    IDLE_TIMEOUT = 900
+    HEALTH_CHECK_INTERVAL = 60
+
+    _logger = logging.getLogger(__name__)
+    _lock = Lock()
+    _clients = {}  # {(ip, username): {'client': SSHClient, 'last_used': float}}
+    _pid = os.getpid()
+
+    @classmethod
+    def get(cls, endpoint, username='ovs'):
+        # type: (Union[str, StorageRouter], str) -> SSHClient
+        """
+        Retrieve a (connected) SSH client
+        :param endpoint: IP or StorageRouter to connect to
+        :type endpoint: str|ovs.dal.hybrids.storagerouter.StorageRouter
+        :param username: User to connect as
+        :type username: str
+        :return: The SSH client
+        :rtype: ovs.extensions.generic.sshclient.SSHClient
+        :raises UnableToConnectException: When no connection could be made
+        """
+        if is_unittest_mode():
+            # The mocked SSH clients keep state per test, so never share them
+            return SSHClient(endpoint, username=username)
+
+        key = (getattr(endpoint, 'ip', endpoint), username)
+        now = time.time()
+        with cls._lock:
+            if cls._pid != os.getpid():  # Forked, the connections of the parent can't be shared
+                cls._clients = {}
+                cls._pid = os.getpid()
+            for other_key, other_entry in cls._clients.items():
+                if now - other_entry['last_used'] > cls.IDLE_TIMEOUT:
+                    cls._clients.pop(other_key)
+            entry = cls._clients.get(key)
+
+        if entry is not None:
+            if now - entry['last_used'] < cls.HEALTH_CHECK_INTERVAL or cls._is_healthy(entry['client']) is True:
+                entry['last_used'] = now
+                return entry['client']
+            cls._logger.info('Discarding unhealthy SSH client for {0}@{1}'.format(username, key[0]))
+
+        client = SSHClient(endpoint, username=username)
+        with cls._lock:
+            cls._clients[key] = {'client': client, 'last_used': time.time()}
+        return client
+
+    @classmethod
+    def discard(cls, endpoint, username='ovs'):
+        # type: (Union[str, StorageRouter], str) -> None
+        """
+        Remove the client for an endpoint from the pool, eg: after a connection failure
+        :param endpoint: IP or StorageRouter of the client
+        :type endpoint: str|ovs.dal.hybrids.storagerouter.StorageRouter
+        :param username: User of the client
+        :type username: str
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            cls._clients.pop((getattr(endpoint, 'ip', endpoint), username), None)
+
+    @classmethod
+    def clear(cls):
+        # type: () -> None
+        """
+        Remove all clients from the pool
+        """
+        with cls._lock:
+            cls._clients = {}
+
+    @staticmethod
+    def _is_healthy(client):
+        # type: (SSHClient) -> bool
+        """
+        Verify whether the connection of the client still works
+        """
+        try:
+            client.run(['true'])
+            return True
+        except Exception:
+            return False
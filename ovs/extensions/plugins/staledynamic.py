@@ -0,0 +1,138 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Stale dynamic module
+"""
+import time
+import logging
+from functools import wraps
+from threading import Thread
+from ovs_extensions.constants import is_unittest_mode
+from ovs.extensions.storage.volatilefactory import VolatileFactory
+
+
+class StaleDynamic(object):
+    """
+    Opt-in stale-while-revalidate mode for Dynamic properties of the hybrids
+    When the DAL recalculates a decorated dynamic, the last calculated value is returned immediately while a single background refresh (across all processes)
+    recalculates the value for the next reader
+    As the DAL caches the returned value for the timeout of the dynamic, only values which remain within the maximum staleness for that long are served
+    Usage:
+        @StaleDynamic.serve(max_staleness=60)
+        def _stack(self):
+            ...
+    The hybrid should invalidate the stale values as well when its dynamics get invalidated, see StaleDynamic.invalidate
+    Do not decorate a dynamic which is built out of another decorated dynamic: a stale value built out of a stale value could be twice as old
+    """
+    REFRESH_LOCK_TIMEOUT = 300  # Seconds after which the refresh lock expires, in case the refreshing process died
+
+    _logger = logging.getLogger(__name__)
+
+    @classmethod
+    def serve(cls, max_staleness):
+        # type: (int) -> callable
+        """
+        Decorator for the method of a Dynamic property
+        :param max_staleness: Maximum age (in seconds) of a value which can be served, including the time it is cached by the DAL. Older values are recalculated synchronously
+        :type max_staleness: int
+        :return: The decorator
+        :rtype: callable
+        """
+        def wrap(function):
+            name = function.__name__[1:]  # Eg: '_local_stack' -> 'local_stack'
+
+            @wraps(function)
+            def new_function(self, dynamic=None):
+                if is_unittest_mode() is True:
+                    return function(self)
+                volatile = VolatileFactory.get_client()
+                key = cls._get_key(self, name)
+                entry = volatile.get(key)
+                max_age = max_staleness - (0 if dynamic is None else dynamic.timeout)  # The DAL keeps serving the returned value for its timeout
+                if entry is None or time.time() - entry['timestamp'] > max_age:
+                    return cls._refresh(self, function, key, max_staleness)
+                if volatile.add('{0}_refreshing'.format(key), True, cls.REFRESH_LOCK_TIMEOUT):
+                    thread = Thread(target=cls._refresh_in_background, args=(self, function, key, max_staleness),
+                                    name='stale-dynamic-{0}'.format(name))
+                    thread.daemon = True
+                    thread.start()
+                return entry['value']
+
+            new_function.serves_stale = True
+            return new_function
+        return wrap
+
+    @classmethod
+    def invalidate(cls, data_object, properties=None):
+        # type: (DataObject, Optional[Union[str, List[str]]]) -> None
+        """
+        Drop the stale values of a data object, so the next read recalculates them synchronously
+        :param data_object: The data object to invalidate the values of
+        :type data_object: ovs.dal.dataobject.DataObject
+        :param properties: Name(s) of the dynamics to invalidate. None to invalidate all of them
+        :type properties: str|list
+        :return: None
+        :rtype: NoneType
+        """
+        if is_unittest_mode() is True:
+            return
+        if properties is None:
+            properties = [attribute[1:] for attribute in dir(type(data_object)) if getattr(getattr(type(data_object), attribute, None), 'serves_stale', False) is True]
+        elif isinstance(properties, basestring):
+            properties = [properties]
+        volatile = VolatileFactory.get_client()
+        for name in properties:
+            if getattr(getattr(type(data_object), '_{0}'.format(name), None), 'serves_stale', False) is True:
+                key = cls._get_key(data_object, name)
+                volatile.set('{0}_invalidated'.format(key), time.time(), cls.REFRESH_LOCK_TIMEOUT)  # Refreshes which were already running should not store their value
+                volatile.delete(key)
+
+    @classmethod
+    def _refresh(cls, data_object, function, key, max_staleness):
+        # type: (DataObject, callable, str, int) -> any
+        """
+        Calculate the value and store it to be served to later readers
+        """
+        start = time.time()
+        value = function(data_object)
+        volatile = VolatileFactory.get_client()
+        if volatile.get('{0}_invalidated'.format(key), 0) < start:
+            volatile.set(key, {'value': value, 'timestamp': start}, max_staleness)
+        return value
+
+    @classmethod
+    def _refresh_in_background(cls, data_object, function, key, max_staleness):
+        # type: (DataObject, callable, str, int) -> None
+        """
+        Calculate the value in the background, releasing the refresh lock afterwards
+        The value is calculated on a freshly loaded instance, as the instance of the reader is not thread-safe
+        """
+        try:
+            cls._refresh(type(data_object)(data_object.guid), function, key, max_staleness)
+        except Exception:
+            cls._logger.exception('Refreshing {0} failed'.format(key))
+        finally:
+            VolatileFactory.get_client().delete('{0}_refreshing'.format(key))
+
+    @staticmethod
+    def _get_key(data_object, name):
+        # type: (DataObject, str) -> str
+        """
+        Volatile key holding the last value of a dynamic
+        """
+        # noinspection PyProtectedMember
+        return '{0}_stale_{1}'.format(data_object._key, name)
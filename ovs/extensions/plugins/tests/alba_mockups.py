@@ -20,6 +20,7 @@ Mocks Alba backends
 import re
 import requests
 from ovs.extensions.db.arakooninstaller import ArakoonClusterConfig
+from ovs.extensions.plugins.albacli import AlbaError
 from ovs.extensions.plugins.asdmanager import ASDManagerClient
 
 
@@ -32,6 +33,8 @@ class VirtualAlbaBackend(object):
     data = {}
     run_log = {}
     statistics = None
+    claimed_osds = None
+    purge_errors = {}
 
     @staticmethod
     def clean_data():
@@ -41,6 +44,8 @@ class VirtualAlbaBackend(object):
         VirtualAlbaBackend.data = {}
         VirtualAlbaBackend.run_log = {}
         VirtualAlbaBackend.statistics = None
+        VirtualAlbaBackend.claimed_osds = None
+        VirtualAlbaBackend.purge_errors = {}
 
     @staticmethod
     def update_abm_client_config(**kwargs):
@@ -140,6 +145,24 @@ class VirtualAlbaBackend(object):
         _ = kwargs
         return VirtualAlbaBackend.statistics
 
+    @staticmethod
+    def list_osds(**kwargs):
+        """
+        Lists the claimed osds, including their usage
+        """
+        _ = kwargs
+        return VirtualAlbaBackend.claimed_osds
+
+    @staticmethod
+    def purge_osd(**kwargs):
+        """
+        Purges an osd. Fails with the error message registered in 'purge_errors' for the osd
+        """
+        osd_id = kwargs['long-id']
+        if osd_id in VirtualAlbaBackend.purge_errors:
+            raise AlbaError(VirtualAlbaBackend.purge_errors[osd_id], 0, AlbaError.ALBAMGR_EXCEPTION)
+        return None
+
     @staticmethod
     def list_all_osds(**kwargs):
         """
@@ -0,0 +1,140 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Replays recorded ALBA responses
+Fixtures are recorded by setting 'record_location' in the ALBA CLI settings (see ovs.extensions.plugins.albaclirecorder)
+The salt file of the recording directory is picked up from the directory of the fixture files, when present
+A replay takes precedence over the VirtualAlbaBackend in unittest mode, so the DAL of the unittests can be used to set up the model
+Usage, eg: to benchmark a dynamic against production-sized responses without a live cluster:
+    replay = AlbaCLIReplay(['/tmp/recordings/alba_cli_1234.jsonl'])
+    replay.activate()
+    try:
+        alba_backend.invalidate_dynamics('local_summary')
+        alba_backend.local_summary
+    finally:
+        replay.deactivate()
+"""
+import os
+import json
+import time
+import random
+from ovs.extensions.plugins.albacli import AlbaCLI
+from ovs.extensions.plugins.albaclirecorder import AlbaCLIRecorder
+
+
+class AlbaCLIReplay(object):
+    """
+    Serves recorded ALBA responses instead of executing the 'alba' binary
+    Responses are matched on command and arguments (the --config argument is ignored as the replaying environment differs anyway), falling back to the command only
+    The arguments are anonymised like they were recorded, using the salt of the recording directory. Without that salt, only arguments which needed no anonymisation can match
+    Every response is delayed by a latency sampled from the durations recorded for that command
+    """
+    def __init__(self, locations, latency_factor=1.0, seed=None):
+        # type: (List[str], float, Optional[int]) -> None
+        """
+        :param locations: Fixture files to load
+        :type locations: list
+        :param latency_factor: Factor to apply on the sampled latencies. 0 disables the delay
+        :type latency_factor: float
+        :param seed: Seed for sampling the latencies, for reproducible runs
+        :type seed: int
+        """
+        self.latency_factor = latency_factor
+        self.calls = []  # The replayed commands, in order
+        self._random = random.Random(seed)
+        self._responses = {}  # {(command, arguments): [recording]}
+        self._latencies = {}  # {command: [duration]}
+        self._positions = {}  # {(command, arguments): position}, the next recording to serve
+        self._salts = []  # Salts the loaded recordings were anonymised with
+        for location in locations:
+            salt = AlbaCLIRecorder.load_salt(os.path.dirname(os.path.abspath(location)))
+            if salt is not None and salt not in self._salts:
+                self._salts.append(salt)
+            with open(location) as fixture_file:
+                for line in fixture_file:
+                    if line.strip():
+                        self.add(json.loads(line))
+
+    def add(self, recording):
+        # type: (dict) -> None
+        """
+        Add a recording
+        :param recording: A recording as written by the AlbaCLIRecorder
+        :type recording: dict
+        :return: None
+        :rtype: NoneType
+        """
+        command = recording['command']
+        for key in [(command, self._arguments_key(recording['arguments'])), (command, None)]:
+            self._responses.setdefault(key, []).append(recording)
+        self._latencies.setdefault(command, []).append(recording['duration'])
+
+    def activate(self):
+        # type: () -> None
+        """
+        Let all local ALBA calls of this process be served by this replay
+        """
+        # noinspection PyProtectedMember
+        AlbaCLI._replay = self
+
+    def deactivate(self):
+        # type: () -> None
+        """
+        Execute ALBA calls for real again
+        """
+        # noinspection PyProtectedMember
+        if AlbaCLI._replay is self:
+            AlbaCLI._replay = None
+
+    def execute(self, cmd_list):
+        # type: (List[str]) -> Tuple[int, str, str]
+        """
+        Replay the response for a command
+        Multiple recordings for the same command and arguments are served round robin
+        :param cmd_list: The command to replay
+        :type cmd_list: list
+        :return: Exit code, stdout and stderr
+        :rtype: tuple
+        """
+        command = cmd_list[1]
+        arguments = cmd_list[2:]
+        self.calls.append(cmd_list)
+        if len(self._salts) == 0:
+            recording_keys = [(command, self._arguments_key(arguments))]
+        else:
+            recording_keys = [(command, self._arguments_key([AlbaCLIRecorder.anonymise(argument, salt=salt) for argument in arguments])) for salt in self._salts]
+        recording_keys.append((command, None))
+        for recording_key in recording_keys:
+            if recording_key in self._responses:
+                break
+        else:
+            return 1, '', 'No recording available for command {0}'.format(command)
+        recordings = self._responses[recording_key]
+        position = self._positions.get(recording_key, 0)
+        self._positions[recording_key] = position + 1
+        recording = recordings[position % len(recordings)]
+        if self.latency_factor > 0:
+            time.sleep(self._random.choice(self._latencies[command]) * self.latency_factor)
+        return recording['exit_code'], recording['output'], recording['stderr']
+
+    @staticmethod
+    def _arguments_key(arguments):
+        # type: (List[str]) -> tuple
+        """
+        Arguments relevant for matching a recording
+        """
+        return tuple(sorted(argument for argument in arguments if not argument.startswith('--config=')))
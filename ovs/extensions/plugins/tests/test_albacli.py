@@ -0,0 +1,356 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+ALBA CLI test module
+"""
+import os
+import stat
+import time
+import shutil
+import tempfile
+import unittest
+from threading import Event, Thread
+from ovs.constants.albacli import CLI_DEFAULT_SETTINGS
+from ovs.extensions.plugins.albacli import AlbaCLI, AlbaError
+from ovs.extensions.plugins.albaclicache import AlbaCLICache
+from ovs.extensions.plugins.albaclilimiter import AlbaCLILimiter
+from ovs.extensions.plugins.albaclimetrics import AlbaCLIMetrics
+from ovs.extensions.plugins.albaclimultiplexer import ProcessMultiplexer, ProcessTimeoutError
+from ovs.extensions.plugins.albaclipool import AlbaCLIPool, AlbaCLITimeoutError
+from ovs.extensions.plugins.tests.alba_replay import AlbaCLIReplay
+
+
+class AlbaCLITest(unittest.TestCase):
+    """
+    This test class will validate the plumbing around the execution of ALBA commands
+    """
+    CONFIG = 'arakoon://config/ovs/arakoon/backend-abm/config?ini=%2Fopt%2FOpenvStorage%2Fconfig%2Farakoon_cacc.ini'
+    # Fake 'alba' binary. Commands 'sleep-<seconds>' sleep before answering, commands 'stream-<seconds>' sleep halfway their answer [1, 2, 3]
+    # Its process ID is written to a file named after the command
+    FAKE_ALBA = """#!/bin/sh
+echo $$ > "$(dirname "$0")/$1.pid"
+case "$1" in
+    sleep-*) sleep "${1#sleep-}";;
+    stream-*) echo '{"success": true, "result": [1, 2,'; sleep "${1#stream-}"; echo '3]}'; exit 0;;
+esac
+echo '{"success": true, "result": []}'
+"""
+
+    def setUp(self):
+        """
+        (Re)Sets the process-wide state on every test
+        """
+        AlbaCLICache.invalidate()
+        AlbaCLIMetrics.reset()
+        self.directory = tempfile.mkdtemp(prefix='alba_cli_')
+        self.binary = os.path.join(self.directory, 'alba')
+        with open(self.binary, 'w') as binary_file:
+            binary_file.write(self.FAKE_ALBA)
+        os.chmod(self.binary, stat.S_IRWXU)
+
+    def tearDown(self):
+        """
+        Clean up the unittest
+        """
+        AlbaCLICache.invalidate()
+        AlbaCLIPool.clear()
+        shutil.rmtree(self.directory)
+
+    def _fake_command(self, name):
+        """
+        Build the command list of a command executed by the fake 'alba' binary
+        """
+        return [self.binary, name, '--config={0}'.format(self.CONFIG), '--to-json']
+
+    def _get_pid(self, name):
+        """
+        Retrieve the process ID of the last execution of a command by the fake 'alba' binary
+        """
+        with open(os.path.join(self.directory, '{0}.pid'.format(name))) as pid_file:
+            return int(pid_file.read().strip())
+
+    def _command(self, name):
+        """
+        Build the command list of an ALBA command
+        """
+        return ['alba', name, '--config={0}'.format(self.CONFIG), '--to-json']
+
+    def test_cache_single_flight(self):
+        """
+        Validates whether concurrent identical requests result in a single execution
+        and whether requests arriving after an invalidation do not join the older execution
+        """
+        executions = []
+        release = Event()
+
+        def _executor(output):
+            def _execute():
+                executions.append(output)
+                release.wait(10)
+                return 0, output, ''
+            return _execute
+
+        results = []
+        threads = [Thread(target=lambda: results.append(AlbaCLICache.execute(cmd_list=self._command('list-osds'), config=self.CONFIG, timeout=60,
+                                                                             max_entries=10, executor=_executor('first'))))
+                   for _ in xrange(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)  # Let all requests join the first execution
+        self.assertListEqual(executions, ['first'])
+
+        AlbaCLICache.invalidate(self.CONFIG)
+        late = []
+        late_thread = Thread(target=lambda: late.append(AlbaCLICache.execute(cmd_list=self._command('list-osds'), config=self.CONFIG, timeout=60,
+                                                                             max_entries=10, executor=_executor('second'))))
+        late_thread.start()
+        time.sleep(0.2)
+        self.assertListEqual(executions, ['first', 'second'])
+
+        release.set()
+        for thread in threads + [late_thread]:
+            thread.join()
+        self.assertListEqual(results, [(0, 'first', '')] * 5)
+        self.assertListEqual(late, [(0, 'second', '')])
+        # Only the output of the execution which started after the invalidation is cached
+        self.assertEqual(AlbaCLICache.execute(cmd_list=self._command('list-osds'), config=self.CONFIG, timeout=60,
+                                              max_entries=10, executor=_executor('third')), (0, 'second', ''))
+        self.assertListEqual(executions, ['first', 'second'])
+
+    def test_cache_expiry_and_eviction(self):
+        """
+        Validates whether cached output expires after its timeout and whether the least recently used entries are evicted first
+        """
+        executions = []
+
+        def _execute(name, timeout=60):
+            def _executor():
+                executions.append(name)
+                return 0, name, ''
+            return AlbaCLICache.execute(cmd_list=self._command(name), config=self.CONFIG, timeout=timeout, max_entries=2, executor=_executor)
+
+        _execute('list-presets', timeout=0.1)
+        _execute('list-presets', timeout=0.1)
+        self.assertListEqual(executions, ['list-presets'])
+        time.sleep(0.2)
+        _execute('list-presets', timeout=0.1)
+        self.assertListEqual(executions, ['list-presets', 'list-presets'])
+
+        del executions[:]
+        _execute('list-osds')
+        _execute('list-namespaces')
+        _execute('list-osds')  # Most recently used now
+        _execute('list-nsm-hosts')  # Evicts 'list-namespaces'
+        _execute('list-osds')
+        _execute('list-namespaces')
+        self.assertListEqual(executions, ['list-osds', 'list-namespaces', 'list-nsm-hosts', 'list-namespaces'])
+
+        # Failed executions are not cached
+        del executions[:]
+        for _ in xrange(2):
+            AlbaCLICache.execute(cmd_list=self._command('list-decommissioning-osds'), config=self.CONFIG, timeout=60, max_entries=2,
+                                 executor=lambda: executions.append('failed') or (1, '', 'error'))
+        self.assertListEqual(executions, ['failed', 'failed'])
+
+    def test_pool_sizing(self):
+        """
+        Validates whether the pool grows up to its size, keeps at most 'max_idle' runner processes and stops them once they are idle for too long
+        """
+        pool = AlbaCLIPool.get_pool(config=self.CONFIG, size=2, max_idle=1, idle_timeout=60)
+        self.assertIs(AlbaCLIPool.get_pool(config=self.CONFIG, size=2, max_idle=1, idle_timeout=60), pool)
+        worker_1, _ = pool.acquire()
+        worker_2, _ = pool.acquire()
+        self.assertIsNot(worker_1, worker_2)
+        with self.assertRaises(AlbaCLITimeoutError):
+            pool.acquire(timeout=0.2)
+        pool.release(worker_1)
+        pool.release(worker_2)
+        self.assertListEqual(pool._idle, [worker_1])
+        self.assertFalse(worker_2.alive)
+        self.assertEqual(pool.execute(['echo', 'pooled']), (0, 'pooled\n', ''))
+        self.assertListEqual(pool._idle, [worker_1])  # The idle runner process got reused
+
+        pool = AlbaCLIPool.get_pool(config='{0}_other'.format(self.CONFIG), size=2, max_idle=1, idle_timeout=0.2)
+        self.assertEqual(pool.execute(['echo', 'reaped']), (0, 'reaped\n', ''))
+        worker = pool._idle[0]
+        time.sleep(0.5)  # Without any further command, the idle runner process is stopped
+        self.assertListEqual(pool._idle, [])
+        self.assertFalse(worker.alive)
+
+    def test_pool_timeouts(self):
+        """
+        Validates whether the time spent waiting for a runner process counts towards the timeout of the command
+        """
+        pool = AlbaCLIPool.get_pool(config=self.CONFIG, size=1, max_idle=1, idle_timeout=60)
+        worker, _ = pool.acquire()
+        start = time.time()
+        with self.assertRaises(AlbaCLITimeoutError):
+            pool.execute(['echo', 'waiting'], timeout=0.3)  # The only runner process stays busy for longer than the timeout
+        self.assertLess(time.time() - start, 1)
+
+        Thread(target=lambda: time.sleep(0.3) or pool.release(worker)).start()
+        start = time.time()
+        with self.assertRaises(AlbaCLITimeoutError):
+            pool.execute(['sleep', '2'], timeout=0.6)  # Gets a runner process after 0.3s, so the command is killed after another 0.3s
+        self.assertLess(time.time() - start, 1.5)
+        self.assertEqual(pool.execute(['echo', 'recovered'], timeout=5), (0, 'recovered\n', ''))
+
+    def test_pool_dead_runner(self):
+        """
+        Validates whether a runner process which died is replaced
+        """
+        pool = AlbaCLIPool.get_pool(config=self.CONFIG, size=1, max_idle=1, idle_timeout=60)
+        self.assertEqual(pool.execute(['echo', 'first']), (0, 'first\n', ''))
+        worker = pool._idle[0]
+        worker._process.kill()
+        worker._process.wait()
+        self.assertEqual(pool.execute(['echo', 'second']), (0, 'second\n', ''))
+        self.assertEqual(len(pool._idle), 1)
+        self.assertIsNot(pool._idle[0], worker)
+
+    def test_limiter(self):
+        """
+        Validates whether the limiter bounds the concurrent calls and gives up waiting after the timeout
+        """
+        limiter = AlbaCLILimiter.get_limiter(config=self.CONFIG, limit=1)
+        self.assertIs(AlbaCLILimiter.get_limiter(config=self.CONFIG, limit=1), limiter)
+        limiter.acquire()
+        try:
+            self.assertFalse(limiter.try_acquire())
+            start = time.time()
+            with self.assertRaises(AlbaCLITimeoutError):
+                limiter.acquire(timeout=0.2)
+            self.assertGreaterEqual(time.time() - start, 0.2)
+            Thread(target=lambda: time.sleep(0.2) or limiter.release()).start()
+            self.assertGreaterEqual(limiter.acquire(timeout=5), 0.1)  # Returns the time spent waiting
+        finally:
+            limiter.release()
+        self.assertTrue(limiter.try_acquire())
+        limiter.release()
+
+        limiter = AlbaCLILimiter.get_limiter(config=self.CONFIG, limit=0)  # Disabled
+        self.assertTrue(all(limiter.try_acquire() for _ in xrange(10)))
+        for _ in xrange(10):
+            limiter.release()
+
+    def test_execute_timeout(self):
+        """
+        Validates whether a command exceeding the call timeout gets killed and releases its slot,
+        and whether a call which timed out waiting for a slot is recorded as queue wait
+        """
+        for pool_size in [0, 1]:
+            settings = dict(CLI_DEFAULT_SETTINGS, call_timeout=0.5, max_concurrent_calls=1, pool_size=pool_size)
+            cmd_list = self._fake_command('sleep-5')
+            start = time.time()
+            with self.assertRaises(AlbaCLITimeoutError):
+                AlbaCLI._execute_uncached(cmd_list=cmd_list, cmd_string=' '.join(cmd_list), config=self.CONFIG, settings=settings)
+            self.assertLess(time.time() - start, 2)
+            with self.assertRaises(OSError):
+                os.kill(self._get_pid('sleep-5'), 0)  # The process got killed
+
+            cmd_list = self._fake_command('sleep-0')
+            self.assertEqual(AlbaCLI._execute_uncached(cmd_list=cmd_list, cmd_string=' '.join(cmd_list), config=self.CONFIG, settings=settings)[0], 0)
+            limiter = AlbaCLILimiter.get_limiter(config=self.CONFIG, limit=1)
+            limiter.acquire(timeout=0)  # The killed command released its slot
+            try:
+                with self.assertRaises(AlbaCLITimeoutError):
+                    AlbaCLI._execute_uncached(cmd_list=cmd_list, cmd_string=' '.join(cmd_list), config=self.CONFIG, settings=settings)
+            finally:
+                limiter.release()
+            metric = [metric for metric in AlbaCLIMetrics.get_metrics() if metric['command'] == 'sleep-0'][0]
+            self.assertEqual(metric['queued'], 2)
+            self.assertGreaterEqual(metric['queue_wait_max'], 0.5)
+            AlbaCLIMetrics.reset()
+
+    def test_stream_release(self):
+        """
+        Validates whether a streaming command releases its slot as soon as its process has been reaped,
+        both when the stream is exhausted and when the consumer closes it early
+        """
+        def _stream(name):
+            cmd_list = self._fake_command(name)
+            return AlbaCLI._stream_process(command=name, cmd_list=cmd_list, cmd_string=' '.join(cmd_list), cluster_name=None, path=['result'],
+                                           record_location=None, start=time.time(), timeout=None, limiter=limiter)
+
+        limiter = AlbaCLILimiter.get_limiter(config=self.CONFIG, limit=1)
+        limiter.acquire(timeout=0)
+        self.assertListEqual(list(_stream('stream-0')), [1, 2, 3])
+        self.assertTrue(limiter.try_acquire())
+
+        items = _stream('stream-10')
+        self.assertEqual(next(items), 1)
+        self.assertFalse(limiter.try_acquire())
+        start = time.time()
+        items.close()
+        self.assertLess(time.time() - start, 2)
+        with self.assertRaises(OSError):
+            os.kill(self._get_pid('stream-10'), 0)  # The process got killed and reaped
+        self.assertTrue(limiter.try_acquire())
+        limiter.release()
+
+    def test_multiplexer(self):
+        """
+        Validates whether the multiplexer returns the results in the order of the commands, with the exceptions in place,
+        and whether the timeout of a command covers the time it waited for a slot of its limiter
+        """
+        output = '{"success": true, "result": []}\n'
+        multiplexer = ProcessMultiplexer(concurrency=4)
+        results = multiplexer.run([self._fake_command('sleep-0.3'), self._fake_command('sleep-0'), [os.path.join(self.directory, 'missing'), 'list-osds']])
+        self.assertListEqual(results[:2], [(0, output, ''), (0, output, '')])
+        self.assertIsInstance(results[2], OSError)
+        self.assertGreater(multiplexer.durations[0], multiplexer.durations[1])
+
+        limiter = AlbaCLILimiter.get_limiter(config=self.CONFIG, limit=1)
+        start = time.time()
+        results = multiplexer.run([self._fake_command('sleep-5'), self._fake_command('sleep-0'), self._fake_command('sleep-0')],
+                                  limiters=[limiter] * 3,
+                                  timeouts=[0.5, 0.3, 2])
+        self.assertLess(time.time() - start, 2)
+        self.assertIsInstance(results[0], ProcessTimeoutError)  # Killed
+        self.assertIsInstance(results[1], ProcessTimeoutError)  # Never got a slot
+        self.assertEqual(results[2], (0, output, ''))  # Got the slot of the killed command
+        self.assertGreaterEqual(multiplexer.waits[1], 0.3)
+        self.assertGreaterEqual(multiplexer.waits[2], 0.4)
+        with self.assertRaises(OSError):
+            os.kill(self._get_pid('sleep-5'), 0)
+        self.assertTrue(limiter.try_acquire())  # All slots were released
+
+        # The slot is held elsewhere for 0.4s, so the command only gets 0.6s to run
+        Thread(target=lambda: time.sleep(0.4) or limiter.release()).start()
+        start = time.time()
+        results = multiplexer.run([self._fake_command('sleep-2')], limiters=[limiter], timeouts=[1])
+        self.assertIsInstance(results[0], ProcessTimeoutError)
+        self.assertLess(time.time() - start, 1.5)
+        self.assertTrue(limiter.try_acquire())
+        limiter.release()
+
+    def test_gather(self):
+        """
+        Validates whether gathered calls return their results in the order of the calls, with the exceptions of failed calls in place
+        """
+        replay = AlbaCLIReplay(locations=[], latency_factor=0)
+        for command, exit_code, output in [('list-osds', 0, '{"success": true, "result": ["osd"]}'),
+                                           ('list-presets', 1, '{"success": false, "error": {"message": "failed", "exception_code": 1, "exception_type": "Error"}}'),
+                                           ('list-nsm-hosts', 0, '{"success": true, "result": ["nsm"]}')]:
+            replay.add({'command': command, 'arguments': ['--to-json'], 'exit_code': exit_code, 'output': output, 'stderr': '', 'duration': 0})
+        replay.activate()
+        try:
+            results = AlbaCLI.gather([{'command': command, 'config': self.CONFIG} for command in ['list-nsm-hosts', 'list-presets', 'list-osds']])
+        finally:
+            replay.deactivate()
+        self.assertListEqual([results[0], results[2]], [['nsm'], ['osd']])
+        self.assertIsInstance(results[1], AlbaError)
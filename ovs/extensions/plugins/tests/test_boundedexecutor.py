@@ -0,0 +1,129 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Bounded executor test module
+"""
+import os
+import time
+import unittest
+from Queue import Queue
+from threading import Event, Lock, Thread
+from ovs.extensions.plugins.boundedexecutor import BoundedExecutor
+
+
+class _TestExecutor(BoundedExecutor):
+    """
+    Executor with a pool of its own, so the tests do not interfere with the pools in use
+    """
+    MAX_WORKERS = 2
+
+    _lock = Lock()
+    _queue = Queue()
+    _workers = []
+    _in_flight = {}
+    _pid = os.getpid()
+
+
+class BoundedExecutorTest(unittest.TestCase):
+    """
+    This test class will validate the fan-out over the bounded pool of worker threads
+    """
+    def setUp(self):
+        """
+        (Re)Sets the calls on every test
+        """
+        self.calls = []
+        self.release = Event()
+
+    def tearDown(self):
+        """
+        Clean up the unittest
+        """
+        self.release.set()
+
+    def _call(self, item):
+        """
+        Function executed by the workers. Sleeps when the item is a number, waits for the release when it is 'blocked' and raises when it is 'failing'
+        """
+        self.calls.append(item)
+        if item == 'blocked':
+            self.release.wait(10)
+        elif item == 'failing':
+            raise ValueError('Failing item')
+        elif isinstance(item, float):
+            time.sleep(item)
+        return item
+
+    def test_deadline(self):
+        """
+        Validates whether the tasks which finished before the deadline are returned with their result or exception
+        """
+        start = time.time()
+        tasks = _TestExecutor.map(function=self._call, items=[0.0, 'failing', 1.0], deadline=0.3)
+        self.assertLess(time.time() - start, 0.8)
+        self.assertListEqual([task.finished for task in tasks], [True, True, False])
+        self.assertEqual(tasks[0].result, 0.0)
+        self.assertIsInstance(tasks[1].exception, ValueError)
+        time.sleep(1)  # The late task already started, so it keeps on running
+        self.assertTrue(tasks[2].finished)
+
+    def test_shared_tasks(self):
+        """
+        Validates whether concurrent fan-outs over items with the same key share the task in progress
+        """
+        results = {}
+        thread = Thread(target=lambda: results.update(first=_TestExecutor.map(function=self._call, items=['blocked'], deadline=5, key=lambda item: item)))
+        thread.start()
+        time.sleep(0.2)
+        second = _TestExecutor.map(function=self._call, items=['blocked', 0.0], deadline=0.2, key=lambda item: item)
+        self.assertFalse(second[0].finished)
+        self.release.set()
+        thread.join()
+        self.assertIs(results['first'][0], second[0])
+        self.assertTrue(second[0].finished)
+        self.assertListEqual(sorted(self.calls), [0.0, 'blocked'])
+
+        _TestExecutor.map(function=self._call, items=['blocked'], deadline=1, key=lambda item: item)  # No longer in progress, so executed again
+        self.assertEqual(self.calls.count('blocked'), 2)
+
+    def test_abandoned_tasks(self):
+        """
+        Validates whether tasks which did not start before their deadline are skipped
+        """
+        busy = _TestExecutor.map(function=self._call, items=['blocked', 'blocked'], deadline=0.1)  # Keeps both workers busy
+        late = _TestExecutor.map(function=self._call, items=['skipped'], deadline=0.1)
+        self.assertFalse(any(task.finished for task in busy + late))
+        self.release.set()
+        time.sleep(0.3)
+        self.assertTrue(all(task.finished for task in busy))
+        self.assertFalse(late[0].finished)
+        self.assertNotIn('skipped', self.calls)
+
+    def test_reset_after_fork(self):
+        """
+        Validates whether a forked child process gets workers of its own
+        """
+        self.assertTrue(_TestExecutor.map(function=self._call, items=[0.0], deadline=1)[0].finished)  # Workers of the parent process are running
+        pid = os.fork()
+        if pid == 0:
+            try:
+                tasks = _TestExecutor.map(function=self._call, items=[0.0, 0.0], deadline=2)
+                os._exit(0 if all(task.finished for task in tasks) else 1)
+            except BaseException:
+                os._exit(2)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.WEXITSTATUS(status), 0)
@@ -44,7 +44,10 @@ from ovs.extensions.generic.configuration import Configuration, NotFoundExceptio
 from ovs.extensions.generic.sshclient import SSHClient, UnableToConnectException
 from ovs_extensions.generic.toolbox import ExtensionsToolbox
 from ovs.extensions.migration.migration.albamigrator import ExtensionMigrator
-from ovs.extensions.plugins.albacli import AlbaCLI, AlbaError
+from ovs.extensions.plugins.albacli import AlbaCLI, AlbaCLISettings, AlbaError
+from ovs.extensions.plugins.albaclaimcache import AlbaOSDClaimCache
+from ovs.extensions.plugins.albamaterializer import AlbaBackendMaterializer
+from ovs.extensions.plugins.albaosdinventory import AlbaOSDInventory
 from ovs.extensions.storage.volatilefactory import VolatileFactory
 from ovs.lib.helpers.decorators import add_hooks, ovs_task
 from ovs.lib.helpers.toolbox import Schedule
@@ -69,6 +72,8 @@ class AlbaController(object):
     NR_OF_AGENTS_CONFIG_KEY = '/ovs/alba/backends/{0}/maintenance/nr_of_agents'
     AGENTS_LAYOUT_CONFIG_KEY = '/ovs/alba/backends/{0}/maintenance/agents_layout'
     CONFIG_DEFAULT_NSM_HOSTS_KEY = CONFIG_ALBA_BACKEND_KEY.format('default_nsm_hosts')
+    PURGE_CONCURRENCY = 10  # Maximum amount of OSDs purged concurrently, further capped by the maximum amount of concurrent ALBA calls
+    PURGE_TIMEOUT = 300  # Seconds after which purging a single OSD is aborted
 
     _logger = logging.getLogger(__name__)
 
@@ -139,7 +144,7 @@ class AlbaController(object):
             requested_node_id = osd_data.get('node_id')
             osd = osd_data['object']
             orig_ips = osd.ips
-            config_location = Configuration.get_configuration_path(key=osd.alba_backend.abm_cluster.config_location)
+            config_location = osd.alba_backend.abm_cluster.config_path
             AlbaController._logger.debug('OSD with ID {0}: Updating on ALBA'.format(osd_id))
             try:
                 alba_node.client.update_osd(slot_id=osd.slot_id,
@@ -297,7 +302,7 @@ class AlbaController(object):
         :rtype: tuple
         """
         alba_backend = AlbaBackend(alba_backend_guid)
-        config = Configuration.get_configuration_path(key=alba_backend.abm_cluster.config_location)
+        config = alba_backend.abm_cluster.config_path
 
         failure_osds = []
         unclaimed_osds = []
@@ -306,12 +311,12 @@ class AlbaController(object):
             is_available = False
             is_claimed = False
             linked_alba_id = metadata['backend_info']['linked_alba_id']  # Also the osd_id
-            for available_osd in AlbaCLI.run(command='list-all-osds', config=config):
-                if available_osd.get('long_id') == linked_alba_id:
-                    if available_osd.get('decommissioned') is True:
-                        raise DecommissionedException('{0} is decommissioned.'.format(linked_alba_id))
-                    is_available = True
-                    is_claimed = available_osd.get('alba_id') is not None
+            available_osd = AlbaOSDInventory.get(config).by_long_id.get(linked_alba_id)
+            if available_osd is not None:
+                if available_osd.get('decommissioned') is True:
+                    raise DecommissionedException('{0} is decommissioned.'.format(linked_alba_id))
+                is_available = True
+                is_claimed = available_osd.get('alba_id') is not None
             if is_claimed is False and is_available is False:
                 # Add the OSD
                 # Retrieve remote Arakoon configuration
@@ -426,10 +431,11 @@ class AlbaController(object):
 
         # Verify ALBA responsive to make mapping
         alba_backend = AlbaBackend(alba_backend_guid)
-        config = Configuration.get_configuration_path(key=alba_backend.abm_cluster.config_location)
+        config = alba_backend.abm_cluster.config_path
         try:
-            claimed_osds = AlbaCLI.run(command='list-osds', config=config)
-            available_osds = AlbaCLI.run(command='list-available-osds', config=config)
+            inventory = AlbaOSDInventory.get(config)
+            claimed_osds = inventory.claimed
+            available_osds = inventory.available
         except AlbaError:
             cls._logger.exception('Could not load OSD information.')
             raise
@@ -489,7 +495,7 @@ class AlbaController(object):
                     try:
                         AlbaCLI.run(config=config,
                                     command='add-s3-osd',
-                                    named_params={'arakoon-url': Configuration.get_configuration_path(key=s3_transaction_cluster.config_location),
+                                    named_params={'arakoon-url': s3_transaction_cluster.config_path,
                                                   'long-id': osd_id})
                     except AlbaError:
                         cls._logger.exception('Error adding OSD on IP:port {0}'.format(ip_port))
@@ -564,34 +570,46 @@ class AlbaController(object):
     @staticmethod
     @ovs_task(name='alba.remove_units')
     def remove_units(alba_backend_guid, osd_ids):
-        # type: (str, List[str]) -> None
+        # type: (str, List[str]) -> Dict[str, str]
         """
         Removes storage units from an ALBA Backend
+        The OSDs are purged concurrently (at most PURGE_CONCURRENCY at the same time, within the concurrency limit of the ALBA CLI)
         :param alba_backend_guid: Guid of the ALBA Backend
         :type alba_backend_guid: str
         :param osd_ids: IDs of the ASDs
         :type osd_ids: list
-        :return: None
+        :return: The result per OSD: 'purged' or 'unknown' (the OSD was not known to the ALBA Backend)
+        :rtype: dict
         """
         alba_backend = AlbaBackend(alba_backend_guid)
         if alba_backend.abm_cluster is None:
             raise ValueError('ALBA Backend {0} does not have an ABM cluster registered'.format(alba_backend.name))
 
-        config = Configuration.get_configuration_path(key=alba_backend.abm_cluster.config_location)
+        config = alba_backend.abm_cluster.config_path
+        results = {}
         failed_osds = []
         last_exception = None
-        for osd_id in osd_ids:
-            try:
-                AlbaCLI.run(command='purge-osd', config=config, named_params={'long-id': osd_id})
-            except Exception as ex:
-                if 'Albamgr_protocol.Protocol.Error.Osd_unknown' not in ex.message:
-                    AlbaController._logger.exception('Error purging OSD {0}'.format(osd_id))
-                    last_exception = ex
-                    failed_osds.append(osd_id)
+        concurrency = min(AlbaController.PURGE_CONCURRENCY, AlbaCLISettings.get(config)['max_concurrent_calls'] or AlbaController.PURGE_CONCURRENCY)
+        outputs = AlbaCLI.gather(calls=[{'command': 'purge-osd', 'config': config, 'named_params': {'long-id': osd_id}} for osd_id in osd_ids],
+                                 concurrency=concurrency,
+                                 timeout=AlbaController.PURGE_TIMEOUT)
+        for osd_id, output in zip(osd_ids, outputs):
+            if not isinstance(output, Exception):
+                results[osd_id] = 'purged'
+            elif 'Albamgr_protocol.Protocol.Error.Osd_unknown' in output.message:
+                results[osd_id] = 'unknown'
+            else:
+                AlbaController._logger.error('Error purging OSD {0}: {1}'.format(osd_id, output))
+                last_exception = output
+                failed_osds.append(osd_id)
+        AlbaController._logger.info('Purged OSDs from ALBA Backend {0}: {1}'.format(alba_backend.name, results))
+        AlbaOSDClaimCache.invalidate()  # Purged OSDs are no longer in the model and no longer claimed
+        alba_backend.invalidate_dynamics()
         if len(failed_osds) > 0:
             if len(osd_ids) == 1:
                 raise last_exception
             raise RuntimeError('Error processing one or more OSDs: {0}'.format(failed_osds))
+        return results
 
     @staticmethod
     @ovs_task(name='alba.add_cluster')
@@ -629,7 +647,7 @@ class AlbaController(object):
             AlbaController.remove_cluster(alba_backend_guid=alba_backend_guid)
             raise
 
-        config = Configuration.get_configuration_path(key=alba_backend.abm_cluster.config_location)
+        config = alba_backend.abm_cluster.config_path
         alba_backend.alba_id = AlbaCLI.run(command='get-alba-id', config=config, named_params={'attempts': 5})['id']
         alba_backend.save()
         if not Configuration.exists(AlbaController.CONFIG_DEFAULT_NSM_HOSTS_KEY):
@@ -685,7 +703,7 @@ class AlbaController(object):
         if AlbaController.can_set_auto_cleanup():
             if config is None:
                 alba_backend = AlbaBackend(alba_backend_guid)
-                config = Configuration.get_configuration_path(key=alba_backend.abm_cluster.config_location)
+                config = alba_backend.abm_cluster.config_path
             # Check if the maintenance config was not set (disabled)
             maintenance_config = AlbaController.get_maintenance_config(alba_backend_guid, config)
             # Should be None when disabled (default behaviour)
@@ -710,7 +728,7 @@ class AlbaController(object):
         """
         if config is None:
             alba_backend = AlbaBackend(alba_backend_guid)
-            config = Configuration.get_configuration_path(key=alba_backend.abm_cluster.config_location)
+            config = alba_backend.abm_cluster.config_path
         return AlbaCLI.run(command='get-maintenance-config', config=config)
 
     @staticmethod
@@ -727,7 +745,7 @@ class AlbaController(object):
         """
         if config is None:
             alba_backend = AlbaBackend(alba_backend_guid)
-            config = Configuration.get_configuration_path(key=alba_backend.abm_cluster.config_location)
+            config = alba_backend.abm_cluster.config_path
         maintenance_config = AlbaController.get_maintenance_config(alba_backend_guid, config)
         eviction_types = maintenance_config.get('eviction_type', ['Automatic'])  # Defaults to ['Automatic'] normally
         # Check if update would be required. Put in place so Migration can call this function also
@@ -1059,7 +1077,7 @@ class AlbaController(object):
         safety_data = []
         while True:
             try:
-                config = Configuration.get_configuration_path(key=alba_backend.abm_cluster.config_location)
+                config = alba_backend.abm_cluster.config_path
                 safety_data = AlbaCLI.run(command='get-disk-safety', config=config, extra_params=extra_parameters)
                 break
             except Exception as ex:
@@ -1571,7 +1589,7 @@ class AlbaController(object):
             if alba_backend.abm_cluster is None:
                 raise ValueError('ALBA Backend {0} does not have an ABM cluster registered'.format(alba_backend.name))
 
-            config = Configuration.get_configuration_path(key=alba_backend.abm_cluster.config_location)
+            config = alba_backend.abm_cluster.config_path
             namespaces = AlbaCLI.run(command='list-namespaces', config=config)
             for namespace in namespaces:
                 ns_name = namespace['name']
@@ -1583,6 +1601,27 @@ class AlbaController(object):
 
         AlbaController._logger.info('Verify namespace task scheduling finished')
 
+    @staticmethod
+    @ovs_task(name='alba.materialize_backends', schedule=Schedule(minute='*', hour='*'), ensure_single_info={'mode': 'DEFAULT'})
+    def materialize_backends():
+        # type: () -> Dict[str, int]
+        """
+        Precompute the summaries (usages, presets, local summary and live status) of all ALBA Backends into the volatile store
+        The ALBA Backend hybrids serve these materialized values, so listing the ALBA Backends does not wait for their (remote) calculation
+        Only the summaries which have been read recently are computed, see AlbaBackendMaterializer.READ_WINDOW
+        :return: The stored version per ALBA Backend guid. Backends which failed to materialize are omitted
+        :rtype: dict
+        """
+        versions = {}
+        for alba_backend in AlbaBackendList.get_albabackends():
+            if alba_backend.abm_cluster is None:
+                continue  # Backend not fully installed yet
+            try:
+                versions[alba_backend.guid] = AlbaBackendMaterializer.materialize(alba_backend)
+            except Exception:
+                AlbaController._logger.exception('Materializing ALBA Backend {0} failed'.format(alba_backend.name))
+        return versions
+
     @staticmethod
     @add_hooks('backend', 'domains-update')
     def _post_backend_domains_updated(backend_guid):
@@ -35,6 +35,7 @@ from ovs.extensions.db.arakooninstaller import ArakoonInstaller
 from ovs.extensions.generic.configuration import Configuration, NotFoundException
 from ovs.extensions.generic.sshclient import SSHClient, UnableToConnectException
 from ovs.extensions.plugins.albacli import AlbaCLI
+from ovs.extensions.plugins.sshclientpool import SSHClientPool
 from ovs.lib.helpers.alba_arakoon_installer import AlbaArakoonInstaller, ABMInstaller, NSMInstaller, S3TransactionInstaller
 from ovs.lib.helpers.decorators import ovs_task
 from ovs.lib.helpers.toolbox import Schedule
@@ -131,7 +132,7 @@ class AlbaArakoonController(object):
                     if ssh_clients:
                         client = ssh_clients.get(storagerouter)
                     else:
-                        client = SSHClient(storagerouter)
+                        client = SSHClientPool.get(storagerouter)
                     if client:
                         available_storagerouters[storagerouter] = partition
                 except UnableToConnectException:
@@ -161,7 +162,7 @@ class AlbaArakoonController(object):
         clients = {}
         for storagerouter in masters + slaves:
             try:
-                clients[storagerouter] = SSHClient(storagerouter)
+                clients[storagerouter] = SSHClientPool.get(storagerouter)
             except UnableToConnectException:
                 cls._logger.warning('Storage Router with IP {0} is not reachable'.format(storagerouter.ip))
         available_storagerouters = cls.get_available_arakoon_storagerouters(clients)
@@ -267,7 +268,7 @@ class AlbaArakoonController(object):
         if service_capacity == 0:
             return float('inf')
 
-        config = Configuration.get_configuration_path(key=nsm_cluster.alba_backend.abm_cluster.config_location)
+        config = nsm_cluster.alba_backend.abm_cluster.config_path
         hosts_data = AlbaCLI.run(command='list-nsm-hosts', config=config)
         try:
             host = [host for host in hosts_data if host['id'] == nsm_cluster.name][0]
@@ -508,7 +509,7 @@ class AlbaArakoonController(object):
                                                          base_dir=partition.folder,
                                                          plugins={NSM_PLUGIN: version_str})
                     cls._logger.debug('ALBA Backend {0} - Linking plugins'.format(alba_backend.name))
-                    ssh_client = ssh_clients.get(storagerouter) or SSHClient(StorageRouter)
+                    ssh_client = ssh_clients.get(storagerouter) or SSHClientPool.get(storagerouter)
                     AlbaArakoonInstaller.link_plugins(client=ssh_client, data_dir=partition.folder,
                                                       plugins=[NSM_PLUGIN], cluster_name=nsm_cluster_name)
                     cls._logger.debug('ALBA Backend {0} - Modeling services'.format(alba_backend.name))
@@ -603,7 +604,7 @@ class AlbaArakoonController(object):
         ssh_clients = {}
         for storagerouter in storagerouters:
             try:
-                ssh_clients[storagerouter] = SSHClient(endpoint=storagerouter)
+                ssh_clients[storagerouter] = SSHClientPool.get(storagerouter)
             except UnableToConnectException:
                 raise RuntimeError('StorageRouter {0} with IP {1} is not reachable'.format(storagerouter.name, storagerouter.ip))
 
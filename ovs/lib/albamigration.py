@@ -53,7 +53,8 @@ class AlbaMigrationController(object):
         from ovs.extensions.migration.migration.albamigrator import ExtensionMigrator
         from ovs.extensions.packages.albapackagefactory import PackageFactory
         from ovs.extensions.services.albaservicefactory import ServiceFactory
-        from ovs.extensions.plugins.albacli import AlbaCLI, AlbaError
+        from ovs.extensions.plugins.albacli import AlbaError
+        from ovs.extensions.plugins.albaosdinventory import AlbaOSDInventory
         from ovs.lib.alba import AlbaController
         from ovs.lib.disk import DiskController
 
@@ -71,14 +72,14 @@ class AlbaMigrationController(object):
 
             AlbaMigrationController._logger.debug('Retrieving configuration path for ALBA Backend {0}'.format(alba_backend.name))
             try:
-                config = Configuration.get_configuration_path(alba_backend.abm_cluster.config_location)
+                config = alba_backend.abm_cluster.config_path
             except:
                 AlbaMigrationController._logger.exception('Failed to retrieve the configuration path for ALBA Backend {0}'.format(alba_backend.name))
                 continue
 
             AlbaMigrationController._logger.info('Retrieving OSD information for ALBA Backend {0}'.format(alba_backend.name))
             try:
-                osd_info = AlbaCLI.run(command='list-all-osds', config=config)
+                osd_info = AlbaOSDInventory.get(config).all
             except (AlbaError, RuntimeError):
                 AlbaMigrationController._logger.exception('Failed to retrieve OSD information for ALBA Backend {0}'.format(alba_backend.name))
                 continue
@@ -332,7 +332,7 @@ class AlbaNodeController(object):
             extra = extra.copy()
             try:
                 s3_transaction_cluster = S3TransactionClusterList.get_s3_transaction_clusters()[0]
-                extra['transaction_arakoon_url'] = Configuration.get_configuration_path(key=s3_transaction_cluster.config_location)
+                extra['transaction_arakoon_url'] = s3_transaction_cluster.config_path
             except IndexError:
                 raise RuntimeError('No transaction arakoon was deployed for this cluster!')
         created_osds = node.client.fill_slot(slot_id=slot_id, extra=extra)
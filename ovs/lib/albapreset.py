@@ -25,7 +25,6 @@ import random
 import logging
 import tempfile
 from ovs.dal.hybrids.albabackend import AlbaBackend
-from ovs.extensions.generic.configuration import Configuration
 from ovs.extensions.plugins.albacli import AlbaCLI
 from ovs.lib.helpers.decorators import ovs_task
 from ovs.lib.helpers.toolbox import Toolbox
@@ -101,7 +100,7 @@ class AlbaPresetController(object):
             preset['fragment_encryption'] = ['{0}'.format(encryption), '{0}'.format(temp_key_file)]
 
         # Dump preset content on filesystem
-        config = Configuration.get_configuration_path(alba_backend.abm_cluster.config_location)
+        config = alba_backend.abm_cluster.config_path
         temp_config_file = tempfile.mktemp()
         with open(temp_config_file, 'wb') as data_file:
             data_file.write(json.dumps(preset))
@@ -140,7 +139,7 @@ class AlbaPresetController(object):
 
         # DELETE PRESET
         AlbaPresetController._logger.debug('Deleting preset {0}'.format(name))
-        config = Configuration.get_configuration_path(alba_backend.abm_cluster.config_location)
+        config = alba_backend.abm_cluster.config_path
         AlbaCLI.run(command='delete-preset', config=config, extra_params=[name])
         alba_backend.invalidate_dynamics()
 
@@ -166,7 +165,7 @@ class AlbaPresetController(object):
 
         # UPDATE PRESET
         AlbaPresetController._logger.debug('Updating preset {0} with policies {1}'.format(name, policies))
-        config = Configuration.get_configuration_path(alba_backend.abm_cluster.config_location)
+        config = alba_backend.abm_cluster.config_path
         temp_config_file = tempfile.mktemp()
         with open(temp_config_file, 'wb') as data_file:
             data_file.write(json.dumps({'policies': policies}))
@@ -19,6 +19,7 @@ Statsmonkey module responsible for retrieving certain statistics from the cluste
 Classes: AlbaStatsMonkeyController
 """
 import logging
+from contextlib import closing
 from ovs.dal.hybrids.albabackend import AlbaBackend
 from ovs.dal.hybrids.storagerouter import StorageRouter
 from ovs.dal.lists.albabackendlist import AlbaBackendList
@@ -27,10 +28,11 @@ from ovs.dal.lists.vpoollist import VPoolList
 from ovs.extensions.generic.configuration import Configuration
 from ovs_extensions.monitoring.statsmonkey import StatsMonkey
 from ovs.extensions.plugins.albacli import AlbaCLI
+from ovs.extensions.plugins.albaclimetrics import AlbaCLIMetrics
+from ovs.extensions.plugins.boundedexecutor import BoundedExecutor
 from ovs.lib.albaarakoon import AlbaArakoonController
 from ovs.lib.helpers.decorators import ovs_task
 from ovs.lib.helpers.toolbox import Schedule
-from threading import Thread
 
 
 class AlbaStatsMonkeyController(StatsMonkey):
@@ -43,6 +45,7 @@ class AlbaStatsMonkeyController(StatsMonkey):
         * get_stats_vdisks
         * get_stats_proxies
         * get_stats_alba_backends
+        * get_stats_alba_cli
     """
     _logger = logging.getLogger(__name__)
     _dynamic_dependencies = {'get_stats_osds': {AlbaBackend: ['osd_statistics']},  # The statistics being retrieved depend on the caching timeouts of these properties
@@ -98,7 +101,7 @@ class AlbaStatsMonkeyController(StatsMonkey):
                               'fields': {'load': float(AlbaArakoonController.get_load(nsm))},
                               'measurement': 'nsm'})
 
-            config_path = Configuration.get_configuration_path(alba_backend.abm_cluster.config_location)
+            config_path = alba_backend.abm_cluster.config_path
             try:
                 nsm_host_ids = [nsm_host['id'] for nsm_host in AlbaCLI.run(command='list-nsm-hosts', config=config_path)]
                 nsm_hosts_statistics = AlbaCLI.run(command='nsm-hosts-statistics', config=config_path, named_params={'nsm-hosts': ','.join(nsm_host_ids)})
@@ -166,15 +169,17 @@ class AlbaStatsMonkeyController(StatsMonkey):
         environment = cls._config['environment']
         alba_backend_info = {}
         for alba_backend in AlbaBackendList.get_albabackends():
-            config_path = Configuration.get_configuration_path(alba_backend.abm_cluster.config_location)
+            config_path = alba_backend.abm_cluster.config_path
             disk_safety = {}
             namespace_usage = {}
 
-            # Retrieve namespace, preset and disk safety information
+            # Retrieve preset and namespace information
+            # The namespaces are streamed and parsed while the command is still running, as there can be hundreds of thousands of them
             try:
                 preset_info = AlbaCLI.run(command='list-presets', config=config_path)  # Not using alba_backend.presets, because it takes a whole lot longer to retrieve
-                all_namespace_info = AlbaCLI.run(command='show-namespaces', config=config_path, extra_params=['--max=-1'])[1]
-                all_disk_safety_info = AlbaCLI.run(command='get-disk-safety', config=config_path)
+                with closing(AlbaCLI.stream(command='show-namespaces', config=config_path, extra_params=['--max=-1'], path=['result', 1])) as namespaces:
+                    for namespace_info in namespaces:
+                        namespace_usage[namespace_info['name']] = float(namespace_info['statistics']['storage'])
             except Exception:
                 errors = True
                 cls._logger.exception('Retrieving information for ALBA Backend {0} failed'.format(alba_backend.name))
@@ -183,10 +188,6 @@ class AlbaStatsMonkeyController(StatsMonkey):
             alba_backend_info[alba_backend.guid] = {'disk_safety': disk_safety,
                                                     'namespace_usage': namespace_usage}
 
-            # Parse namespace information
-            for namespace_info in all_namespace_info:
-                namespace_usage[namespace_info['name']] = float(namespace_info['statistics']['storage'])
-
             # Parse preset information
             policies = []
             preset_name = None
@@ -205,45 +206,61 @@ class AlbaStatsMonkeyController(StatsMonkey):
             bucket_overview = {}
             disk_lost_overview = {}
             disk_safety_overview = {}
-            for disk_safety_info in all_disk_safety_info:
-                safety = disk_safety_info['safety']
-                volume_id = disk_safety_info['namespace']
-                disk_safety[volume_id] = float(safety) if safety is not None else safety
-
-                for bucket_safety in disk_safety_info['bucket_safety']:
-                    bucket = bucket_safety['bucket']
-                    objects = bucket_safety['count']
-                    remaining_safety = bucket_safety['remaining_safety']
-
-                    if bucket[1] > max_lost_disks:
-                        max_lost_disks = bucket[1]
-                    if remaining_safety > max_disk_safety:
-                        max_disk_safety = remaining_safety
-
-                    for policy in policies:
-                        k = policy[0] == bucket[0]
-                        m = policy[1] == bucket[1]
-                        c = policy[2] <= bucket[2]
-                        x = policy[3] >= bucket[3]
-                        if k and m and c and x:
-                            if preset_name not in bucket_overview:
-                                bucket_overview[preset_name] = {'policy': str(policy), 'presets': {}}
-
-                    bucket[2] -= bucket_safety['applicable_dead_osds']
-                    if str(bucket) not in bucket_overview[preset_name]['presets']:
-                        bucket_overview[preset_name]['presets'][str(bucket)] = {'objects': 0, 'disk_safety': 0}
-
-                    disk_lost = bucket[0] + bucket[1] - bucket[2]  # Data fragments + parity fragments - amount of fragments to write + dead osds
-                    if disk_lost not in disk_lost_overview:
-                        disk_lost_overview[disk_lost] = 0
-                    if remaining_safety not in disk_safety_overview:
-                        disk_safety_overview[remaining_safety] = 0
-
-                    total_objects += objects
-                    disk_lost_overview[disk_lost] += objects
-                    disk_safety_overview[remaining_safety] += objects
-                    bucket_overview[preset_name]['presets'][str(bucket)]['objects'] += objects
-                    bucket_overview[preset_name]['presets'][str(bucket)]['disk_safety'] = remaining_safety
+            # Only failures to retrieve the disk safety are tolerated, failures to parse it are not
+            retrieval_failed = False
+            with closing(AlbaCLI.stream(command='get-disk-safety', config=config_path)) as disk_safety_stream:
+                while True:
+                    try:
+                        disk_safety_info = next(disk_safety_stream)
+                    except StopIteration:
+                        break
+                    except Exception:
+                        cls._logger.exception('Retrieving disk safety information for ALBA Backend {0} failed'.format(alba_backend.name))
+                        retrieval_failed = True
+                        break
+                    safety = disk_safety_info['safety']
+                    volume_id = disk_safety_info['namespace']
+                    disk_safety[volume_id] = float(safety) if safety is not None else safety
+
+                    for bucket_safety in disk_safety_info['bucket_safety']:
+                        bucket = bucket_safety['bucket']
+                        objects = bucket_safety['count']
+                        remaining_safety = bucket_safety['remaining_safety']
+
+                        if bucket[1] > max_lost_disks:
+                            max_lost_disks = bucket[1]
+                        if remaining_safety > max_disk_safety:
+                            max_disk_safety = remaining_safety
+
+                        for policy in policies:
+                            k = policy[0] == bucket[0]
+                            m = policy[1] == bucket[1]
+                            c = policy[2] <= bucket[2]
+                            x = policy[3] >= bucket[3]
+                            if k and m and c and x:
+                                if preset_name not in bucket_overview:
+                                    bucket_overview[preset_name] = {'policy': str(policy), 'presets': {}}
+
+                        bucket[2] -= bucket_safety['applicable_dead_osds']
+                        if str(bucket) not in bucket_overview[preset_name]['presets']:
+                            bucket_overview[preset_name]['presets'][str(bucket)] = {'objects': 0, 'disk_safety': 0}
+
+                        disk_lost = bucket[0] + bucket[1] - bucket[2]  # Data fragments + parity fragments - amount of fragments to write + dead osds
+                        if disk_lost not in disk_lost_overview:
+                            disk_lost_overview[disk_lost] = 0
+                        if remaining_safety not in disk_safety_overview:
+                            disk_safety_overview[remaining_safety] = 0
+
+                        total_objects += objects
+                        disk_lost_overview[disk_lost] += objects
+                        disk_safety_overview[remaining_safety] += objects
+                        bucket_overview[preset_name]['presets'][str(bucket)]['objects'] += objects
+                        bucket_overview[preset_name]['presets'][str(bucket)]['disk_safety'] = remaining_safety
+
+            if retrieval_failed is True:
+                errors = True
+                alba_backend_info.pop(alba_backend.guid)
+                continue
 
             # Create statistics regarding disk safety
             for disk_lost_number in xrange(max_lost_disks + 1):
@@ -323,7 +340,7 @@ class AlbaStatsMonkeyController(StatsMonkey):
                                          'green': int(devices['green']),
                                          'orange': int(devices['orange']),
                                          'maintenance_work': int(AlbaCLI.run(command='list-work',
-                                                                             config=Configuration.get_configuration_path(alba_backend.abm_cluster.config_location))['count'])},
+                                                                             config=alba_backend.abm_cluster.config_path)['count'])},
                               'measurement': 'backend'})
             except Exception:
                 errors = True
@@ -335,36 +352,57 @@ class AlbaStatsMonkeyController(StatsMonkey):
         """
         Retrieve the OSD statistics for all ALBA Backends
         """
-        def _get_stats_osds_for_alba_backend(alba_backend, statistics, errored_calls):
+        if cls._config is None:
+            cls.validate_and_retrieve_config()
+
+        stats = []
+        errors = []
+        environment = cls._config['environment']
+        alba_backends = AlbaBackendList.get_albabackends()
+        # The (cached) statistics of every ALBA Backend are loaded on the shared fan-out pool rather than on a thread per ALBA Backend
+        tasks = BoundedExecutor.map(function=lambda _alba_backend: _alba_backend.osd_statistics, items=alba_backends, deadline=20)
+        for alba_backend, task in zip(alba_backends, tasks):
             try:
-                for osd_id, result in alba_backend.osd_statistics.iteritems():
+                if task.finished is False:
+                    raise RuntimeError('Loading the OSD statistics timed out')
+                if task.exception is not None:
+                    raise task.exception
+                for osd_id, result in task.result.iteritems():
+                    result = result.copy()
                     # Remove the 'version' key as it is a non-numeric value
                     result.pop('version', None)
-                    statistics.append({'tags': {'guid': alba_backend.guid,
-                                                'long_id': osd_id,
-                                                'environment': environment,
-                                                'backend_name': alba_backend.name},
-                                       'fields': cls._convert_to_float_values(result),
-                                       'measurement': 'asd'})
+                    stats.append({'tags': {'guid': alba_backend.guid,
+                                           'long_id': osd_id,
+                                           'environment': environment,
+                                           'backend_name': alba_backend.name},
+                                  'fields': cls._convert_to_float_values(result),
+                                  'measurement': 'asd'})
             except Exception:
-                errored_calls.append(alba_backend.name)
+                errors.append(alba_backend.name)
                 cls._logger.exception('Retrieving OSD statistics failed for ALBA Backend {0}'.format(alba_backend.name))
 
+        if len(errors) > 0:
+            raise Exception('Retrieving OSD statistics failed for ALBA Backends:\n * {0}'.format('\n * '.join(errors)))
+        return False, stats
+
+    @classmethod
+    def get_stats_alba_cli(cls):
+        """
+        Retrieve the metrics of the ALBA CLI calls executed by all processes
+        The counters are cumulative since the metrics were first aggregated. Calls of other processes are included as of their latest flush
+        """
         if cls._config is None:
             cls.validate_and_retrieve_config()
 
         stats = []
-        errors = []
-        threads = []
         environment = cls._config['environment']
-        for ab in AlbaBackendList.get_albabackends():
-            thread = Thread(name=ab.name, target=_get_stats_osds_for_alba_backend, args=(ab, stats, errors))
-            thread.start()
-            threads.append(thread)
-
-        for thr in threads:
-            thr.join(timeout=20)
-
-        if len(errors) > 0:
-            raise Exception('Retrieving OSD statistics failed for ALBA Backends:\n * {0}'.format('\n * '.join(errors)))
+        for metric in AlbaCLIMetrics.get_metrics(aggregated=True):
+            stats.append({'tags': {'command': metric['command'],
+                                   'environment': environment,
+                                   'abm_service_name': metric['cluster_name'] or 'none'},
+                          'fields': cls._convert_to_float_values(dict((key, metric[key]) for key in ['calls', 'errors', 'subprocesses', 'output_bytes',
+                                                                                                     'duration_mean', 'duration_max', 'duration_p50',
+                                                                                                     'duration_p90', 'duration_p99', 'queue_wait_mean',
+                                                                                                     'queue_wait_max'])),
+                          'measurement': 'alba_cli'})
         return False, stats
@@ -36,6 +36,8 @@ from ovs.extensions.generic.logger import Logger
 from ovs.extensions.generic.sshclient import SSHClient
 from ovs.extensions.packages.albapackagefactory import PackageFactory
 from ovs.extensions.plugins.albacli import AlbaCLI
+from ovs.extensions.plugins.configpathresolver import ConfigPathResolver
+from ovs.extensions.plugins.sshclientpool import SSHClientPool
 
 
 class AlbaArakoonInstaller(object):
@@ -232,6 +234,7 @@ class AlbaArakoonInstaller(object):
         cluster.alba_backend = alba_backend
         cluster.config_location = ArakoonClusterConfig.CONFIG_KEY.format(cluster_name)
         cluster.save()
+        ConfigPathResolver.invalidate(cluster.config_location)
 
         service = DalService()
         service.name = service_name
@@ -256,7 +259,7 @@ class AlbaArakoonInstaller(object):
         :return: The built or cached SSHClient
         :rtype: SSHClient
         """
-        return self.ssh_clients.get(storagerouter) or SSHClient(storagerouter)
+        return self.ssh_clients.get(storagerouter) or SSHClientPool.get(storagerouter)
 
     def get_an_ip(self):
         # type: () -> str
@@ -289,7 +292,7 @@ class ABMInstaller(AlbaArakoonInstaller):
         :return: None
         """
         abm_config_file = Configuration.get_configuration_path(ArakoonClusterConfig.CONFIG_KEY.format(abm_name))
-        client = SSHClient(ip)
+        client = SSHClientPool.get(ip)
         # Try 8 times, 1st time immediately, 2nd time after 2 secs, 3rd time after 4 seconds, 4th time after 8 seconds
         # This will be up to 2 minutes
         # Reason for trying multiple times is because after a cluster has been shrunk or extended,
@@ -361,7 +364,7 @@ class ABMInstaller(AlbaArakoonInstaller):
         """
         alba_backend = abm_cluster.alba_backend
         partition = self.get_db_partition(storagerouter)
-        ssh_client = ssh_client or SSHClient(storagerouter)
+        ssh_client = ssh_client or SSHClientPool.get(storagerouter)
 
         arakoon_installer = ArakoonInstaller(cluster_name=abm_cluster.name)
         arakoon_installer.load()
@@ -387,6 +390,7 @@ class ABMInstaller(AlbaArakoonInstaller):
         cls._remove_cluster(abm_cluster.name, internal, associated_junction_services=abm_cluster.abm_services,
                             junction_type=ABMService, arakoon_clusters=arakoon_clusters)
         # Remove item
+        ConfigPathResolver.invalidate(abm_cluster.config_location)
         abm_cluster.delete()
 
 
@@ -480,7 +484,7 @@ class NSMInstaller(AlbaArakoonInstaller):
         :rtype: NoneType
         """
         alba_backend = nsm_cluster.alba_backend
-        ssh_client = ssh_client or SSHClient(storagerouter)
+        ssh_client = ssh_client or SSHClientPool.get(storagerouter)
         partition = self.get_db_partition(storagerouter)
         arakoon_installer = ArakoonInstaller(cluster_name=nsm_cluster.name)
         arakoon_installer.load()
@@ -513,7 +517,7 @@ class NSMInstaller(AlbaArakoonInstaller):
         """
         nsm_config_file = Configuration.get_configuration_path(ArakoonClusterConfig.CONFIG_KEY.format(nsm_name))
         abm_config_file = Configuration.get_configuration_path(ArakoonClusterConfig.CONFIG_KEY.format(abm_name))
-        AlbaCLI.run(command='add-nsm-host', config=abm_config_file, extra_params=[nsm_config_file], client=SSHClient(endpoint=ip))
+        AlbaCLI.run(command='add-nsm-host', config=abm_config_file, extra_params=[nsm_config_file], client=SSHClientPool.get(ip))
 
     @classmethod
     def update_nsm(cls, abm_name, nsm_name, ip):
@@ -533,7 +537,7 @@ class NSMInstaller(AlbaArakoonInstaller):
         AlbaCLI.run(command='update-nsm-host',
                     config=abm_config_file,
                     extra_params=[nsm_config_file],
-                    client=SSHClient(endpoint=ip))
+                    client=SSHClientPool.get(ip))
 
     @classmethod
     def remove_nsm_cluster(cls, nsm_cluster, arakoon_clusters=None):
@@ -551,6 +555,7 @@ class NSMInstaller(AlbaArakoonInstaller):
                             associated_junction_services=nsm_cluster.nsm_services,
                             junction_type=NSMService, arakoon_clusters=arakoon_clusters)
         # Remove item
+        ConfigPathResolver.invalidate(nsm_cluster.config_location)
         nsm_cluster.delete()
 
 
@@ -649,6 +654,7 @@ class S3TransactionInstaller(AlbaArakoonInstaller):
                             associated_junction_services=s3_cluster.s3_transaction_services,
                             junction_type=NSMService, arakoon_clusters=arakoon_clusters)
         # Remove item
+        ConfigPathResolver.invalidate(s3_cluster.config_location)
         s3_cluster.delete()
 
     @classmethod
@@ -677,6 +683,7 @@ class S3TransactionInstaller(AlbaArakoonInstaller):
         cluster.name = cluster_name
         cluster.config_location = ArakoonClusterConfig.CONFIG_KEY.format(cluster_name)
         cluster.save()
+        ConfigPathResolver.invalidate(cluster.config_location)
 
         service = DalService()
         service.name = service_name
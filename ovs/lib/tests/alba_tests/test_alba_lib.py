@@ -19,8 +19,11 @@ ALBA generic test module
 """
 
 import logging
+from ovs.constants.albacli import CLI_SETTINGS_KEY
+from ovs.dal.hybrids.albabackend import AlbaBackend
 from ovs.dal.tests.alba_helpers import AlbaDalHelper
 from ovs.extensions.generic.configuration import Configuration
+from ovs.extensions.plugins.albacli import AlbaCLI, AlbaCLISettings
 from ovs_extensions.log.logger import Logger
 from ovs.extensions.plugins.tests.alba_mockups import ManagerClientMockup, VirtualAlbaBackend
 from ovs_extensions.testing.testcase import LogTestCase
@@ -244,3 +247,58 @@ class AlbaGeneric(LogTestCase):
                 self.assertEqual(first=1, second=len(maintenance_info))
                 self.assertEqual(first=[alba_node.node_id], second=maintenance_info.values()[0])
         self.assertEqual(first=1, second=len(services))  # Only 1 service should have been deployed for the 2nd ALBA Backend
+
+    def test_remove_units(self):
+        """
+        Validates whether removing storage units purges all OSDs, regardless of the failures of some of them
+        * The purges run concurrently within the concurrency limit of the ALBA CLI
+        * The dynamics of the ALBA Backend are invalidated once, also after a failure
+        * The result is reported per OSD
+        """
+        alba_structure = AlbaDalHelper.build_dal_structure(structure={'alba_backends': [[1, 'LOCAL']],
+                                                                      'alba_abm_clusters': [1]})
+        alba_backend = alba_structure['alba_backends'][1]
+        VirtualAlbaBackend.purge_errors = {'osd_2': 'Purging failed',
+                                           'osd_3': 'Albamgr_protocol.Protocol.Error.Osd_unknown'}
+        Configuration.set(key=CLI_SETTINGS_KEY, value={'default': {'max_concurrent_calls': 2}})
+        AlbaCLISettings.invalidate()
+
+        concurrencies = []
+        invalidations = []
+        original_gather = AlbaCLI.gather
+        original_invalidate = AlbaBackend.__dict__['invalidate_dynamics']
+
+        def _gather(calls, concurrency=10, timeout=None):
+            concurrencies.append(concurrency)
+            return original_gather(calls=calls, concurrency=concurrency, timeout=timeout)
+
+        def _invalidate_dynamics(backend, properties=None):
+            invalidations.append(backend.guid)
+            original_invalidate(backend, properties)
+
+        AlbaCLI.gather = staticmethod(_gather)
+        AlbaBackend.invalidate_dynamics = _invalidate_dynamics
+        try:
+            # 1 OSD fails to be purged, the others are purged or unknown
+            with self.assertLogs(level=logging.INFO) as logging_watcher:
+                with self.assertRaises(RuntimeError) as raise_info:
+                    AlbaController.remove_units(alba_backend_guid=alba_backend.guid, osd_ids=['osd_1', 'osd_2', 'osd_3'])
+            self.assertEqual(first="Error processing one or more OSDs: ['osd_2']", second=str(raise_info.exception))
+            logs = logging_watcher.get_message_severity_map()
+            self.assertEqual(first='ERROR', second=logs['Error purging OSD osd_2: Purging failed - code: 0 - type: albamgr_exn'])
+            self.assertListEqual(list1=[2], list2=concurrencies)  # Capped by the maximum amount of concurrent ALBA calls
+            self.assertListEqual(list1=[alba_backend.guid], list2=invalidations)
+
+            # A single failing OSD raises its own error
+            with self.assertRaises(RuntimeError) as raise_info:
+                AlbaController.remove_units(alba_backend_guid=alba_backend.guid, osd_ids=['osd_2'])
+            self.assertEqual(first='Purging failed', second=raise_info.exception.message)
+
+            # All OSDs processed
+            self.assertDictEqual(d1={'osd_1': 'purged', 'osd_3': 'unknown'},
+                                 d2=AlbaController.remove_units(alba_backend_guid=alba_backend.guid, osd_ids=['osd_1', 'osd_3']))
+            self.assertEqual(first=3, second=len(invalidations))
+        finally:
+            AlbaCLI.gather = staticmethod(original_gather)
+            AlbaBackend.invalidate_dynamics = original_invalidate
+            AlbaCLISettings.invalidate()